@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from ...db import database
+from ...models.models import ActivityResponse, User
+from .auth import get_current_user
+
+router = APIRouter(prefix="/activity", tags=["Activity"])
+
+
+@router.get("", response_model=ActivityResponse)
+async def get_activity(
+    days: int = Query(365, ge=1, le=730),
+    current_user: User = Depends(get_current_user)
+):
+    """Daily review counts for a heatmap, plus current and longest streaks."""
+    try:
+        return database.get_activity(current_user.id, days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -0,0 +1,75 @@
+import hmac
+import os
+import re
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, status
+from fastapi.responses import FileResponse
+
+from ...core import profiling
+from ...core.config import settings
+from ...db import database
+from ...services import services
+
+router = APIRouter(prefix="/admin", tags=["Admin"])
+
+PROFILE_ID_PATTERN = re.compile(r"^[0-9T]+-[0-9a-f]{8}$")
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)) -> None:
+    if not settings.admin_token or not x_admin_token or not hmac.compare_digest(
+        x_admin_token.encode(), settings.admin_token.encode()
+    ):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
+
+
+def _profile_file(profile_id: str, suffix: str) -> str:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    path = os.path.join(settings.profiling_dir, f"{profile_id}{suffix}")
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return path
+
+
+@router.get("/profiles", response_model=List[dict], dependencies=[Depends(require_admin)])
+async def list_profiles():
+    return profiling.list_profiles(settings.profiling_dir)
+
+
+@router.get("/profiles/{profile_id}/flamegraph", dependencies=[Depends(require_admin)])
+async def download_flamegraph(profile_id: str):
+    """Collapsed stacks for flamegraph.pl / speedscope."""
+    return FileResponse(
+        _profile_file(profile_id, ".folded"),
+        media_type="text/plain",
+        filename=f"{profile_id}.folded",
+    )
+
+
+@router.get("/profiles/{profile_id}/allocations", dependencies=[Depends(require_admin)])
+async def download_allocations(profile_id: str):
+    return FileResponse(
+        _profile_file(profile_id, ".alloc.txt"),
+        media_type="text/plain",
+        filename=f"{profile_id}.alloc.txt",
+    )
+
+
+@router.get("/routing", dependencies=[Depends(require_admin)])
+async def routing_stats():
+    """Model tiers, routing decision counts and per-model breaker state and latency."""
+    return services.routing_stats()
+
+
+@router.post("/due-counts/rebuild", dependencies=[Depends(require_admin)])
+async def rebuild_due_counts(user_id: str):
+    """Rebuild one user's maintained due counts. Rebuild everyone's offline
+    with ``rebuild_due_counts.py``."""
+    try:
+        return {"buckets": database.rebuild_due_counts(user_id)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
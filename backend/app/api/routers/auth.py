@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Header
 from fastapi.security import OAuth2PasswordRequestForm
 
+from ...core import metrics
 from ...db import database
 from ...models.models import Message, Register, Token, User
 
@@ -16,7 +17,8 @@ async def get_current_user(authorization: str = Header(...)) -> User:
     
     token = authorization.split(" ")[1]
     try:
-        res = database.supabase.auth.get_user(token)
+        with metrics.span("auth.get_user"):
+            res = database.supabase.auth.get_user(token)
         usr = res.user
         return User(id=usr.id, username=usr.user_metadata.get("username", ""))
     except Exception:
@@ -1,9 +1,15 @@
-from typing import List
+import json
+import os
+import re
+from typing import Iterator, List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, File, Form, HTTPException, Query, UploadFile
+from fastapi.responses import StreamingResponse
 
 from ...db import database
-from ...models.models import FlashcardSet, User, StudyProgress
+from ...models.models import (DuplicateCheckRequest, DuplicateMatch, FlashcardSet,
+                              QuizResponse, StudyProgress, User)
+from ...services import transfer
 from .auth import get_current_user
 
 router = APIRouter(prefix="/flashcard-sets", tags=["Flashcard Sets"])
@@ -18,6 +24,78 @@ async def get_flashcard_sets(current_user: User = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/duplicates", response_model=List[DuplicateMatch])
+async def find_duplicate_cards(
+    request: DuplicateCheckRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """Flag cards that near-duplicate cards the user already has."""
+    try:
+        cards = [card.model_dump() for card in request.cards]
+        return database.find_near_duplicates(cards, current_user.id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _ndjson(events: Iterator[dict]) -> Iterator[str]:
+    try:
+        for event in events:
+            yield json.dumps(event) + "\n"
+    except Exception as e:
+        yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+
+
+@router.post("/import")
+async def import_flashcard_set(
+    file: UploadFile = File(...),
+    title: Optional[str] = Form(None),
+    description: str = Form(""),
+    format: Optional[str] = Form(None),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Import a deck from CSV, TSV or an Anki package as a new set.
+
+    Cards are parsed and inserted in batches while the response streams
+    newline-delimited JSON progress events, ending with ``done`` (including
+    the new ``set_id``) or ``error``.
+    """
+    try:
+        fmt = transfer.detect_format(file.filename, format)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    data = {
+        "title": title or os.path.splitext(file.filename or "")[0] or "Imported set",
+        "description": description,
+    }
+    cards = transfer.read_cards(file.file, fmt)
+    events = database.import_flashcard_set(data, cards, current_user.id)
+    return StreamingResponse(_ndjson(events), media_type="application/x-ndjson")
+
+
+@router.get("/{set_id}/export")
+async def export_flashcard_set(
+    set_id: int,
+    format: str = Query("csv", pattern="^(csv|tsv)$"),
+    current_user: User = Depends(get_current_user)
+):
+    """Stream a set's cards as CSV or TSV, read from the database page by page."""
+    try:
+        flashcard_set = database.get_flashcard_set_info(set_id, current_user.id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not flashcard_set:
+        raise HTTPException(status_code=404, detail="Flashcard set not found")
+
+    filename = re.sub(r"[^A-Za-z0-9._-]+", "_", flashcard_set["title"]).strip("_") or f"set-{set_id}"
+    return StreamingResponse(
+        transfer.write_delimited(database.iter_flashcard_pages(set_id), format),
+        media_type=transfer.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}.{format}"'},
+    )
+
+
 @router.get("/{set_id}", response_model=FlashcardSet)
 async def get_flashcard_set(
     set_id: int,
@@ -83,4 +161,23 @@ async def get_study_progress(
         result = database.get_study_progress(set_id, current_user.id)
         return result
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{set_id}/quiz", response_model=QuizResponse)
+async def get_quiz(
+    set_id: int,
+    offset: int = Query(0, ge=0),
+    limit: int = Query(10, ge=1, le=50),
+    choices: int = Query(4, ge=2, le=6),
+    seed: Optional[int] = Query(None, ge=0, lt=2 ** 31),
+    current_user: User = Depends(get_current_user)
+):
+    """A page of multiple-choice questions. Pass the returned seed back to get the next page."""
+    try:
+        result = database.get_quiz(set_id, current_user.id, offset, limit, choices, seed)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if result is None:
+        raise HTTPException(status_code=404, detail="Flashcard set not found")
+    return result
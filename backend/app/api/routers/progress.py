@@ -0,0 +1,18 @@
+from typing import List
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from ...db import database
+from ...models.models import StudyProgress, User
+from .auth import get_current_user
+
+router = APIRouter(prefix="/progress", tags=["Progress"])
+
+
+@router.get("", response_model=List[StudyProgress])
+async def get_library_progress(current_user: User = Depends(get_current_user)):
+    """Study progress for all of the user's sets in one request."""
+    try:
+        return database.get_library_progress(current_user.id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import List, Optional
 from pydantic import BaseModel
 import datetime
+import logging
 
+from app.core import metrics
+from app.db import database
 from app.db.database import supabase
-from app.models.models import User
+from app.models.models import DueCountsResponse, DueForecastResponse, User
 from app.api.routers.auth import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter()
 
 class ReviewResponse(BaseModel):
@@ -19,6 +24,32 @@ class FlashcardForReview(BaseModel):
     back: str
     set_id: int
 
+@router.get("/reviews/due-counts", response_model=DueCountsResponse)
+async def get_due_counts(
+    on: Optional[datetime.date] = Query(None, alias="date"),
+    user: User = Depends(get_current_user)
+):
+    """
+    New and due card counts for every set, read from the maintained due-count index.
+    """
+    try:
+        return database.get_due_counts(user.id, on)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/reviews/forecast", response_model=DueForecastResponse)
+async def get_due_forecast(
+    days: int = Query(14, ge=1, le=365),
+    user: User = Depends(get_current_user)
+):
+    """
+    Reviews coming due per day across all sets.
+    """
+    try:
+        return database.get_due_forecast(user.id, days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/reviews/due/{set_id}", response_model=List[FlashcardForReview])
 async def get_due_review_cards(set_id: int, user: User = Depends(get_current_user)):
     """
@@ -28,13 +59,15 @@ async def get_due_review_cards(set_id: int, user: User = Depends(get_current_use
     today = datetime.date.today().isoformat()
     
     # First, get all flashcard IDs for the given set
-    cards_in_set_result = supabase.table("flashcards").select("id").eq("set_id", set_id).execute()
+    with metrics.span("db.reviews.set_cards"):
+        cards_in_set_result = supabase.table("flashcards").select("id").eq("set_id", set_id).execute()
     if not cards_in_set_result.data:
         return []
     card_ids = [card['id'] for card in cards_in_set_result.data]
 
     # Then, get the progress for those cards for the current user
-    progress_result = supabase.table("user_flashcard_progress").select("flashcard_id, next_review_date").in_("flashcard_id", card_ids).eq("user_id", user.id).execute()
+    with metrics.span("db.reviews.progress"):
+        progress_result = supabase.table("user_flashcard_progress").select("flashcard_id, next_review_date").in_("flashcard_id", card_ids).eq("user_id", user.id).execute()
     
     progress_map = {item['flashcard_id']: item['next_review_date'] for item in progress_result.data}
     
@@ -47,7 +80,8 @@ async def get_due_review_cards(set_id: int, user: User = Depends(get_current_use
         return []
 
     # Finally, fetch the full flashcard data for the due cards
-    result = supabase.table("flashcards").select("id, front, back, set_id").in_("id", due_card_ids).execute()
+    with metrics.span("db.reviews.due_cards"):
+        result = supabase.table("flashcards").select("id, front, back, set_id").in_("id", due_card_ids).execute()
     
     return result.data
 
@@ -69,7 +103,8 @@ async def submit_review(review: ReviewResponse, user: User = Depends(get_current
         raise HTTPException(status_code=400, detail="Invalid response quality.")
 
     # Get current progress for the card
-    progress_result = supabase.table("user_flashcard_progress").select("id, easiness_factor, repetitions, interval").eq("user_id", user.id).eq("flashcard_id", review.flashcard_id).execute()
+    with metrics.span("db.reviews.progress"):
+        progress_result = supabase.table("user_flashcard_progress").select("id, easiness_factor, repetitions, interval").eq("user_id", user.id).eq("flashcard_id", review.flashcard_id).execute()
     
     progress = progress_result.data[0] if progress_result.data else None
 
@@ -104,22 +139,29 @@ async def submit_review(review: ReviewResponse, user: User = Depends(get_current
     next_review_date = datetime.date.today() + datetime.timedelta(days=interval)
 
     # Update or Insert progress in DB
-    if progress is None:
-        supabase.table("user_flashcard_progress").insert({
-            "user_id": user.id,
-            "flashcard_id": review.flashcard_id,
-            "easiness_factor": easiness_factor,
-            "repetitions": repetitions,
-            "interval": interval,
-            "next_review_date": next_review_date.isoformat(),
-        }).execute()
-    else:
-        supabase.table("user_flashcard_progress").update({
-            "easiness_factor": easiness_factor,
-            "repetitions": repetitions,
-            "interval": interval,
-            "next_review_date": next_review_date.isoformat(),
-            "updated_at": datetime.datetime.now().isoformat()
-        }).eq("id", progress['id']).execute()
+    with metrics.span("db.reviews.save_progress"):
+        if progress is None:
+            supabase.table("user_flashcard_progress").insert({
+                "user_id": user.id,
+                "flashcard_id": review.flashcard_id,
+                "easiness_factor": easiness_factor,
+                "repetitions": repetitions,
+                "interval": interval,
+                "next_review_date": next_review_date.isoformat(),
+            }).execute()
+        else:
+            supabase.table("user_flashcard_progress").update({
+                "easiness_factor": easiness_factor,
+                "repetitions": repetitions,
+                "interval": interval,
+                "next_review_date": next_review_date.isoformat(),
+                "updated_at": datetime.datetime.now().isoformat()
+            }).eq("id", progress['id']).execute()
+
+    # The progress is saved; a failed rollup only costs the heatmap a count.
+    try:
+        database.record_daily_activity(user.id, quality >= 3)
+    except Exception:
+        logger.warning("Failed to record daily activity", exc_info=True)
 
     return {"message": "Review submitted successfully."}
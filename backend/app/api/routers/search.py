@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from ...db import database
+from ...models.models import SearchResponse, User
+from .auth import get_current_user
+
+router = APIRouter(prefix="/search", tags=["Search"])
+
+
+@router.get("", response_model=SearchResponse)
+async def search_cards(
+    q: str = Query(..., min_length=1, max_length=200),
+    offset: int = Query(0, ge=0),
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_user)
+):
+    """Full-text search across all of the user's cards."""
+    try:
+        return database.search_cards(current_user.id, q, offset, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
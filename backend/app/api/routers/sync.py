@@ -0,0 +1,20 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from ...db import database
+from ...models.models import SyncResponse, User
+from .auth import get_current_user
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+
+@router.get("", response_model=SyncResponse)
+async def get_sync_changes(
+    since: int = Query(0, ge=0),
+    limit: int = Query(database.SYNC_PAGE_SIZE, ge=1, le=5000),
+    current_user: User = Depends(get_current_user)
+):
+    """Sets and cards created, updated or deleted since the ``since`` cursor."""
+    try:
+        return database.get_sync_changes(current_user.id, since, limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
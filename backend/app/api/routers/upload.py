@@ -1,18 +1,36 @@
-import io
+import logging
 from typing import List, Optional
 
 from fastapi import APIRouter, Depends, File, Form, HTTPException, UploadFile
-from pypdf import PdfReader
 
-from ...models.models import FlashcardResponse, User, GenerationConfig
-from ...services.services import (process_images_to_flashcards,
+from ...core import metrics
+from ...db import database
+from ...models.models import DocumentUpdateResponse, FlashcardResponse, User, GenerationConfig
+from ...services import documents
+from ...services.services import (process_document_to_flashcards,
+                                  process_pages_to_flashcards,
                                   process_text_to_flashcards,
                                   FlashcardGenerationError)
+from ...services.usage import TokenUsage
 from .auth import get_current_user
 
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/upload", tags=["Upload"])
 
 
+def _record_usage(user_id: str, usage: TokenUsage) -> None:
+    """Attribute a request's token spend to the user, including calls (lost
+    hedges) that finish after the response; never fails the request."""
+    def record(usage_by_model: List[dict]) -> None:
+        try:
+            database.record_token_usage(user_id, usage_by_model)
+        except Exception:
+            logger.warning("Failed to record token usage", exc_info=True)
+
+    usage.drain(record)
+
+
 @router.post("/", response_model=FlashcardResponse)
 async def upload_files(
     files: List[UploadFile] = File(...),
@@ -21,6 +39,11 @@ async def upload_files(
 ):
     """
     Upload files (images, PDFs, text) to generate flashcards.
+
+    Each PDF page, text file and image is generated separately; every card
+    comes back with the hash of its source page and the response lists the
+    pages, so the set created from them can later be re-uploaded with only
+    the changed pages regenerated.
     
     Args:
         files: List of files to process
@@ -34,51 +57,94 @@ async def upload_files(
         back_language = "english"
     
     config = GenerationConfig(back_language=back_language)
+
+    pages = await _read_pages(files)
+    if all(page.is_empty for page in pages):
+        raise HTTPException(status_code=400, detail="No processable content found in files")
     
-    images = []
-    text_content = ""
-    
+    usage = TokenUsage()
+    try:
+        return await process_document_to_flashcards(pages, config, usage)
+    except FlashcardGenerationError as e:
+        raise HTTPException(status_code=500, detail=f"Flashcard generation failed: {str(e)}")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        _record_usage(current_user.id, usage)
+
+
+async def _read_pages(files: List[UploadFile]) -> List[documents.DocumentPage]:
+    """Split uploads into hashed pages: one per PDF page, text file or image."""
+    pages = []
     for file in files:
         try:
             content_type = file.content_type
+            content = await file.read()
+            if len(content) == 0:
+                raise ValueError(f"File {file.filename} is empty")
             if content_type.startswith("image/"):
-                content = await file.read()
-                if len(content) == 0:
-                    raise ValueError(f"File {file.filename} is empty")
-                images.append(content)
+                pages.append(documents.image_page(len(pages) + 1, content))
             elif content_type == "application/pdf":
-                content = await file.read()
-                if len(content) == 0:
-                    raise ValueError(f"File {file.filename} is empty")
-                
-                reader = PdfReader(io.BytesIO(content))
-                for page in reader.pages:
-                    text_content += page.extract_text()
+                with metrics.span("pdf.extract"):
+                    texts = documents.pdf_page_texts(content)
+                for text in texts:
+                    pages.append(documents.text_page(len(pages) + 1, text))
             elif content_type == "text/plain":
-                content = await file.read()
-                if len(content) == 0:
-                    raise ValueError(f"File {file.filename} is empty")
-                text_content += content.decode("utf-8")
+                pages.append(documents.text_page(len(pages) + 1, content.decode("utf-8")))
             else:
                 raise ValueError(f"Unsupported file type: {content_type}")
         except Exception as e:
             raise HTTPException(
-                status_code=400, 
+                status_code=400,
                 detail=f"Error processing file {file.filename}: {str(e)}"
             )
-    
+    return pages
+
+
+@router.post("/sets/{set_id}", response_model=DocumentUpdateResponse)
+async def update_set_from_files(
+    set_id: int,
+    files: List[UploadFile] = File(...),
+    back_language: Optional[str] = Form("english"),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Re-upload a set's source document and regenerate only the pages that changed.
+
+    Pages are matched to the ones the set was generated from by content
+    hash; only new or edited pages are sent to the model, and their cards
+    are spliced into the set in place of those of pages that are gone.
+
+    Args:
+        set_id: Set to update
+        files: The (edited) document: PDFs, text files or images
+        back_language: Language for the back of cards ("english" or "vietnamese")
+    """
+    if not files:
+        raise HTTPException(status_code=400, detail="No files were uploaded")
+    if back_language not in ("english", "vietnamese"):
+        back_language = "english"
+    if not database.get_flashcard_set_info(set_id, current_user.id):
+        raise HTTPException(status_code=404, detail="Flashcard set not found")
+
+    pages = await _read_pages(files)
+    plan = documents.plan_pages(pages, database.get_document_pages(set_id))
+
+    usage = TokenUsage()
     try:
-        if images:
-            return await process_images_to_flashcards(images, config)
-        elif text_content:
-            return await process_text_to_flashcards(text_content, config)
-        else:
-            raise HTTPException(status_code=400, detail="No processable content found in files")
+        generated = await process_pages_to_flashcards(
+            plan.generate, GenerationConfig(back_language=back_language), usage
+        )
+        return database.splice_document_pages(set_id, current_user.id, plan, {
+            content_hash: [card.model_dump() for card in cards]
+            for content_hash, cards in generated.items()
+        })
     except FlashcardGenerationError as e:
         raise HTTPException(status_code=500, detail=f"Flashcard generation failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-
+    finally:
+        _record_usage(current_user.id, usage)
 
 from pydantic import BaseModel
 
@@ -108,9 +174,12 @@ async def generate_from_text(
     
     config = GenerationConfig(back_language=back_language)
     
+    usage = TokenUsage()
     try:
-        return await process_text_to_flashcards(request.text, config)
+        return await process_text_to_flashcards(request.text, config, usage)
     except FlashcardGenerationError as e:
         raise HTTPException(status_code=500, detail=f"Flashcard generation failed: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        _record_usage(current_user.id, usage)
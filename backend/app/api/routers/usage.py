@@ -0,0 +1,19 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+
+from ...db import database
+from ...models.models import TokenUsageResponse, User
+from .auth import get_current_user
+
+router = APIRouter(prefix="/usage", tags=["Usage"])
+
+
+@router.get("", response_model=TokenUsageResponse)
+async def get_token_usage(
+    days: int = Query(30, ge=1, le=365),
+    current_user: User = Depends(get_current_user)
+):
+    """The user's LLM token spend per day and model, including prompt-cache hits."""
+    try:
+        return database.get_token_usage(current_user.id, days)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
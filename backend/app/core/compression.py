@@ -0,0 +1,311 @@
+"""Negotiated response compression with a cache of compressed bodies.
+
+``CompressionMiddleware`` picks the first of the configured encodings
+(zstd, brotli, gzip by default) that the client accepts and that is
+installed. zstd needs ``zstandard`` and brotli needs ``brotli``; both are in
+requirements.txt, but an encoding whose package is missing is skipped, and
+they are only imported when first used.
+
+Complete responses get a strong ETag: a hash of the uncompressed body.
+Compressed bodies are cached by ETag and encoding, so a repeat read of an
+unchanged set is hashed but not compressed again. A matching
+``If-None-Match`` gets a 304 with no body. Streaming responses (exports,
+import progress) are compressed incrementally and flushed chunk by chunk,
+so progress events still arrive as they are produced.
+"""
+
+import hashlib
+import importlib.util
+import threading
+import zlib
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from . import metrics
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/x-ndjson", "application/javascript")
+
+# Levels for on-the-fly compression: fast enough for dynamic responses and
+# close to the best ratio for JSON.
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+ZSTD_LEVEL = 3
+
+_MODULES = {"zstd": "zstandard", "br": "brotli", "gzip": "zlib"}
+
+
+class _GzipStream:
+    def __init__(self):
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.compress(chunk) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self):
+        import brotli
+
+        self._compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, chunk: bytes) -> bytes:
+        return self._compressor.process(chunk) + self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdStream:
+    def __init__(self):
+        import zstandard
+
+        self._zstd = zstandard
+        self._compressor = zstandard.ZstdCompressor(level=ZSTD_LEVEL).compressobj()
+
+    def compress(self, chunk: bytes) -> bytes:
+        return (self._compressor.compress(chunk)
+                + self._compressor.flush(self._zstd.COMPRESSOBJ_FLUSH_BLOCK))
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+def _gzip(body: bytes) -> bytes:
+    compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+    return compressor.compress(body) + compressor.flush()
+
+
+def _brotli(body: bytes) -> bytes:
+    import brotli
+
+    return brotli.compress(body, quality=BROTLI_QUALITY)
+
+
+def _zstd(body: bytes) -> bytes:
+    import zstandard
+
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+
+
+COMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {"zstd": _zstd, "br": _brotli, "gzip": _gzip}
+STREAMS: Dict[str, Callable[[], object]] = {"zstd": _ZstdStream, "br": _BrotliStream, "gzip": _GzipStream}
+
+
+@lru_cache(maxsize=None)
+def is_available(encoding: str) -> bool:
+    module = _MODULES.get(encoding)
+    return module is not None and importlib.util.find_spec(module) is not None
+
+
+def available_encodings(preferred: Sequence[str]) -> List[str]:
+    """``preferred`` minus unknown or uninstalled encodings, order kept."""
+    return [encoding for encoding in preferred if is_available(encoding)]
+
+
+def negotiate(accept_encoding: str, available: Sequence[str]) -> Optional[str]:
+    """The first of ``available`` (server preference) the client accepts with q > 0."""
+    accepted: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        accepted[name] = q
+    wildcard = accepted.get("*", 0.0)
+    for encoding in available:
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+def _etag_matches(if_none_match: str, digest: str) -> bool:
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*":
+            return True
+        value = tag.removeprefix("W/").strip('"')
+        if value.split("-", 1)[0] == digest:
+            return True
+    return False
+
+
+class CompressedBodyCache:
+    """LRU of compressed bodies keyed by (ETag, encoding), bounded by total bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._items: "OrderedDict[Tuple[str, str], bytes]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[str, str]) -> Optional[bytes]:
+        with self._lock:
+            body = self._items.get(key)
+            if body is not None:
+                self._items.move_to_end(key)
+            return body
+
+    def put(self, key: Tuple[str, str], body: bytes) -> None:
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._items.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous)
+            self._items[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self._size -= len(evicted)
+
+
+def _header(headers: List[Tuple[bytes, bytes]], name: bytes) -> Optional[bytes]:
+    for key, value in headers:
+        if key.lower() == name:
+            return value
+    return None
+
+
+def _without(headers: List[Tuple[bytes, bytes]], *names: bytes) -> List[Tuple[bytes, bytes]]:
+    return [(key, value) for key, value in headers if key.lower() not in names]
+
+
+class CompressionMiddleware:
+    """ASGI middleware applying negotiated compression, ETags and the body cache."""
+
+    def __init__(self, app, encodings: Sequence[str] = ("zstd", "br", "gzip"),
+                 minimum_size: int = 1024, cache_bytes: int = 32 * 1024 * 1024):
+        self.app = app
+        self.encodings = available_encodings(encodings)
+        self.minimum_size = minimum_size
+        self.cache = CompressedBodyCache(cache_bytes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = dict(scope["headers"])
+        encoding = negotiate(request_headers.get(b"accept-encoding", b"").decode("latin-1"), self.encodings)
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        cacheable = scope["method"] == "GET"
+
+        start_message = None
+        stream = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, stream, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+
+            if stream is not None:
+                chunk = stream.compress(body) if body else b""
+                if not more_body:
+                    chunk += stream.finish()
+                _count(encoding, len(body), len(chunk))
+                await send({"type": "http.response.body", "body": chunk, "more_body": more_body})
+                return
+
+            headers = list(start_message.get("headers", []))
+            content_type = (_header(headers, b"content-type") or b"").decode("latin-1")
+            if (start_message["status"] != 200 or _header(headers, b"content-encoding") is not None
+                    or not content_type.startswith(COMPRESSIBLE_TYPES)):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            if more_body:
+                if encoding is None:
+                    passthrough = True
+                    await send(start_message)
+                    await send(message)
+                    return
+                stream = STREAMS[encoding]()
+                start_message["headers"] = _without(headers, b"content-length", b"etag") + [
+                    (b"content-encoding", encoding.encode()),
+                    (b"vary", b"Accept-Encoding"),
+                ]
+                await send(start_message)
+                chunk = stream.compress(body) if body else b""
+                _count(encoding, len(body), len(chunk))
+                await send({"type": "http.response.body", "body": chunk, "more_body": True})
+                return
+
+            await self._send_complete(send, start_message, headers, body, encoding,
+                                      if_none_match if cacheable else "", cacheable)
+
+        await self.app(scope, receive, send_wrapper)
+
+    async def _send_complete(self, send, start_message, headers, body: bytes,
+                             encoding: Optional[str], if_none_match: str, cacheable: bool) -> None:
+        digest = None
+        if cacheable and _header(headers, b"etag") is None:
+            digest = hashlib.blake2b(body, digest_size=16).hexdigest()
+            if if_none_match and _etag_matches(if_none_match, digest):
+                headers = _without(headers, b"content-length", b"content-type")
+                start_message["status"] = 304
+                start_message["headers"] = headers + [
+                    (b"etag", f'"{digest}"'.encode()), (b"vary", b"Accept-Encoding")
+                ]
+                await send(start_message)
+                await send({"type": "http.response.body", "body": b""})
+                return
+
+        if encoding is None or len(body) < self.minimum_size:
+            if digest is not None:
+                headers = headers + [(b"etag", f'"{digest}"'.encode())]
+            if self.encodings:
+                headers = headers + [(b"vary", b"Accept-Encoding")]
+            start_message["headers"] = headers
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        compressed = self.cache.get((digest, encoding)) if digest else None
+        if metrics.is_enabled() and digest:
+            metrics.COMPRESSION_CACHE.inc(result="hit" if compressed is not None else "miss")
+        if compressed is None:
+            with metrics.span(f"compress.{encoding}"):
+                compressed = COMPRESSORS[encoding](body)
+            if digest:
+                self.cache.put((digest, encoding), compressed)
+        _count(encoding, len(body), len(compressed))
+
+        headers = _without(headers, b"content-length") + [
+            (b"content-encoding", encoding.encode()),
+            (b"content-length", str(len(compressed)).encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        if digest is not None:
+            # Each encoding is a different representation, so it gets its own tag.
+            headers.append((b"etag", f'"{digest}-{encoding}"'.encode()))
+        start_message["headers"] = headers
+        await send(start_message)
+        await send({"type": "http.response.body", "body": compressed})
+
+
+def _count(encoding: str, raw: int, wire: int) -> None:
+    if metrics.is_enabled():
+        metrics.COMPRESSION_BYTES.inc(raw, encoding=encoding, kind="raw")
+        metrics.COMPRESSION_BYTES.inc(wire, encoding=encoding, kind="wire")
@@ -1,3 +1,7 @@
+import os
+import tempfile
+from typing import Optional
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -13,7 +17,41 @@ class Settings(BaseSettings):
     supabase_url: str
     supabase_service_key: str
     openrouter_model: str = "google/gemini-3-flash-preview"
+    openrouter_base_url: str = "https://openrouter.ai/api/v1"
+    openrouter_fast_model: Optional[str] = None
+    openrouter_fallback_models: str = ""
+    routing_fast_max_tokens: int = 1500
+    routing_fast_max_images: int = 1
+    llm_timeout_seconds: float = 60.0
+    llm_max_attempts: int = 2
+    llm_hedge_enabled: bool = True
+    llm_hedge_min_delay_seconds: float = 2.0
+    llm_breaker_failures: int = 5
+    llm_breaker_reset_seconds: float = 30.0
+    max_continuations: int = 2
+    page_generation_concurrency: int = 4
+    page_batch_max_pages: int = 8
+    page_batch_max_tokens: int = 6000
+    dedup_threshold: float = 0.6
+    dedup_drop_threshold: float = 0.85
+    card_index_ttl_seconds: int = 600
+    card_index_max_users: int = 128
+    compression_enabled: bool = True
+    compression_encodings: str = "zstd,br,gzip"
+    compression_minimum_size: int = 1024
+    compression_cache_bytes: int = 32 * 1024 * 1024
     allowed_origins: str = "http://localhost:5173"
+    warmup_on_startup: bool = True
+    admin_token: Optional[str] = None
+    metrics_enabled: bool = True
+    metrics_token: Optional[str] = None
+    profiling_enabled: bool = False
+    profiling_sample_rate: float = 0.0
+    profiling_interval_ms: float = 5.0
+    profiling_admin_token: Optional[str] = None
+    profiling_dir: str = os.path.join(tempfile.gettempdir(), "flashcard-profiles")
+    review_retention_days: int = 90
+    review_archive_dir: Optional[str] = None
 
 
 settings = Settings()
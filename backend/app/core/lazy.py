@@ -0,0 +1,44 @@
+"""On-first-use construction of expensive module-level objects."""
+
+import threading
+from typing import Any, Callable
+
+
+class LazyProxy:
+    """Stand-in for an object that is built by ``factory`` on first attribute access.
+
+    Lets modules keep exposing a plain global (``database.supabase``,
+    ``services.client``) without paying for the import and construction of the
+    underlying client until a request actually needs it.
+    """
+
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def _resolve(self) -> Any:
+        instance = object.__getattribute__(self, "_instance")
+        if instance is None:
+            with object.__getattribute__(self, "_lock"):
+                instance = object.__getattribute__(self, "_instance")
+                if instance is None:
+                    instance = object.__getattribute__(self, "_factory")()
+                    object.__setattr__(self, "_instance", instance)
+        return instance
+
+    @property
+    def is_initialized(self) -> bool:
+        return object.__getattribute__(self, "_instance") is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._resolve(), name, value)
+
+    def __repr__(self) -> str:
+        if not self.is_initialized:
+            factory = object.__getattribute__(self, "_factory")
+            return f"<LazyProxy for {factory.__name__} (not initialized)>"
+        return repr(self._resolve())
@@ -0,0 +1,309 @@
+"""Lightweight in-process metrics exported in Prometheus text format."""
+
+import functools
+import threading
+import time
+from bisect import bisect_left
+from contextlib import nullcontext
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+DEFAULT_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+_NULL_SPAN = nullcontext()
+_enabled = True
+
+
+def configure(enabled: bool) -> None:
+    """Turn span recording on or off for the whole process."""
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def _format_labels(labelnames: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing counter with optional labels."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        return self._values.get(key, 0)
+
+    def collect(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels."""
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [bucket counts..., +Inf count], sum
+        self._values: Dict[Tuple[str, ...], list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            entry[0][index] += 1
+            entry[1] += value
+
+    def count(self, **labels: str) -> int:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        entry = self._values.get(key)
+        return sum(entry[0]) if entry else 0
+
+    def collect(self) -> Iterable[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = f'le="{_format_value(float(bound))}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_sum{labels} {_format_value(total)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    """Holds every metric so they can be rendered together at /metrics."""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Iterable[str] = (),
+        buckets: Tuple[float, ...] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+REQUEST_LATENCY = registry.histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route.",
+    ("method", "route", "status"),
+)
+SPAN_LATENCY = registry.histogram(
+    "span_duration_seconds",
+    "Latency of named stages inside a request.",
+    ("span",),
+)
+LLM_LATENCY = registry.histogram(
+    "llm_request_duration_seconds",
+    "Latency of individual LLM API attempts.",
+    ("model", "outcome"),
+)
+LLM_RETRIES = registry.counter(
+    "llm_retries_total",
+    "LLM API attempts that failed and were retried.",
+    ("model",),
+)
+LLM_ERRORS = registry.counter(
+    "llm_errors_total",
+    "Failed LLM API attempts by error class (transient, model, fatal).",
+    ("model", "kind"),
+)
+LLM_HEDGES = registry.counter(
+    "llm_hedged_requests_total",
+    "Attempts that outlived the model's p95 and got a hedged second request.",
+    ("model", "winner"),
+)
+LLM_FALLBACKS = registry.counter(
+    "llm_fallbacks_total",
+    "Calls that fell back to an alternate model.",
+    ("model",),
+)
+LLM_BREAKER_TRIPS = registry.counter(
+    "llm_circuit_breaker_trips_total",
+    "Times a model's circuit breaker opened.",
+    ("model",),
+)
+LLM_ROUTES = registry.counter(
+    "llm_routing_decisions_total",
+    "Model tier chosen per LLM call, and why.",
+    ("tier", "reason"),
+)
+LLM_TOKENS = registry.counter(
+    "llm_tokens_total",
+    "Tokens reported by the LLM API.",
+    ("model", "kind"),
+)
+LLM_SALVAGED_CARDS = registry.counter(
+    "llm_salvaged_cards_total",
+    "Complete cards recovered from truncated or malformed LLM output.",
+)
+LLM_CONTINUATIONS = registry.counter(
+    "llm_continuations_total",
+    "Follow-up calls asking the LLM to finish a truncated card list.",
+)
+COMPRESSION_BYTES = registry.counter(
+    "http_compression_bytes_total",
+    "Response bytes before (raw) and after (wire) compression.",
+    ("encoding", "kind"),
+)
+COMPRESSION_CACHE = registry.counter(
+    "http_compression_cache_total",
+    "Compressed-body cache lookups for complete GET responses.",
+    ("result",),
+)
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        SPAN_LATENCY.observe(time.perf_counter() - self.start, span=self.name)
+        return False
+
+
+def span(name: str):
+    """Time a block of code under ``name``; a no-op when metrics are disabled."""
+    if not _enabled:
+        return _NULL_SPAN
+    return _Span(name)
+
+
+def timed(name: Optional[str] = None) -> Callable:
+    """Decorator form of :func:`span` for synchronous functions."""
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record_llm_usage(model: str, usage) -> None:
+    """Count prompt/completion/cached tokens from an OpenAI-style ``usage`` object."""
+    if not _enabled or usage is None:
+        return
+    prompt_tokens = getattr(usage, "prompt_tokens", None)
+    completion_tokens = getattr(usage, "completion_tokens", None)
+    if isinstance(prompt_tokens, int):
+        LLM_TOKENS.inc(prompt_tokens, model=model, kind="prompt")
+    if isinstance(completion_tokens, int):
+        LLM_TOKENS.inc(completion_tokens, model=model, kind="completion")
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+    if isinstance(cached, int):
+        LLM_TOKENS.inc(cached, model=model, kind="cached")
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording request latency per matched route."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not _enabled:
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            REQUEST_LATENCY.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=str(status_code),
+            )
@@ -0,0 +1,168 @@
+"""Opt-in per-request profiling.
+
+A profiled request gets a statistical CPU profile of the event-loop thread,
+written as collapsed stacks (``*.folded``, readable by flamegraph.pl and
+speedscope), plus a tracemalloc allocation snapshot (``*.alloc.txt``).
+Requests are selected by an admin header or by a sampling rate; when
+profiling is disabled the middleware is not installed at all.
+"""
+
+import hmac
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter
+from typing import List, Optional
+
+PROFILE_HEADER = "x-profile-token"
+PROFILE_ID_HEADER = "x-profile-id"
+TOP_ALLOCATIONS = 50
+
+# tracemalloc and the sampler are process-wide, so profile one request at a time.
+_profile_lock = threading.Lock()
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = frame.f_globals.get("__name__", os.path.basename(code.co_filename))
+    return f"{module}:{code.co_name}:{frame.f_lineno}"
+
+
+class StackSampler:
+    """Samples one thread's Python stack at a fixed interval."""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Collapsed-stack output: one ``frame;frame;frame count`` per line."""
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+def _format_allocations(snapshot: tracemalloc.Snapshot) -> str:
+    stats = snapshot.filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    )).statistics("lineno")
+    lines = [f"Top {TOP_ALLOCATIONS} allocation sites still live at end of request"]
+    for stat in stats[:TOP_ALLOCATIONS]:
+        frame = stat.traceback[0]
+        lines.append(f"{stat.size / 1024:10.1f} KiB {stat.count:8d} blocks  {frame.filename}:{frame.lineno}")
+    return "\n".join(lines) + "\n"
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles selected requests and stores the result on disk."""
+
+    def __init__(
+        self,
+        app,
+        output_dir: str,
+        admin_token: Optional[str] = None,
+        sample_rate: float = 0.0,
+        interval_ms: float = 5.0,
+    ):
+        self.app = app
+        self.output_dir = output_dir
+        self.admin_token = admin_token
+        self.sample_rate = sample_rate
+        self.interval = interval_ms / 1000
+        os.makedirs(output_dir, exist_ok=True)
+
+    def _should_profile(self, scope) -> bool:
+        if self.admin_token:
+            for name, value in scope.get("headers", []):
+                if name == PROFILE_HEADER.encode() and hmac.compare_digest(value, self.admin_token.encode()):
+                    return True
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        if not _profile_lock.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = f"{time.strftime('%Y%m%dT%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        sampler = StackSampler(threading.get_ident(), self.interval)
+        status_code = 500
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [
+                    (PROFILE_ID_HEADER.encode(), profile_id.encode())
+                ]
+            await send(message)
+
+        tracemalloc.start()
+        sampler.start()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            duration = time.perf_counter() - start
+            sampler.stop()
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+            _profile_lock.release()
+            self._write(profile_id, scope, status_code, duration, sampler, snapshot)
+
+    def _write(self, profile_id, scope, status_code, duration, sampler, snapshot) -> None:
+        base = os.path.join(self.output_dir, profile_id)
+        with open(f"{base}.folded", "w", encoding="utf-8") as f:
+            f.write(sampler.folded())
+        with open(f"{base}.alloc.txt", "w", encoding="utf-8") as f:
+            f.write(_format_allocations(snapshot))
+        with open(f"{base}.json", "w", encoding="utf-8") as f:
+            json.dump({
+                "id": profile_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status_code,
+                "duration_ms": round(duration * 1000, 2),
+                "samples": sum(sampler.stacks.values()),
+                "interval_ms": self.interval * 1000,
+            }, f)
+
+
+def list_profiles(output_dir: str) -> List[dict]:
+    """Return metadata for stored profiles, newest first."""
+    if not os.path.isdir(output_dir):
+        return []
+    profiles = []
+    for name in sorted(os.listdir(output_dir), reverse=True):
+        if name.endswith(".json"):
+            with open(os.path.join(output_dir, name), encoding="utf-8") as f:
+                profiles.append(json.load(f))
+    return profiles
@@ -1,34 +1,218 @@
-from typing import List, Optional
-from datetime import datetime
-
-from supabase import Client, create_client
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional
+import itertools
+import logging
+import os
+import secrets
+from datetime import date, datetime, timedelta
 
+from ..core import metrics
 from ..core.config import settings
+from ..core.lazy import LazyProxy
+from ..services import activity, archive, dedup, documents, quiz, readings, search, transfer
+from ..services.user_index import Changes, UserIndexRegistry
+
+if TYPE_CHECKING:
+    from supabase import Client
+
+logger = logging.getLogger(__name__)
+
+
+def _create_supabase_client() -> "Client":
+    from supabase import create_client
+
+    return create_client(settings.supabase_url, settings.supabase_service_key)
+
+
+IMPORT_BATCH_SIZE = 500
+EXPORT_PAGE_SIZE = 1000
+ACTIVITY_PAGE_DAYS = 90
+ARCHIVE_PAGE_SIZE = 5000
+ARCHIVE_CHUNK_ROWS = 100_000
+SYNC_PAGE_SIZE = 1000
+
+# Built on first use so importing the app doesn't pay for the supabase import.
+supabase: "Client" = LazyProxy(_create_supabase_client)
+
+
+def warm_up() -> None:
+    """Build the Supabase client and open a pooled connection to PostgREST."""
+    supabase.table("flashcard_sets").select("id").limit(1).execute()
+
+
+def _load_user_cards(user_id: str) -> Iterator[dict]:
+    for flashcard_set in get_flashcard_sets(user_id):
+        for card in flashcard_set.get("flashcards") or []:
+            yield {**card, "set_id": flashcard_set["id"]}
+
+
+# In-memory per-user card indexes, kept up to date by the write paths below.
+dedup_indexes: UserIndexRegistry[dedup.NearDuplicateIndex] = UserIndexRegistry(
+    lambda: dedup.NearDuplicateIndex(settings.dedup_threshold),
+    max_age_seconds=settings.card_index_ttl_seconds,
+    max_users=settings.card_index_max_users,
+)
+search_indexes: UserIndexRegistry[search.SearchIndex] = UserIndexRegistry(
+    search.SearchIndex,
+    max_age_seconds=settings.card_index_ttl_seconds,
+    max_users=settings.card_index_max_users,
+)
+_card_indexes = (dedup_indexes, search_indexes)
+
+
+def _card_changes(user_id: str, since: int) -> Changes:
+    """Cards the user wrote or removed since ``since``, to catch an index up.
+
+    None when a set was deleted: its cards leave no tombstones of their own,
+    so the index is rebuilt instead.
+    """
+    written: List[dict] = []
+    removed: List[int] = []
+    while True:
+        page = get_sync_changes(user_id, since)
+        if page["deleted_sets"]:
+            return None
+        written.extend(page["cards"])
+        removed.extend(page["deleted_cards"])
+        since = page["cursor"]
+        if not page["has_more"]:
+            return since, written, removed
+
+
+def _get_card_index(registry: UserIndexRegistry, user_id: str):
+    return registry.get(
+        user_id,
+        lambda: _load_user_cards(user_id),
+        # Every change at or above the horizon may be missing from the load.
+        version=lambda: sync_horizon() - 1,
+        load_changes=lambda since: _card_changes(user_id, since),
+    )
+
 
-supabase: Client = create_client(settings.supabase_url, settings.supabase_service_key)
+def get_dedup_index(user_id: str) -> dedup.NearDuplicateIndex:
+    """The user's near-duplicate index, built from their cards on first use."""
+    return _get_card_index(dedup_indexes, user_id)
 
 
+def get_search_index(user_id: str) -> search.SearchIndex:
+    """The user's full-text index, built from their cards on first use."""
+    return _get_card_index(search_indexes, user_id)
+
+
+# Distractor indexes per set; rebuilt whenever a set's cards change.
+quiz_indexes = quiz.QuizIndexCache()
+
+
+def _index_new_cards(user_id: str, cards: List[dict]) -> None:
+    for registry in _card_indexes:
+        registry.add_cards(user_id, cards)
+
+
+def _unindex_cards(user_id: str, card_ids: List[int]) -> None:
+    for registry in _card_indexes:
+        registry.remove_cards(user_id, card_ids)
+
+
+def _invalidate_card_indexes(user_id: str) -> None:
+    for registry in _card_indexes:
+        registry.invalidate(user_id)
+
+
+@metrics.timed("db.get_flashcard_sets")
 def get_flashcard_sets(user_id: str) -> List[dict]:
     result = supabase.table("flashcard_sets").select(
-        "id, title, description, owner_id, flashcards(id, front, back)"
+        "id, title, description, owner_id, flashcards(id, front, back, reading)"
     ).eq("owner_id", user_id).execute()
     return result.data if result.data else []
 
 
+@metrics.timed("db.get_flashcard_set")
 def get_flashcard_set(set_id: int, user_id: str) -> Optional[dict]:
     result = supabase.table("flashcard_sets").select(
-        "id, title, description, owner_id, flashcards(id, front, back)"
+        "id, title, description, owner_id, flashcards(id, front, back, reading)"
     ).eq("id", set_id).eq("owner_id", user_id).execute()
     return result.data[0] if result.data else None
 
 
+@metrics.timed("db.get_flashcard_set_info")
+def get_flashcard_set_info(set_id: int, user_id: str) -> Optional[dict]:
+    """The set's own fields, without loading its cards."""
+    result = supabase.table("flashcard_sets").select(
+        "id, title, description, owner_id"
+    ).eq("id", set_id).eq("owner_id", user_id).execute()
+    return result.data[0] if result.data else None
+
+
+def iter_flashcard_pages(set_id: int, page_size: int = EXPORT_PAGE_SIZE,
+                         columns: str = "id, front, back") -> Iterator[List[dict]]:
+    """A set's cards in id order, one page at a time (keyset pagination)."""
+    last_id = 0
+    while True:
+        with metrics.span("db.flashcards_page"):
+            result = supabase.table("flashcards").select(columns).eq(
+                "set_id", set_id
+            ).gt("id", last_id).order("id").limit(page_size).execute()
+        page = result.data or []
+        if page:
+            yield page
+        if len(page) < page_size:
+            return
+        last_id = page[-1]["id"]
+
+
+def import_flashcard_set(data: dict, cards: Iterable[dict], user_id: str,
+                         batch_size: int = IMPORT_BATCH_SIZE) -> Iterator[dict]:
+    """Create a set from a stream of cards, inserting ``batch_size`` at a time.
+
+    Yields a progress event after every batch and a final ``done`` event.
+    Cards missing a front or back are skipped. If anything fails (or the
+    consumer stops early) the partly imported set is deleted and the error
+    propagates.
+    """
+    set_result = supabase.table("flashcard_sets").insert({
+        "title": data.get("title"),
+        "description": data.get("description"),
+        "owner_id": user_id
+    }).execute()
+    if not set_result.data:
+        raise Exception("Failed to create flashcard set")
+    set_id = set_result.data[0]["id"]
+
+    imported = skipped = 0
+    try:
+        for batch in transfer.batched(cards, batch_size):
+            rows = readings.with_readings([
+                {"front": card["front"], "back": card["back"], "set_id": set_id}
+                for card in batch if card["front"] and card["back"]
+            ])
+            skipped += len(batch) - len(rows)
+            if rows:
+                with metrics.span("db.import_batch"):
+                    cards_result = supabase.table("flashcards").insert(rows).execute()
+                if not cards_result.data:
+                    raise Exception("Failed to insert flashcards")
+                _index_new_cards(user_id, cards_result.data)
+                imported += len(rows)
+            yield {"event": "progress", "set_id": set_id, "imported": imported, "skipped": skipped}
+    except BaseException:
+        supabase.table("flashcard_sets").delete().eq("id", set_id).execute()
+        _invalidate_card_indexes(user_id)
+        raise
+    yield {"event": "done", "set_id": set_id, "imported": imported, "skipped": skipped}
+
+
+@metrics.timed("db.delete_flashcard_set")
 def delete_flashcard_set(set_id: int, user_id: str) -> bool:
     result = supabase.table("flashcard_sets").delete().eq(
         "id", set_id
     ).eq("owner_id", user_id).execute()
+    if result.data:
+        # Cards go with the set via ON DELETE CASCADE; rebuild on next use.
+        _invalidate_card_indexes(user_id)
+        quiz_indexes.invalidate(set_id)
     return bool(result.data)
 
 
+@metrics.timed("db.create_flashcard_set")
 def create_flashcard_set(data: dict, user_id: str) -> dict:
     set_data = {
         "title": data.get("title"),
@@ -41,23 +225,42 @@ def create_flashcard_set(data: dict, user_id: str) -> dict:
         raise Exception("Failed to create flashcard set")
     
     new_set_id = set_result.data[0]["id"]
+
+    cards = data.get("cards", [])
+    if data.get("dedupe"):
+        cards = dedup.dedupe_cards(cards, settings.dedup_drop_threshold, get_dedup_index(user_id))
     
-    cards_to_insert = [
+    cards_to_insert = readings.with_readings([
         {
             "front": card["front"],
             "back": card["back"],
             "set_id": new_set_id
-        } for card in data.get("cards", [])
-    ]
+        } for card in cards
+    ])
+
+    # Cards generated from an upload carry their source page; recording the
+    # pages lets the set's first re-upload skip the ones that didn't change.
+    pages = {page["content_hash"]: page["page_number"] for page in data.get("pages") or []}
+    if pages:
+        for row, card in zip(cards_to_insert, cards):
+            source_page = card.get("source_page")
+            row["source_page"] = source_page if source_page in pages else None
     
     if cards_to_insert:
         cards_result = supabase.table("flashcards").insert(cards_to_insert).execute()
         if not cards_result.data:
             supabase.table("flashcard_sets").delete().eq("id", new_set_id).execute()
             raise Exception("Failed to create flashcards")
+        _index_new_cards(user_id, cards_result.data)
+
+    if pages:
+        supabase.table("flashcard_set_pages").upsert([
+            {"set_id": new_set_id, "content_hash": content_hash, "page_number": number}
+            for content_hash, number in pages.items()
+        ], on_conflict="set_id,content_hash").execute()
     
     result = supabase.table("flashcard_sets").select(
-        "id, title, description, owner_id, flashcards(id, front, back)"
+        "id, title, description, owner_id, flashcards(id, front, back, reading)"
     ).eq("id", new_set_id).execute()
     
     if not result.data:
@@ -66,8 +269,9 @@ def create_flashcard_set(data: dict, user_id: str) -> dict:
     return result.data[0]
 
 
+@metrics.timed("db.update_flashcard_set")
 def update_flashcard_set(set_id: int, data: dict, user_id: str) -> dict:
-    set_check = supabase.table("flashcard_sets").select("id").eq(
+    set_check = supabase.table("flashcard_sets").select("id, title, description").eq(
         "id", set_id
     ).eq("owner_id", user_id).execute()
     if not set_check.data:
@@ -77,7 +281,8 @@ def update_flashcard_set(set_id: int, data: dict, user_id: str) -> dict:
         "title": data.get("title"),
         "description": data.get("description")
     }
-    set_data = {k: v for k, v in set_data.items() if v is not None}
+    # Unchanged fields are left out so they don't bump the set's sync version.
+    set_data = {k: v for k, v in set_data.items() if v is not None and v != set_check.data[0].get(k)}
     
     if set_data:
         set_result = supabase.table("flashcard_sets").update(set_data).eq(
@@ -87,25 +292,10 @@ def update_flashcard_set(set_id: int, data: dict, user_id: str) -> dict:
             raise Exception("Failed to update flashcard set")
 
     if "cards" in data:
-        supabase.table("flashcards").delete().eq("set_id", set_id).execute()
-        
-        cards_to_insert = [
-            {
-                "front": card["front"],
-                "back": card["back"],
-                "set_id": set_id
-            } for card in data["cards"]
-        ]
-        
-        if cards_to_insert:
-            cards_result = supabase.table("flashcards").insert(
-                cards_to_insert
-            ).execute()
-            if not cards_result.data:
-                raise Exception("Failed to update flashcards")
+        _replace_set_cards(set_id, data["cards"], user_id, bool(data.get("dedupe")))
 
     result = supabase.table("flashcard_sets").select(
-        "id, title, description, owner_id, flashcards(id, front, back)"
+        "id, title, description, owner_id, flashcards(id, front, back, reading)"
     ).eq("id", set_id).execute()
     
     if not result.data:
@@ -114,9 +304,246 @@ def update_flashcard_set(set_id: int, data: dict, user_id: str) -> dict:
     return result.data[0]
 
 
+def _replace_set_cards(set_id: int, cards: List[dict], user_id: str, dedupe: bool) -> None:
+    """Make the set's cards match ``cards``, touching only what changed.
+
+    Cards carrying the id of one of the set's cards update it in place (and
+    only if its front or back changed), so its review progress and version
+    survive the edit. Cards without a known id are inserted and the set's
+    cards missing from ``cards`` are deleted.
+    """
+    result = supabase.table("flashcards").select("id, front, back").eq("set_id", set_id).execute()
+    existing = {card["id"]: card for card in result.data or []}
+
+    kept, changed, new_cards = set(), [], []
+    for card in cards:
+        card_id = card.get("id")
+        current = existing.get(card_id)
+        if current is None or card_id in kept:
+            new_cards.append(card)
+            continue
+        kept.add(card_id)
+        if (current["front"], current["back"]) != (card["front"], card["back"]):
+            changed.append({"id": card_id, "front": card["front"], "back": card["back"], "set_id": set_id})
+    removed = [card_id for card_id in existing if card_id not in kept]
+
+    _unindex_cards(user_id, removed + [card["id"] for card in changed])
+    if dedupe and new_cards:
+        new_cards = dedup.dedupe_cards(new_cards, settings.dedup_drop_threshold, get_dedup_index(user_id))
+    if not (changed or removed or new_cards):
+        return
+
+    quiz_indexes.invalidate(set_id)
+    if removed:
+        supabase.table("flashcards").delete().in_("id", removed).execute()
+    if changed:
+        updated = supabase.table("flashcards").upsert(
+            readings.with_readings(changed), on_conflict="id"
+        ).execute()
+        if not updated.data:
+            raise Exception("Failed to update flashcards")
+        _index_new_cards(user_id, updated.data)
+    rows = readings.with_readings(
+        [{"front": card["front"], "back": card["back"], "set_id": set_id} for card in new_cards]
+    )
+    if rows:
+        cards_result = supabase.table("flashcards").insert(rows).execute()
+        if not cards_result.data:
+            raise Exception("Failed to update flashcards")
+        _index_new_cards(user_id, cards_result.data)
+
+
+@metrics.timed("db.get_document_pages")
+def get_document_pages(set_id: int) -> List[str]:
+    """Content hashes of the document pages a set's cards were generated from."""
+    result = supabase.table("flashcard_set_pages").select("content_hash").eq(
+        "set_id", set_id
+    ).execute()
+    return [row["content_hash"] for row in result.data or []]
+
+
+@metrics.timed("db.splice_document_pages")
+def splice_document_pages(set_id: int, user_id: str, plan: documents.PagePlan,
+                          generated: Dict[str, List[dict]]) -> dict:
+    """Swap in the cards of regenerated pages and drop those of removed pages.
+
+    Cards of unchanged pages are not touched. Sets created from an upload
+    know their pages from the start; for older sets, a generated card that
+    repeats a card with no source page (same front, near-identical back)
+    takes over that card instead of adding a second copy, so their first
+    tracked re-upload doesn't double them.
+    """
+    quiz_indexes.invalidate(set_id)
+    removed_cards = []
+    if plan.removed:
+        deleted = supabase.table("flashcards").delete().eq("set_id", set_id).in_(
+            "source_page", plan.removed
+        ).execute()
+        removed_cards = [card["id"] for card in deleted.data or []]
+        _unindex_cards(user_id, removed_cards)
+        supabase.table("flashcard_set_pages").delete().eq("set_id", set_id).in_(
+            "content_hash", plan.removed
+        ).execute()
+
+    unattributed = dedup.NearDuplicateIndex(settings.dedup_threshold)
+    if any(generated.values()):
+        result = supabase.table("flashcards").select("id, front, back").eq(
+            "set_id", set_id
+        ).is_("source_page", "null").execute()
+        for card in result.data or []:
+            unattributed.add_card(card)
+
+    adopted: Dict[str, List[int]] = {}
+    rows = []
+    for page in plan.generate:
+        for card in generated.get(page.content_hash, []):
+            match = unattributed.find(
+                card["front"], card["back"], threshold=settings.dedup_drop_threshold, same_front=True
+            ) if len(unattributed) else None
+            if match is not None:
+                unattributed.remove(match[0])
+                adopted.setdefault(page.content_hash, []).append(match[0])
+            else:
+                rows.append({"front": card["front"], "back": card["back"],
+                             "set_id": set_id, "source_page": page.content_hash})
+
+    rows = readings.with_readings(rows)
+    for content_hash, card_ids in adopted.items():
+        supabase.table("flashcards").update({"source_page": content_hash}).in_(
+            "id", card_ids
+        ).execute()
+    for batch in transfer.batched(rows, IMPORT_BATCH_SIZE):
+        cards_result = supabase.table("flashcards").insert(batch).execute()
+        if not cards_result.data:
+            raise Exception("Failed to insert flashcards")
+        _index_new_cards(user_id, cards_result.data)
+
+    # Recorded last, so a failed splice regenerates the same pages on retry.
+    pages = plan.generate + plan.unchanged
+    if pages:
+        supabase.table("flashcard_set_pages").upsert([
+            {"set_id": set_id, "content_hash": page.content_hash, "page_number": page.number}
+            for page in pages
+        ], on_conflict="set_id,content_hash").execute()
+
+    return {
+        "set_id": set_id,
+        "pages": len(pages),
+        "regenerated_pages": len(plan.generate),
+        "unchanged_pages": len(plan.unchanged),
+        "removed_pages": len(plan.removed),
+        "cards_added": len(rows),
+        "cards_adopted": sum(len(ids) for ids in adopted.values()),
+        "cards_removed": len(removed_cards),
+    }
+
+
+def sync_horizon() -> int:
+    """Lowest version a still-running transaction may commit with."""
+    return supabase.rpc("sync_horizon", {}).execute().data
+
+
+@metrics.timed("db.get_sync_changes")
+def get_sync_changes(user_id: str, since: int = 0, limit: int = SYNC_PAGE_SIZE) -> dict:
+    """Sets, cards and deletions with a version above ``since``, oldest first.
+
+    Versions are the ids of the transactions that wrote the changes, and
+    only those of finished transactions are handed out, so a change that
+    commits late still lands above every cursor returned before it. Each of
+    the three is read up to ``limit`` rows by version; when one fills up,
+    the cursor stops at the lowest last version among the full ones and
+    anything above it is left for the next page, so no change is skipped;
+    ``has_more`` tells the client to ask again. See ``get_sync_changes`` in
+    migrations/add_sync.sql.
+    """
+    page = supabase.rpc("get_sync_changes", {
+        "p_user_id": user_id,
+        "p_since": since,
+        "p_limit": limit,
+    }).execute().data
+    deleted = page["deleted"]
+    return {
+        "cursor": page["cursor"],
+        "has_more": page["has_more"],
+        "sets": page["sets"],
+        "cards": page["cards"],
+        "deleted_sets": [row["object_id"] for row in deleted if row["kind"] == "set"],
+        "deleted_cards": [row["object_id"] for row in deleted if row["kind"] == "card"],
+    }
 
 
+@metrics.timed("db.find_near_duplicates")
+def find_near_duplicates(cards: List[dict], user_id: str) -> List[dict]:
+    """Flag cards that near-duplicate one the user already has."""
+    index = get_dedup_index(user_id)
+    matches = []
+    for position, card in enumerate(cards):
+        match = index.find(card["front"], card["back"])
+        if match is not None:
+            matches.append({
+                "index": position,
+                "duplicate_of": match[0],
+                "similarity": round(match[1], 3),
+            })
+    return matches
 
+
+@metrics.timed("db.search_cards")
+def search_cards(user_id: str, query: str, offset: int = 0, limit: int = 20) -> dict:
+    total, hits = get_search_index(user_id).search(query, offset, limit)
+    return {
+        "query": query,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "hits": [hit._asdict() for hit in hits],
+    }
+
+
+@metrics.timed("db.get_quiz")
+def get_quiz(set_id: int, user_id: str, offset: int = 0, limit: int = 10,
+             choices: int = 4, seed: Optional[int] = None) -> Optional[dict]:
+    """A page of multiple-choice questions for a set, or None if the set isn't the user's.
+
+    The cached index is checked against the set's card count and latest
+    card version (adds and edits bump the version, deletes the count), so a
+    page of a cached quiz costs two single-row reads however big the set.
+    Versions are transaction ids, so an index is only cached once every
+    transaction up to the latest version has finished; a write still in
+    flight then commits with a higher version and changes the marker.
+    """
+    found = supabase.table("flashcard_sets").select("card_count").eq(
+        "id", set_id
+    ).eq("owner_id", user_id).execute()
+    if not found.data:
+        return None
+    latest = supabase.table("flashcards").select("version").eq(
+        "set_id", set_id
+    ).order("version", desc=True).limit(1).execute()
+    marker = (found.data[0]["card_count"], latest.data[0]["version"] if latest.data else 0)
+    if seed is None:
+        seed = secrets.randbelow(2 ** 31)
+    with metrics.span("quiz.index"):
+        index = quiz_indexes.get(
+            set_id,
+            marker,
+            lambda: itertools.chain.from_iterable(
+                iter_flashcard_pages(set_id, columns="id, front, back, reading")
+            ),
+            is_settled=lambda: marker[1] < sync_horizon(),
+        )
+    total, questions = index.questions(seed, offset, limit, choices)
+    return {
+        "set_id": set_id,
+        "seed": seed,
+        "total": total,
+        "offset": offset,
+        "limit": limit,
+        "questions": questions,
+    }
+
+
+@metrics.timed("db.record_card_review")
 def record_card_review(review) -> dict:
     """Record a card review (Know/Don't Know)"""
     review_data = {
@@ -130,51 +557,254 @@ def record_card_review(review) -> dict:
     result = supabase.table("card_reviews").insert(review_data).execute()
     if not result.data:
         raise Exception("Failed to record card review")
-    
+
+    # The review is saved; a failed rollup only costs the heatmap a count.
+    try:
+        record_daily_activity(review.user_id, review.was_correct)
+    except Exception:
+        logger.warning("Failed to record daily activity", exc_info=True)
     return result.data[0]
 
 
-def get_study_progress(set_id: int, user_id: str) -> dict:
-    """Get study progress for a flashcard set"""
-    # Get total cards in set
-    set_result = supabase.table("flashcard_sets").select(
-        "id, flashcards(id)"
-    ).eq("id", set_id).eq("owner_id", user_id).execute()
-    
-    if not set_result.data:
-        raise Exception("Flashcard set not found")
-    
-    total_cards = len(set_result.data[0].get("flashcards", []))
-    
-    # Get reviews for this set
-    reviews_result = supabase.table("card_reviews").select(
-        "card_id, was_correct, reviewed_at"
-    ).eq("user_id", user_id).execute()
-    
-    reviews = reviews_result.data if reviews_result.data else []
-    
-    # Calculate stats
-    set_card_ids = [card["id"] for card in set_result.data[0].get("flashcards", [])]
-    set_reviews = [r for r in reviews if r["card_id"] in set_card_ids]
-    
-    cards_studied = len(set(r["card_id"] for r in set_reviews))
-    total_reviews = len(set_reviews)
-    correct_reviews = len([r for r in set_reviews if r["was_correct"]])
-    
+@metrics.timed("db.record_daily_activity")
+def record_daily_activity(user_id: str, was_correct: bool, day: Optional[date] = None) -> None:
+    """Count one review in the user's activity rollup for ``day`` (default today)."""
+    supabase.rpc("record_daily_activity", {
+        "p_user_id": user_id,
+        "p_date": (day or date.today()).isoformat(),
+        "p_reviews": 1,
+        "p_correct": int(was_correct),
+    }).execute()
+
+
+def _iter_active_days(user_id: str) -> Iterator[date]:
+    """The user's days with reviews, newest first, fetched a page at a time."""
+    before = None
+    while True:
+        query = supabase.table("user_daily_activity").select("activity_date").eq(
+            "user_id", user_id
+        ).gt("reviews", 0)
+        if before is not None:
+            query = query.lt("activity_date", before)
+        result = query.order("activity_date", desc=True).limit(ACTIVITY_PAGE_DAYS).execute()
+        rows = result.data or []
+        for row in rows:
+            yield date.fromisoformat(row["activity_date"])
+        if len(rows) < ACTIVITY_PAGE_DAYS:
+            return
+        before = rows[-1]["activity_date"]
+
+
+@metrics.timed("db.get_study_streak")
+def get_study_streak(user_id: str) -> int:
+    """Consecutive days (up to today) on which the user reviewed at least one card."""
+    return activity.current_streak(_iter_active_days(user_id), date.today())
+
+
+@metrics.timed("db.record_token_usage")
+def record_token_usage(user_id: str, usage_by_model: List[dict], day: Optional[date] = None) -> None:
+    """Add one request's per-model token counts to the user's daily usage."""
+    for usage in usage_by_model:
+        supabase.rpc("record_token_usage", {
+            "p_user_id": user_id,
+            "p_date": (day or date.today()).isoformat(),
+            "p_model": usage["model"],
+            "p_requests": usage["requests"],
+            "p_prompt_tokens": usage["prompt_tokens"],
+            "p_completion_tokens": usage["completion_tokens"],
+            "p_cached_tokens": usage["cached_tokens"],
+        }).execute()
+
+
+@metrics.timed("db.get_token_usage")
+def get_token_usage(user_id: str, days: int = 30) -> dict:
+    """The user's token spend per day and model for the last ``days`` days."""
+    today = date.today()
+    start = today - timedelta(days=days - 1)
+    result = supabase.table("user_token_usage").select(
+        "usage_date, model, requests, prompt_tokens, completion_tokens, cached_tokens"
+    ).eq("user_id", user_id).gte("usage_date", start.isoformat()).order("usage_date").execute()
+    rows = result.data or []
+    totals = {
+        field: sum(row[field] for row in rows)
+        for field in ("requests", "prompt_tokens", "completion_tokens", "cached_tokens")
+    }
+    return {"start": start, "end": today, "totals": totals, "days": rows}
+
+
+@metrics.timed("db.get_activity")
+def get_activity(user_id: str, days: int = 365) -> dict:
+    """Per-day review counts for the last ``days`` days, with streaks."""
+    today = date.today()
+    start = today - timedelta(days=days - 1)
+    result = supabase.table("user_daily_activity").select(
+        "activity_date, reviews, correct"
+    ).eq("user_id", user_id).gte("activity_date", start.isoformat()).order("activity_date").execute()
+    rows = result.data or []
+    active_days = [date.fromisoformat(row["activity_date"]) for row in rows if row["reviews"] > 0]
+
+    streak = activity.current_streak(reversed(active_days), today)
+    if streak >= days:
+        # The streak runs past the window; keep counting further back.
+        streak = get_study_streak(user_id)
+
+    return {
+        "start": start,
+        "end": today,
+        "current_streak": streak,
+        "longest_streak": activity.longest_streak(active_days),
+        "total_reviews": sum(row["reviews"] for row in rows),
+        "active_days": len(active_days),
+        "days": activity.heatmap(rows, start, today),
+    }
+
+
+def _study_progress(set_id: int, total_cards: int, summary: Optional[dict], streak: int) -> dict:
+    summary = summary or {}
+    total_reviews = summary.get("reviews") or 0
+    correct_reviews = summary.get("correct") or 0
     know_rate = (correct_reviews / total_reviews) * 100 if total_reviews > 0 else 0
-    
-    # Get last studied date
-    last_studied = None
-    if set_reviews:
-        last_studied = max(r["reviewed_at"] for r in set_reviews)
-    
     return {
         "set_id": set_id,
         "total_cards": total_cards,
-        "cards_studied": cards_studied,
+        "cards_studied": summary.get("cards_studied") or 0,
         "cards_known": correct_reviews,
         "know_rate": round(know_rate, 1),
         "total_reviews": total_reviews,
-        "last_studied_at": last_studied,
-        "study_streak": 0  # TODO: Implement streak calculation
+        "last_studied_at": summary.get("last_reviewed_at"),
+        "study_streak": streak
+    }
+
+
+@metrics.timed("db.get_study_progress")
+def get_study_progress(set_id: int, user_id: str) -> dict:
+    """Get study progress for a flashcard set"""
+    size_result = supabase.table("flashcard_set_sizes").select("set_id, total_cards").eq(
+        "set_id", set_id
+    ).eq("owner_id", user_id).execute()
+    if not size_result.data:
+        raise Exception("Flashcard set not found")
+
+    # Per-set totals over both raw and compacted reviews
+    summary_result = supabase.table("set_review_summary").select(
+        "set_id, cards_studied, reviews, correct, last_reviewed_at"
+    ).eq("user_id", user_id).eq("set_id", set_id).execute()
+    summary = summary_result.data[0] if summary_result.data else None
+
+    return _study_progress(set_id, size_result.data[0]["total_cards"], summary,
+                           get_study_streak(user_id))
+
+
+@metrics.timed("db.get_library_progress")
+def get_library_progress(user_id: str) -> List[dict]:
+    """Study progress for every set the user owns, from two grouped queries."""
+    size_result = supabase.table("flashcard_set_sizes").select("set_id, total_cards").eq(
+        "owner_id", user_id
+    ).order("set_id").execute()
+    summary_result = supabase.table("set_review_summary").select(
+        "set_id, cards_studied, reviews, correct, last_reviewed_at"
+    ).eq("user_id", user_id).execute()
+    summaries = {row["set_id"]: row for row in summary_result.data or []}
+    streak = get_study_streak(user_id)
+    return [
+        _study_progress(row["set_id"], row["total_cards"], summaries.get(row["set_id"]), streak)
+        for row in size_result.data or []
+    ]
+
+
+@metrics.timed("db.get_due_counts")
+def get_due_counts(user_id: str, on: Optional[date] = None) -> dict:
+    """New and due card counts for each of the user's sets, from the maintained index."""
+    on = on or date.today()
+    result = supabase.rpc("get_set_due_counts", {
+        "p_user_id": user_id, "p_date": on.isoformat()
+    }).execute()
+    sets = result.data or []
+    return {
+        "date": on,
+        "total_due": sum(row["new_cards"] + row["due_cards"] for row in sets),
+        "next_due_date": min((row["next_due_date"] for row in sets if row["next_due_date"]),
+                             default=None),
+        "sets": sets,
+    }
+
+
+@metrics.timed("db.get_due_forecast")
+def get_due_forecast(user_id: str, days: int = 14, start: Optional[date] = None) -> dict:
+    """Scheduled reviews per day over the next ``days`` days (overdue cards count today)."""
+    start = start or date.today()
+    result = supabase.rpc("get_due_forecast", {
+        "p_user_id": user_id, "p_date": start.isoformat(), "p_days": days
+    }).execute()
+    by_day = {row["due_date"]: row["cards"] for row in result.data or []}
+    return {
+        "start": start,
+        "days": [
+            {"date": day, "cards": by_day.get(day.isoformat(), 0)}
+            for day in (start + timedelta(days=offset) for offset in range(days))
+        ],
+    }
+
+
+@metrics.timed("db.rebuild_due_counts")
+def rebuild_due_counts(user_id: Optional[str] = None) -> int:
+    """Recompute card counts and due buckets from flashcards and SRS progress."""
+    result = supabase.rpc("rebuild_set_due_counts", {"p_user_id": user_id}).execute()
+    return result.data or 0
+
+
+def review_compaction_cutoff(retention_days: int, today: Optional[date] = None) -> date:
+    """Start of the month containing ``today - retention_days``.
+
+    Raw reviews before this date are archived and compacted; partitions are
+    monthly, so the cutoff is month-aligned.
+    """
+    keep_from = (today or date.today()) - timedelta(days=retention_days)
+    return keep_from.replace(day=1)
+
+
+def iter_reviews_before(before: date, page_size: int = ARCHIVE_PAGE_SIZE) -> Iterator[dict]:
+    """Raw reviews older than ``before`` in id order (keyset pagination)."""
+    last_id = 0
+    while True:
+        with metrics.span("db.reviews_page"):
+            result = supabase.table("card_reviews").select(
+                ", ".join(archive.REVIEW_COLUMNS)
+            ).lt("reviewed_at", before.isoformat()).gt("id", last_id).order("id").limit(page_size).execute()
+        rows = result.data or []
+        yield from rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+@metrics.timed("db.archive_and_compact_reviews")
+def archive_and_compact_reviews(before: date, archive_dir: str,
+                                chunk_rows: int = ARCHIVE_CHUNK_ROWS) -> dict:
+    """Archive raw reviews older than ``before``, then fold them into daily aggregates.
+
+    ``before`` is rounded down to the start of its month to match the
+    partition boundaries compaction works on. Archive files land in
+    ``archive_dir/card_reviews/before=<date>/`` and are written before
+    anything is compacted, so a failed run can simply be repeated.
+    Compaction deletes the raw rows, so ``archive_dir`` must be durable
+    storage and is required.
+    """
+    if not archive_dir:
+        raise ValueError("An archive directory is required before compacting reviews")
+    before = before.replace(day=1)
+    directory = os.path.join(archive_dir, "card_reviews", f"before={before.isoformat()}")
+    files = []
+    archived = 0
+    for number, rows in enumerate(transfer.batched(iter_reviews_before(before), chunk_rows)):
+        files.append(archive.write_review_chunk(rows, directory, f"part-{number:05d}"))
+        archived += len(rows)
+
+    compacted = supabase.rpc("compact_card_reviews", {"p_before": before.isoformat()}).execute()
+    supabase.rpc("ensure_card_review_partitions", {}).execute()
+    return {
+        "before": before,
+        "archived": archived,
+        "compacted": compacted.data or 0,
+        "files": files,
     }
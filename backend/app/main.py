@@ -1,11 +1,64 @@
+import asyncio
+import hmac
+import logging
 import os
-from fastapi import APIRouter, FastAPI
+from contextlib import asynccontextmanager
+from typing import Optional
+
+from fastapi import APIRouter, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 from uvicorn.middleware.proxy_headers import ProxyHeadersMiddleware
 
-from .api.routers import auth, flashcards, upload, reviews
+from .api.routers import activity, admin, auth, flashcards, progress, reviews, search, sync, upload, usage
+from .core import compression, metrics, profiling
+from .core.config import settings
+from .db import database
+from .services import services
+
+logger = logging.getLogger(__name__)
+
+
+def warm_up() -> None:
+    """Build external clients and open their connection pools ahead of traffic."""
+    for name, hook in (("supabase", database.warm_up), ("openrouter", services.warm_up)):
+        try:
+            hook()
+        except Exception as e:
+            logger.warning("Warm-up of %s failed: %s", name, e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Run in the background so the server starts accepting requests immediately;
+    # the lazy clients are thread-safe if a request races the warm-up.
+    if settings.warmup_on_startup:
+        asyncio.get_running_loop().run_in_executor(None, warm_up)
+    yield
 
-app = FastAPI(title="Flashcard Maker API", version="1.0.0")
+
+app = FastAPI(title="Flashcard Maker API", version="1.0.0", lifespan=lifespan)
+
+if settings.compression_enabled:
+    app.add_middleware(
+        compression.CompressionMiddleware,
+        encodings=[name.strip() for name in settings.compression_encodings.split(",") if name.strip()],
+        minimum_size=settings.compression_minimum_size,
+        cache_bytes=settings.compression_cache_bytes,
+    )
+
+metrics.configure(enabled=settings.metrics_enabled)
+if settings.metrics_enabled:
+    app.add_middleware(metrics.MetricsMiddleware)
+
+if settings.profiling_enabled:
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        output_dir=settings.profiling_dir,
+        admin_token=settings.profiling_admin_token,
+        sample_rate=settings.profiling_sample_rate,
+        interval_ms=settings.profiling_interval_ms,
+    )
 
 # Trust proxy headers (X-Forwarded-Proto, X-Forwarded-For)
 # This ensures HTTPS is preserved in redirects when behind Koyeb's proxy
@@ -31,6 +84,12 @@ api_router.include_router(auth.router)
 api_router.include_router(upload.router)
 api_router.include_router(flashcards.router)
 api_router.include_router(reviews.router)
+api_router.include_router(search.router)
+api_router.include_router(activity.router)
+api_router.include_router(progress.router)
+api_router.include_router(sync.router)
+api_router.include_router(usage.router)
+api_router.include_router(admin.router)
 
 
 
@@ -44,4 +103,20 @@ async def read_root():
 
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
\ No newline at end of file
+    return {"status": "healthy"}
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def metrics_endpoint(authorization: Optional[str] = Header(None)):
+    # Route names, error classes and token counts are not public: never serve
+    # them without a token.
+    if not settings.metrics_enabled or not settings.metrics_token:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    if not authorization or not hmac.compare_digest(
+        authorization.encode(), f"Bearer {settings.metrics_token}".encode()
+    ):
+        raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(
+        metrics.registry.render(),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -1,6 +1,6 @@
 from typing import List, Optional
-from datetime import datetime
-from pydantic import BaseModel
+from datetime import date, datetime
+from pydantic import BaseModel, Field
 
 
 class Token(BaseModel):
@@ -18,11 +18,21 @@ class GenerationConfig(BaseModel):
     back_language: str = "english"  # "english" or "vietnamese"
 
 
+class CardReading(BaseModel):
+    pinyin: str
+    numbered: str
+
+
 class Flashcard(BaseModel):
     id: Optional[int] = None
     front: str
     back: str
     set_id: Optional[int] = None
+    reading: Optional[CardReading] = None
+    source_page: Optional[str] = None
+    # Page number the model gave in a multi-page request; only used to set
+    # source_page, never sent to clients.
+    page: Optional[int] = Field(default=None, exclude=True)
 
 
 class FlashcardSet(BaseModel):
@@ -33,8 +43,98 @@ class FlashcardSet(BaseModel):
     flashcards: Optional[List[Flashcard]] = None
 
 
+class DocumentPageRef(BaseModel):
+    content_hash: str
+    page_number: int
+
+
 class FlashcardResponse(BaseModel):
     flashcards: List[Flashcard]
+    # Source pages of an uploaded document; pass them to set creation along
+    # with the cards so a later re-upload only regenerates changed pages.
+    pages: List[DocumentPageRef] = []
+
+
+class DocumentUpdateResponse(BaseModel):
+    set_id: int
+    pages: int
+    regenerated_pages: int
+    unchanged_pages: int
+    removed_pages: int
+    cards_added: int
+    cards_adopted: int
+    cards_removed: int
+
+
+class SyncSet(BaseModel):
+    id: int
+    title: str
+    description: Optional[str] = None
+    owner_id: str
+    version: int
+    updated_at: Optional[datetime] = None
+
+
+class SyncCard(BaseModel):
+    id: int
+    front: str
+    back: str
+    reading: Optional[CardReading] = None
+    set_id: int
+    version: int
+    updated_at: Optional[datetime] = None
+
+
+class SyncResponse(BaseModel):
+    cursor: int
+    has_more: bool
+    sets: List[SyncSet]
+    cards: List[SyncCard]
+    deleted_sets: List[int]
+    deleted_cards: List[int]
+
+
+class DuplicateCheckRequest(BaseModel):
+    cards: List[Flashcard]
+
+
+class DuplicateMatch(BaseModel):
+    index: int
+    duplicate_of: int
+    similarity: float
+
+
+class SearchHit(BaseModel):
+    card_id: int
+    set_id: int
+    front: str
+    back: str
+    score: float
+
+
+class SearchResponse(BaseModel):
+    query: str
+    total: int
+    offset: int
+    limit: int
+    hits: List[SearchHit]
+
+
+class QuizQuestion(BaseModel):
+    card_id: int
+    front: str
+    reading: Optional[CardReading] = None
+    choices: List[str]
+    answer_index: int
+
+
+class QuizResponse(BaseModel):
+    set_id: int
+    seed: int
+    total: int
+    offset: int
+    limit: int
+    questions: List[QuizQuestion]
 
 
 class Register(BaseModel):
@@ -69,3 +169,63 @@ class StudyProgress(BaseModel):
     total_reviews: int
     last_studied_at: Optional[datetime] = None
     study_streak: int = 0
+
+
+class SetDueCount(BaseModel):
+    set_id: int
+    total_cards: int
+    new_cards: int
+    due_cards: int
+    next_due_date: Optional[date] = None
+
+
+class DueCountsResponse(BaseModel):
+    date: date
+    total_due: int
+    next_due_date: Optional[date] = None
+    sets: List[SetDueCount]
+
+
+class ForecastDay(BaseModel):
+    date: date
+    cards: int
+
+
+class DueForecastResponse(BaseModel):
+    start: date
+    days: List[ForecastDay]
+
+
+class DailyActivity(BaseModel):
+    date: date
+    reviews: int
+    correct: int
+
+
+class ActivityResponse(BaseModel):
+    start: date
+    end: date
+    current_streak: int
+    longest_streak: int
+    total_reviews: int
+    active_days: int
+    days: List[DailyActivity]
+
+
+class TokenCounts(BaseModel):
+    requests: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+
+
+class DailyTokenUsage(TokenCounts):
+    usage_date: date
+    model: str
+
+
+class TokenUsageResponse(BaseModel):
+    start: date
+    end: date
+    totals: TokenCounts
+    days: List[DailyTokenUsage]
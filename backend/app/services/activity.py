@@ -0,0 +1,56 @@
+"""Streaks and heatmaps from per-day review counts.
+
+Reviews are rolled up into one ``user_daily_activity`` row per user and day
+as they are recorded, so everything here works on O(days) rows rather than
+the user's full review history.
+"""
+
+from datetime import date, timedelta
+from typing import Dict, Iterable, List, Optional
+
+
+def current_streak(active_days: Iterable[date], today: date) -> int:
+    """Consecutive active days ending today, or yesterday if today has no reviews yet.
+
+    ``active_days`` must be in descending order; iteration stops at the
+    first gap, so callers can feed it lazily.
+    """
+    yesterday = today - timedelta(days=1)
+    expected = today
+    streak = 0
+    for day in active_days:
+        if day > expected:
+            continue
+        if day < expected and not (streak == 0 and day == yesterday):
+            break
+        streak += 1
+        expected = day - timedelta(days=1)
+    return streak
+
+
+def longest_streak(active_days: Iterable[date]) -> int:
+    """Longest run of consecutive days in ``active_days`` (any order)."""
+    days = sorted(set(active_days))
+    longest = run = 0
+    previous: Optional[date] = None
+    for day in days:
+        run = run + 1 if previous is not None and day - previous == timedelta(days=1) else 1
+        longest = max(longest, run)
+        previous = day
+    return longest
+
+
+def heatmap(rows: Iterable[dict], start: date, end: date) -> List[dict]:
+    """One entry per day from ``start`` to ``end`` inclusive, zero-filled."""
+    by_day: Dict[str, dict] = {row["activity_date"]: row for row in rows}
+    days = []
+    day = start
+    while day <= end:
+        row = by_day.get(day.isoformat())
+        days.append({
+            "date": day,
+            "reviews": row["reviews"] if row else 0,
+            "correct": row["correct"] if row else 0,
+        })
+        day += timedelta(days=1)
+    return days
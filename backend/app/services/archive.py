@@ -0,0 +1,67 @@
+"""Columnar, compressed archive files for raw review logs.
+
+Chunks are written as Parquet (zstd) when pyarrow is installed and as
+compressed NumPy ``.npz`` column archives otherwise; both keep each column
+contiguous, so analysis jobs can load just the columns they need. Files are
+written under a temporary name and renamed into place, so a crashed run
+never leaves a half-written chunk behind.
+"""
+
+import os
+from typing import Dict, List
+
+# column -> numpy dtype for the .npz fallback
+REVIEW_COLUMNS: Dict[str, str] = {
+    "id": "int64",
+    "user_id": "str",
+    "card_id": "int64",
+    "was_correct": "bool",
+    "response_time_ms": "int32",
+    "reviewed_at": "str",
+}
+
+
+def archive_format() -> str:
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return "npz"
+    return "parquet"
+
+
+def write_review_chunk(rows: List[dict], directory: str, name: str) -> str:
+    """Write ``rows`` column-wise to ``directory/name.<ext>`` and return the path."""
+    os.makedirs(directory, exist_ok=True)
+    columns = {column: [row[column] for row in rows] for column in REVIEW_COLUMNS}
+    fmt = archive_format()
+    path = os.path.join(directory, f"{name}.{fmt}")
+    partial = f"{path}.partial"
+
+    if fmt == "parquet":
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        pq.write_table(pa.table(columns), partial, compression="zstd")
+    else:
+        import numpy as np
+
+        with open(partial, "wb") as f:
+            np.savez_compressed(f, **{
+                column: np.asarray(values, dtype=REVIEW_COLUMNS[column])
+                for column, values in columns.items()
+            })
+    os.replace(partial, path)
+    return path
+
+
+def read_review_chunk(path: str) -> Dict[str, list]:
+    """Columns of an archived chunk, as plain lists."""
+    if path.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        return pq.read_table(path).to_pydict()
+
+    import numpy as np
+
+    with np.load(path) as archive:
+        return {column: archive[column].tolist() for column in archive.files}
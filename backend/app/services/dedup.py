@@ -0,0 +1,211 @@
+"""Near-duplicate detection for flashcards using MinHash signatures and LSH banding.
+
+Each card's normalized ``front + back`` text is reduced to a set of character
+3-grams and summarized by a MinHash signature. Signatures are split into bands;
+cards sharing any band bucket become candidates, and candidates are confirmed
+by the fraction of matching signature slots (an estimate of Jaccard
+similarity). Lookups touch only the buckets of the query card, so cost does
+not grow with the size of the index.
+
+At ``DEFAULT_THRESHOLD`` matches are only flagged for the user: short cards
+like "A / the letter a" and "B / the letter b" share most of their 3-grams.
+``dedupe_cards`` drops a card only when it has the same normalized front as
+the match and clears the stricter ``DROP_THRESHOLD``.
+
+numpy is imported on first use to keep it off the startup path.
+"""
+
+import functools
+import threading
+import unicodedata
+import zlib
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+NUM_PERM = 48
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 3
+DEFAULT_THRESHOLD = 0.6
+DROP_THRESHOLD = 0.85
+_PRIME = (1 << 31) - 1
+
+
+def normalize(text: str) -> str:
+    """Case-fold, drop accents/tone marks and collapse punctuation to single spaces."""
+    text = unicodedata.normalize("NFKD", unicodedata.normalize("NFKC", text).casefold())
+    chars = []
+    for char in text:
+        if unicodedata.combining(char):
+            continue
+        chars.append(char if char.isalnum() else " ")
+    return " ".join("".join(chars).split())
+
+
+def shingles(front: str, back: str) -> List[int]:
+    """Hashed character n-grams of a card's normalized text."""
+    text = f"{normalize(front)} {normalize(back)}".strip()
+    if len(text) <= SHINGLE_SIZE:
+        grams = {text}
+    else:
+        grams = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    return [zlib.crc32(gram.encode("utf-8")) % _PRIME for gram in grams]
+
+
+@functools.lru_cache(maxsize=1)
+def _permutations():
+    import numpy as np
+
+    rng = np.random.default_rng(20240601)
+    a = rng.integers(1, _PRIME, size=NUM_PERM, dtype=np.uint64)
+    b = rng.integers(0, _PRIME, size=NUM_PERM, dtype=np.uint64)
+    return a[:, None], b[:, None]
+
+
+def signature(front: str, back: str):
+    """MinHash signature (``NUM_PERM`` uint32 values) for a card."""
+    import numpy as np
+
+    a, b = _permutations()
+    hashes = np.asarray(shingles(front, back), dtype=np.uint64)
+    return ((a * hashes[None, :] + b) % _PRIME).min(axis=1).astype(np.uint32)
+
+
+def _band_keys(sig) -> List[bytes]:
+    raw = sig.tobytes()
+    width = ROWS * sig.itemsize
+    return [raw[i * width:(i + 1) * width] for i in range(BANDS)]
+
+
+class NearDuplicateIndex:
+    """LSH index of card signatures keyed by card id.
+
+    Signatures live in one contiguous matrix so candidate verification is a
+    single vectorized comparison, even when a bucket holds many similar cards.
+    """
+
+    def __init__(self, threshold: float = DEFAULT_THRESHOLD):
+        self.threshold = threshold
+        self._bands: List[Dict[bytes, Set[int]]] = [{} for _ in range(BANDS)]
+        self._rows: Dict[int, int] = {}
+        self._card_ids: List[Optional[int]] = []
+        self._fronts: List[Optional[str]] = []
+        self._free_rows: List[int] = []
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def _allocate_row(self, card_id: int, front: str) -> int:
+        import numpy as np
+
+        if self._free_rows:
+            row = self._free_rows.pop()
+            self._card_ids[row] = card_id
+            self._fronts[row] = front
+            return row
+        row = len(self._card_ids)
+        if self._matrix is None:
+            self._matrix = np.zeros((64, NUM_PERM), dtype=np.uint32)
+        elif row >= len(self._matrix):
+            grown = np.zeros((len(self._matrix) * 2, NUM_PERM), dtype=np.uint32)
+            grown[:row] = self._matrix
+            self._matrix = grown
+        self._card_ids.append(card_id)
+        self._fronts.append(front)
+        return row
+
+    def add(self, card_id: int, front: str, back: str, sig=None) -> None:
+        if sig is None:
+            sig = signature(front, back)
+        with self._lock:
+            if card_id in self._rows:
+                self._remove_locked(card_id)
+            row = self._allocate_row(card_id, normalize(front))
+            self._matrix[row] = sig
+            self._rows[card_id] = row
+            for band, key in zip(self._bands, _band_keys(sig)):
+                band.setdefault(key, set()).add(row)
+
+    def add_card(self, card: dict) -> None:
+        self.add(card["id"], card["front"], card["back"])
+
+    def remove(self, card_id: int) -> None:
+        with self._lock:
+            self._remove_locked(card_id)
+
+    def _remove_locked(self, card_id: int) -> None:
+        row = self._rows.pop(card_id, None)
+        if row is None:
+            return
+        for band, key in zip(self._bands, _band_keys(self._matrix[row])):
+            bucket = band.get(key)
+            if bucket is None:
+                continue
+            bucket.discard(row)
+            if not bucket:
+                del band[key]
+        self._card_ids[row] = None
+        self._fronts[row] = None
+        self._free_rows.append(row)
+
+    def find(self, front: str, back: str, sig=None, threshold: Optional[float] = None,
+             same_front: bool = False) -> Optional[Tuple[int, float]]:
+        """Return ``(card_id, similarity)`` of the closest near-duplicate, if any.
+
+        ``threshold`` overrides the index's own; with ``same_front`` only
+        cards whose normalized front equals ``front``'s are considered.
+        """
+        import numpy as np
+
+        if sig is None:
+            sig = signature(front, back)
+        threshold = self.threshold if threshold is None else threshold
+        wanted_front = normalize(front) if same_front else None
+        with self._lock:
+            candidates = set()
+            for band, key in zip(self._bands, _band_keys(sig)):
+                bucket = band.get(key)
+                if bucket:
+                    candidates |= bucket
+            if wanted_front is not None:
+                candidates = {row for row in candidates if self._fronts[row] == wanted_front}
+            if not candidates:
+                return None
+            rows = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+            similarities = (self._matrix[rows] == sig).mean(axis=1)
+            best = int(similarities.argmax())
+            if similarities[best] < threshold:
+                return None
+            return self._card_ids[rows[best]], float(similarities[best])
+
+
+def _card_text(card) -> Tuple[str, str]:
+    if isinstance(card, dict):
+        return card["front"], card["back"]
+    return card.front, card.back
+
+
+def dedupe_cards(
+    cards: Iterable,
+    threshold: float = DROP_THRESHOLD,
+    existing: Optional[NearDuplicateIndex] = None,
+) -> List:
+    """Drop cards that repeat an earlier card in the batch or one in ``existing``.
+
+    A repeat has the same normalized front and a similarity of at least
+    ``threshold``; cards that are merely similar are kept (the duplicates
+    endpoint flags those for the user). Accepts ``Flashcard`` models or
+    ``{"front", "back"}`` dicts.
+    """
+    batch = NearDuplicateIndex(threshold)
+    unique = []
+    for position, card in enumerate(cards):
+        front, back = _card_text(card)
+        sig = signature(front, back)
+        if existing is not None and existing.find(front, back, sig, threshold, same_front=True) is not None:
+            continue
+        if batch.find(front, back, sig, same_front=True) is None:
+            batch.add(position, front, back, sig)
+            unique.append(card)
+    return unique
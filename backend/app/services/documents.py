@@ -0,0 +1,84 @@
+"""Page-level change detection for re-uploaded documents.
+
+An uploaded document is split into pages (PDF pages, text files and images
+each count as one) and every page is identified by a hash of its content.
+A set remembers the hashes of the pages its cards came from, and each card
+carries the hash of the page that produced it. When the document is uploaded
+again only pages with an unseen hash go to the model; cards of pages that
+disappeared are dropped and everything else is left alone, so the cost of a
+re-upload follows the size of the edit rather than the size of the document.
+
+Pages are matched by content, not position, so inserting or reordering pages
+does not regenerate the pages around them.
+"""
+
+import hashlib
+import io
+from dataclasses import dataclass, field
+from typing import Iterable, List, Optional
+
+
+@dataclass
+class DocumentPage:
+    number: int
+    content_hash: str
+    text: str = ""
+    image: Optional[bytes] = None
+
+    @property
+    def is_empty(self) -> bool:
+        return self.image is None and not self.text.strip()
+
+
+@dataclass
+class PagePlan:
+    """What a re-upload changes, relative to the pages a set already has."""
+
+    generate: List[DocumentPage] = field(default_factory=list)
+    unchanged: List[DocumentPage] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+
+def text_hash(text: str) -> str:
+    """Hash of a page's text, ignoring whitespace differences between extractions."""
+    return hashlib.blake2b(" ".join(text.split()).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def bytes_hash(data: bytes) -> str:
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+def pdf_page_texts(content: bytes) -> List[str]:
+    from pypdf import PdfReader
+
+    return [page.extract_text() or "" for page in PdfReader(io.BytesIO(content)).pages]
+
+
+def text_page(number: int, text: str) -> DocumentPage:
+    return DocumentPage(number, text_hash(text), text=text)
+
+
+def image_page(number: int, image: bytes) -> DocumentPage:
+    return DocumentPage(number, bytes_hash(image), image=image)
+
+
+def plan_pages(pages: Iterable[DocumentPage], known_hashes: Iterable[str]) -> PagePlan:
+    """Split ``pages`` into ones to generate and ones to keep, and list vanished hashes.
+
+    Repeated pages (same hash) are only generated once. Empty pages are
+    recorded but never sent to the model.
+    """
+    known = set(known_hashes)
+    plan = PagePlan()
+    seen = set()
+    for page in pages:
+        if page.content_hash in seen:
+            continue
+        seen.add(page.content_hash)
+        if page.content_hash in known:
+            plan.unchanged.append(page)
+        else:
+            plan.generate.append(page)
+    plan.removed = sorted(known - seen)
+    return plan
+
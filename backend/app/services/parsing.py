@@ -0,0 +1,116 @@
+"""Tolerant parsing of flashcard JSON produced by the model.
+
+Long generations are often cut off mid-card. Rather than rejecting the whole
+payload, :func:`extract_flashcards` keeps every complete ``{front, back}``
+object it can find and reports whether the output was truncated so the
+caller can ask the model for just the missing tail.
+"""
+
+import json
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+from ..models.models import Flashcard
+
+_decoder = json.JSONDecoder()
+_FENCE_OPEN = re.compile(r"^```[a-zA-Z]*\s*")
+_FLASHCARDS_KEY = re.compile(r'"flashcards"\s*:\s*\[')
+
+
+@dataclass
+class ParsedFlashcards:
+    flashcards: List[Flashcard] = field(default_factory=list)
+    # True when the payload was valid JSON in one of the expected shapes.
+    complete: bool = False
+    # True when the payload ended before the card list was closed.
+    truncated: bool = False
+    # Number of cards recovered from a payload that was not valid JSON.
+    salvaged: int = 0
+    # Objects that parsed but lacked a usable front/back.
+    skipped: int = 0
+
+
+def strip_code_fence(text: str) -> str:
+    text = _FENCE_OPEN.sub("", text.strip())
+    if text.endswith("```"):
+        text = text[:-3]
+    return text.strip()
+
+
+def _to_flashcard(item) -> Optional[Flashcard]:
+    if not isinstance(item, dict):
+        return None
+    front, back = item.get("front"), item.get("back")
+    if not isinstance(front, str) or not isinstance(back, str) or not front.strip():
+        return None
+    page = item.get("page")
+    if not isinstance(page, int) or isinstance(page, bool):
+        page = None
+    return Flashcard(front=front, back=back, page=page)
+
+
+def _collect(items, result: ParsedFlashcards) -> None:
+    for item in items:
+        card = _to_flashcard(item)
+        if card is None:
+            result.skipped += 1
+        else:
+            result.flashcards.append(card)
+
+
+def _scan_array(text: str, pos: int, result: ParsedFlashcards) -> None:
+    """Decode objects one by one from the array starting at ``pos``."""
+    length = len(text)
+    while True:
+        while pos < length and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= length:
+            result.truncated = True
+            return
+        if text[pos] == "]":
+            return
+        if text[pos] != "{":
+            # Garbage inside the array: nothing after it can be trusted.
+            result.truncated = True
+            return
+        try:
+            item, pos = _decoder.raw_decode(text, pos)
+        except json.JSONDecodeError:
+            result.truncated = True
+            return
+        card = _to_flashcard(item)
+        if card is None:
+            result.skipped += 1
+        else:
+            result.flashcards.append(card)
+            result.salvaged += 1
+
+
+def extract_flashcards(response_text: str) -> ParsedFlashcards:
+    """Extract every complete flashcard from possibly fenced or truncated output."""
+    text = strip_code_fence(response_text)
+    result = ParsedFlashcards()
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError:
+        data = None
+    else:
+        if isinstance(data, dict) and isinstance(data.get("flashcards"), list):
+            data = data["flashcards"]
+        if isinstance(data, list):
+            _collect(data, result)
+            result.complete = True
+            return result
+
+    match = _FLASHCARDS_KEY.search(text)
+    if match:
+        start = match.end()
+    else:
+        start = text.find("[")
+        if start == -1:
+            return result
+        start += 1
+    _scan_array(text, start, result)
+    return result
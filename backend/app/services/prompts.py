@@ -1,13 +1,34 @@
 """Prompt templates for flashcard generation."""
 
+import functools
 
-def get_flashcard_prompt(back_language: str = "english") -> str:
-    """Generate the prompt for flashcard creation based on user preferences."""
+
+@functools.lru_cache(maxsize=8)
+def get_flashcard_prompt(back_language: str = "english", local_readings: bool = False) -> str:
+    """The system prompt for flashcard creation, built once per back language.
+
+    It is sent byte-for-byte identical ahead of the variable content so
+    providers can serve it from their prompt-prefix cache. With
+    ``local_readings`` the backend adds pinyin itself (``readings.py``), so
+    the model is told to leave pinyin out of Chinese backs; other languages
+    still get their pronunciation from the model.
+    """
     
     language_instruction = {
         "english": "English translation/definition",
         "vietnamese": "Vietnamese translation/definition (bản dịch tiếng Việt)"
     }.get(back_language, "English translation/definition")
+
+    if local_readings:
+        pronunciation = ("Back should include a pronunciation guide for non-Chinese terms if applicable "
+                         "(e.g., romaji for Japanese, romanization for Korean); for Chinese give the "
+                         "meaning only, without pinyin (it is added automatically)")
+        chinese_example = 'front="你好", back="Hello"'
+        output_example = '{"front": "学习", "back": "to study, to learn"}'
+    else:
+        pronunciation = "Back should include meaning and pronunciation guide if applicable (e.g., pinyin for Chinese)"
+        chinese_example = 'front="你好", back="nǐ hǎo - Hello"'
+        output_example = '{"front": "学习", "back": "xué xí - to study, to learn"}'
     
     return f"""You are an expert flashcard creator. Analyze the provided content (text or images) and create effective flashcards for learning.
 
@@ -21,12 +42,12 @@ def get_flashcard_prompt(back_language: str = "english") -> str:
 3. **Quality guidelines**:
    - Keep cards atomic (one concept per card)
    - Front should be concise (1-5 words typically)
-   - Back should include meaning and pronunciation guide if applicable (e.g., pinyin for Chinese)
+   - {pronunciation}
    - For vocabulary: include part of speech if relevant
    - For concepts: provide clear, memorable definitions
 
 4. **Examples**:
-   - For Chinese text: front="你好", back="nǐ hǎo - Hello"
+   - For Chinese text: {chinese_example}
    - For technical terms: front="API", back="Application Programming Interface - a way for programs to communicate"
 
 ## Output Format
@@ -34,6 +55,14 @@ def get_flashcard_prompt(back_language: str = "english") -> str:
 Return a JSON object with a "flashcards" array. Each flashcard has "front" and "back" fields.
 
 Example:
-{{"flashcards": [{{"front": "学习", "back": "xué xí - to study, to learn"}}]}}
+{{"flashcards": [{output_example}]}}
+
+The user message contains the content to analyze."""
+
+
+def get_continuation_prompt(existing_cards) -> str:
+    """Ask the model to finish a card list that was cut off."""
+    last_front = existing_cards[-1].front if existing_cards else ""
+    return f"""Your previous response was cut off after {len(existing_cards)} complete flashcards (the last complete one has front="{last_front}").
 
-Now analyze the content and create flashcards:"""
\ No newline at end of file
+Continue from where you stopped: return ONLY the remaining flashcards that are not already listed, as a JSON object with a "flashcards" array in the same format. Do not repeat any flashcard from your previous response."""
@@ -0,0 +1,178 @@
+"""Multiple-choice quiz questions with distractors picked by answer similarity.
+
+Each card's answer (its back) becomes a TF-IDF vector of hashed character
+2- and 3-grams. The vectors are L2-normalized into one dense matrix and every
+card's nearest neighbours are found with blocked matrix products, so a set is
+indexed once and each quiz page afterwards is a lookup. Similar answers make
+better distractors than random ones: "xué sheng - student" is offered next to
+"xué xí - to study" rather than "fēi jī - airplane".
+
+Indexes are cached per set and keyed by a cheap marker of the set's state
+(its card count and latest card version), so a quiz page for a cached set
+loads no cards at all and the index is rebuilt only when the set changes.
+
+numpy is imported on first use to keep it off the startup path.
+"""
+
+import itertools
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+from .dedup import normalize
+
+DIMENSIONS = 512
+NGRAM_SIZES = (2, 3)
+NEIGHBOURS = 12
+BLOCK_ROWS = 512
+# Distractors are drawn at random from this many of the closest answers, so
+# repeat quizzes don't always offer the same three.
+POOL_FACTOR = 2
+
+
+def _ngram_ids(text: str) -> List[int]:
+    text = f" {normalize(text)} "
+    return [
+        zlib.crc32(text[i:i + size].encode("utf-8")) % DIMENSIONS
+        for size in NGRAM_SIZES
+        for i in range(len(text) - size + 1)
+    ]
+
+
+def tfidf_matrix(texts: Sequence[str]):
+    """L2-normalized TF-IDF rows (float32, ``len(texts) x DIMENSIONS``)."""
+    import numpy as np
+
+    ids = [_ngram_ids(text) for text in texts]
+    lengths = np.fromiter(map(len, ids), dtype=np.int64, count=len(ids))
+    rows = np.repeat(np.arange(len(ids)), lengths)
+    cols = np.fromiter(itertools.chain.from_iterable(ids), dtype=np.int64, count=int(lengths.sum()))
+
+    counts = np.zeros((len(ids), DIMENSIONS), dtype=np.float32)
+    np.add.at(counts, (rows, cols), 1.0)
+    df = np.count_nonzero(counts, axis=0)
+    idf = np.log((1 + len(ids)) / (1 + df)).astype(np.float32) + 1
+    vectors = np.log1p(counts) * idf
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1
+    return vectors / norms
+
+
+def nearest_neighbours(vectors, k: int):
+    """Indices of each row's ``k`` most similar other rows, closest first."""
+    import numpy as np
+
+    n = len(vectors)
+    k = min(k, n - 1)
+    result = np.empty((n, max(k, 0)), dtype=np.int32)
+    if k <= 0:
+        return result
+    for start in range(0, n, BLOCK_ROWS):
+        sims = vectors[start:start + BLOCK_ROWS] @ vectors.T
+        block = np.arange(len(sims))
+        sims[block, block + start] = -np.inf
+        top = np.argpartition(-sims, k - 1, axis=1)[:, :k]
+        order = np.argsort(-np.take_along_axis(sims, top, axis=1), axis=1, kind="stable")
+        result[start:start + len(sims)] = np.take_along_axis(top, order, axis=1)
+    return result
+
+
+class QuizIndex:
+    """Precomputed distractor candidates for one flashcard set."""
+
+    def __init__(self, cards: Sequence[dict], marker: Hashable = None):
+        cards = sorted(cards, key=lambda card: card["id"])
+        self.marker = marker
+        self.cards: List[Tuple[int, str, str]] = [
+            (card["id"], card["front"], card["back"]) for card in cards
+        ]
+        self.readings: List[Optional[dict]] = [card.get("reading") for card in cards]
+        self._answer_keys = [normalize(back) for _, _, back in self.cards]
+        self.neighbours = nearest_neighbours(
+            tfidf_matrix([back for _, _, back in self.cards]), NEIGHBOURS
+        )
+
+    def __len__(self) -> int:
+        return len(self.cards)
+
+    def questions(self, seed: int, offset: int = 0, limit: int = 10,
+                  choices: int = 4) -> Tuple[int, List[dict]]:
+        """Return ``(total, page)`` of questions in a seed-determined order.
+
+        The same seed gives the same order and the same choices for every
+        question, so a client can page through one quiz with repeated calls.
+        """
+        import numpy as np
+
+        order = np.random.default_rng(seed).permutation(len(self.cards))
+        page = []
+        for position in order[offset:offset + limit]:
+            position = int(position)
+            rng = np.random.default_rng([seed, position])
+            card_id, front, back = self.cards[position]
+            options = [back] + self._distractors(position, choices - 1, rng)
+            rng.shuffle(options)
+            page.append({
+                "card_id": card_id,
+                "front": front,
+                "reading": self.readings[position],
+                "choices": options,
+                "answer_index": options.index(back),
+            })
+        return len(self.cards), page
+
+    def _distractors(self, position: int, count: int, rng) -> List[str]:
+        seen = {self._answer_keys[position]}
+        pool = []
+        for other in self.neighbours[position]:
+            key = self._answer_keys[other]
+            if key not in seen:
+                seen.add(key)
+                pool.append(self.cards[other][2])
+            if len(pool) == count * POOL_FACTOR:
+                break
+        if len(pool) <= count:
+            return pool
+        picked = sorted(rng.choice(len(pool), size=count, replace=False))
+        return [pool[i] for i in picked]
+
+
+class QuizIndexCache:
+    """Bounded LRU of quiz indexes keyed by set id."""
+
+    def __init__(self, max_sets: int = 256):
+        self.max_sets = max_sets
+        self._indexes: "OrderedDict[int, QuizIndex]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, set_id: int, marker: Hashable, load_cards: Callable[[], Iterable[dict]],
+            is_settled: Callable[[], bool] = lambda: True) -> QuizIndex:
+        """The index for ``set_id``, rebuilt from ``load_cards`` if it was
+        built for a different ``marker``.
+
+        Read the marker before the cards: an index built from cards newer
+        than its marker is only rebuilt once more, never served stale. A
+        rebuilt index is only cached if ``is_settled()`` (checked before
+        loading) says no write that could commit under the marker is still
+        running.
+        """
+        with self._lock:
+            index = self._indexes.get(set_id)
+            if index is not None and index.marker == marker:
+                self._indexes.move_to_end(set_id)
+                return index
+        settled = is_settled()
+        index = QuizIndex(list(load_cards()), marker)
+        if not settled:
+            return index
+        with self._lock:
+            self._indexes[set_id] = index
+            self._indexes.move_to_end(set_id)
+            while len(self._indexes) > self.max_sets:
+                self._indexes.popitem(last=False)
+        return index
+
+    def invalidate(self, set_id: int) -> None:
+        with self._lock:
+            self._indexes.pop(set_id, None)
@@ -0,0 +1,68 @@
+"""Pinyin readings for card fronts, computed locally when cards are saved.
+
+A card whose front contains Chinese characters gets a ``reading`` such as
+``{"pinyin": "xué xí", "numbered": "xue2 xi2"}``, so the model no longer has
+to write pronunciations into the back and the client doesn't annotate fronts
+on every view.
+
+Fronts containing kana are Japanese and get no reading: their kanji would
+be given Mandarin readings. Kanji-only Japanese can't be told apart from
+Chinese by script and is still annotated.
+
+A card list is annotated in one pass: fronts are split into runs of Han
+characters and each distinct run is converted once (and memoized across
+calls). Runs are converted whole, so pypinyin can pick phrase readings, e.g.
+the 行 of 银行 vs 行走.
+
+pypinyin is optional and imported on first use. Without it cards are saved
+with no reading and the generation prompt keeps asking for pinyin.
+"""
+
+import importlib.util
+import re
+from functools import lru_cache
+from typing import List, Optional, Sequence, Tuple
+
+_HAN = re.compile(r"[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+")
+_KANA = re.compile(r"[\u3040-\u30ff]")
+
+
+@lru_cache(maxsize=None)
+def is_available() -> bool:
+    return importlib.util.find_spec("pypinyin") is not None
+
+
+@lru_cache(maxsize=65536)
+def _convert(run: str) -> Tuple[Tuple[str, ...], Tuple[str, ...]]:
+    from pypinyin import Style, lazy_pinyin
+
+    return (tuple(lazy_pinyin(run, style=Style.TONE)),
+            tuple(lazy_pinyin(run, style=Style.TONE3, neutral_tone_with_five=True)))
+
+
+def annotate(fronts: Sequence[str]) -> List[Optional[dict]]:
+    """The reading of each front, or None where it has no Chinese characters
+    or is Japanese."""
+    if not is_available():
+        return [None] * len(fronts)
+    runs_per_front = [[] if _KANA.search(front or "") else _HAN.findall(front or "")
+                      for front in fronts]
+    converted = {run: _convert(run) for run in {run for runs in runs_per_front for run in runs}}
+
+    readings: List[Optional[dict]] = []
+    for runs in runs_per_front:
+        if not runs:
+            readings.append(None)
+            continue
+        readings.append({
+            "pinyin": " ".join(syllable for run in runs for syllable in converted[run][0]),
+            "numbered": " ".join(syllable for run in runs for syllable in converted[run][1]),
+        })
+    return readings
+
+
+def with_readings(rows: List[dict]) -> List[dict]:
+    """Set ``reading`` on each card row from its front, in place; returns ``rows``."""
+    for row, reading in zip(rows, annotate([row["front"] for row in rows])):
+        row["reading"] = reading
+    return rows
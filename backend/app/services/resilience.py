@@ -0,0 +1,299 @@
+"""Retries, hedging, circuit breaking and fallback for LLM API calls.
+
+``call_with_fallback(call, models, ...)`` tries each model in order:
+
+* errors are classified first. Transient ones (timeouts, connection resets,
+  429 and 5xx) are retried with jittered backoff. Model-specific ones (400,
+  404, 413, 422: unknown model, unsupported input) move straight on to the
+  next model. Everything else (auth, billing, bugs) is raised immediately;
+* every model has a circuit breaker that opens after consecutive transient
+  failures. While it is open the model is skipped without a request, and
+  after ``reset_timeout`` one probe request decides whether it closes again;
+* once a model's latency distribution is known, an attempt still running
+  after that model's p95 gets a second, hedged request. Whichever finishes
+  first wins, which cuts the slow tail without doubling normal traffic.
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from concurrent.futures import wait
+from dataclasses import dataclass
+from typing import Callable, Deque, Dict, Optional, Sequence, TypeVar
+
+from ..core import metrics
+
+T = TypeVar("T")
+
+TRANSIENT = "transient"
+MODEL = "model"
+FATAL = "fatal"
+
+_TRANSIENT_STATUS = {408, 425, 429}
+_MODEL_STATUS = {400, 404, 413, 422}
+# Exception class names (anywhere in the MRO) for network-level failures, so
+# openai/httpx don't have to be imported to recognise them.
+_TRANSIENT_NAMES = {"APIConnectionError", "APITimeoutError", "TransportError", "TimeoutException"}
+
+
+class TransientError(Exception):
+    """A failure worth retrying, e.g. an empty or cut-off provider response."""
+
+
+class CircuitOpenError(Exception):
+    """Raised when every candidate model's circuit breaker is open."""
+
+
+def classify_error(exc: BaseException) -> str:
+    """``TRANSIENT``, ``MODEL`` or ``FATAL`` for an exception from an API call."""
+    if isinstance(exc, TransientError):
+        return TRANSIENT
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        if status in _TRANSIENT_STATUS or status >= 500:
+            return TRANSIENT
+        if status in _MODEL_STATUS:
+            return MODEL
+        return FATAL
+    if isinstance(exc, (TimeoutError, ConnectionError)):
+        return TRANSIENT
+    if any(cls.__name__ in _TRANSIENT_NAMES for cls in type(exc).__mro__):
+        return TRANSIENT
+    return FATAL
+
+
+def _retry_after(exc: BaseException) -> Optional[float]:
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open (one probe) -> closed."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.reset_timeout:
+            return "half_open"
+        return "open"
+
+    def allow(self) -> bool:
+        """Whether a request may be sent now (claims the probe when half-open)."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._probing or self._clock() - self._opened_at < self.reset_timeout:
+                return False
+            self._probing = True
+            return True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Give up a claimed probe without a verdict, so the next call may probe."""
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> bool:
+        """Count a failure; returns True if this opened the breaker."""
+        with self._lock:
+            self._failures += 1
+            if self._probing or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = self._clock()
+                self._probing = False
+                return True
+            return False
+
+
+class LatencyWindow:
+    """The most recent successful call latencies for one model."""
+
+    MIN_SAMPLES = 20
+
+    def __init__(self, size: int = 200):
+        self._samples: Deque[float] = deque(maxlen=size)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def observe(self, seconds: float) -> None:
+        with self._lock:
+            self._samples.append(seconds)
+
+    def percentile(self, q: float) -> Optional[float]:
+        """The ``q``-th percentile, or None until there are ``MIN_SAMPLES`` samples."""
+        with self._lock:
+            if len(self._samples) < self.MIN_SAMPLES:
+                return None
+            ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(q / 100 * len(ordered)))]
+
+
+class ModelHealth:
+    def __init__(self, breaker: CircuitBreaker):
+        self.breaker = breaker
+        self.latency = LatencyWindow()
+
+
+class ModelHealthRegistry:
+    """Breaker and latency window per model, created on first use."""
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._models: Dict[str, ModelHealth] = {}
+        self._lock = threading.Lock()
+
+    def __getitem__(self, model: str) -> ModelHealth:
+        health = self._models.get(model)
+        if health is None:
+            with self._lock:
+                health = self._models.setdefault(
+                    model, ModelHealth(CircuitBreaker(self.failure_threshold, self.reset_timeout))
+                )
+        return health
+
+    def snapshot(self) -> Dict[str, dict]:
+        return {
+            model: {
+                "breaker": health.breaker.state,
+                "samples": len(health.latency),
+                "p50_seconds": health.latency.percentile(50),
+                "p95_seconds": health.latency.percentile(95),
+            }
+            for model, health in list(self._models.items())
+        }
+
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 2
+    backoff_base: float = 0.5
+    backoff_max: float = 4.0
+    hedge: bool = True
+    hedge_min_delay: float = 2.0
+
+    def backoff(self, attempt: int, exc: BaseException) -> float:
+        retry_after = _retry_after(exc)
+        if retry_after is not None and 0 <= retry_after <= self.backoff_max:
+            return retry_after
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _hedge_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-hedge")
+    return _executor
+
+
+def _timed(call: Callable[[str], T], model: str, health: ModelHealth) -> T:
+    start = time.perf_counter()
+    result = call(model)
+    health.latency.observe(time.perf_counter() - start)
+    return result
+
+
+def _attempt(call: Callable[[str], T], model: str, health: ModelHealth, policy: RetryPolicy) -> T:
+    """One attempt, hedged with a second request if it outlives the model's p95."""
+    p95 = health.latency.percentile(95) if policy.hedge else None
+    if p95 is None:
+        return _timed(call, model, health)
+
+    executor = _hedge_executor()
+    primary = executor.submit(_timed, call, model, health)
+    try:
+        return primary.result(timeout=max(p95, policy.hedge_min_delay))
+    except FutureTimeout:
+        pass
+
+    hedge = executor.submit(_timed, call, model, health)
+    pending = {primary, hedge}
+    error: Optional[BaseException] = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if metrics.is_enabled():
+                    metrics.LLM_HEDGES.inc(model=model, winner="hedge" if future is hedge else "primary")
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def call_with_fallback(
+    call: Callable[[str], T],
+    models: Sequence[str],
+    health: ModelHealthRegistry,
+    policy: Optional[RetryPolicy] = None,
+    sleep: Callable[[float], None] = time.sleep,
+) -> T:
+    """Run ``call(model)`` against ``models`` in order until one succeeds."""
+    policy = policy or RetryPolicy()
+    last_error: Optional[BaseException] = None
+    for position, model in enumerate(models):
+        model_health = health[model]
+        if not model_health.breaker.allow():
+            last_error = last_error or CircuitOpenError(f"Circuit open for {model}")
+            continue
+        if position and metrics.is_enabled():
+            metrics.LLM_FALLBACKS.inc(model=model)
+
+        for attempt in range(policy.max_attempts):
+            try:
+                result = _attempt(call, model, model_health, policy)
+            except Exception as exc:
+                kind = classify_error(exc)
+                if metrics.is_enabled():
+                    metrics.LLM_ERRORS.inc(model=model, kind=kind)
+                if kind != TRANSIENT:
+                    # Says nothing about availability: leave the failure count
+                    # and open/closed state alone, only free a half-open probe.
+                    model_health.breaker.release_probe()
+                if kind == FATAL:
+                    raise
+                last_error = exc
+                if kind == TRANSIENT and model_health.breaker.record_failure() and metrics.is_enabled():
+                    metrics.LLM_BREAKER_TRIPS.inc(model=model)
+                if (kind == MODEL or attempt + 1 >= policy.max_attempts
+                        or not model_health.breaker.allow()):
+                    break
+                if metrics.is_enabled():
+                    metrics.LLM_RETRIES.inc(model=model)
+                sleep(policy.backoff(attempt, exc))
+                continue
+            model_health.breaker.record_success()
+            return result
+
+    raise last_error or CircuitOpenError("No models configured")
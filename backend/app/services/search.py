@@ -0,0 +1,156 @@
+"""Incremental inverted index for full-text search over a user's cards.
+
+Tokenization is CJK-aware and pinyin-insensitive:
+
+* runs of CJK characters are indexed as character unigrams and bigrams, so
+  "学习" matches cards containing "学习" or just "学";
+* Latin text is case-folded with accents and tone marks removed (and tone
+  numbers like ``xue2`` dropped), then indexed as words plus joined pairs of
+  adjacent words, so "xuexi", "xue xi" and "xué xí" all match each other.
+
+A card's stored pinyin reading is indexed along with its back.
+
+Hits are ranked with BM25, counting front terms twice.
+"""
+
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from typing import Dict, List, NamedTuple, Tuple
+
+K1 = 1.2
+B = 0.75
+FRONT_WEIGHT = 2
+MIN_SHOULD_MATCH = 0.5
+
+# CJK ideographs, kana and hangul syllables
+_CJK = r"\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\u3040-\u30ff\uac00-\ud7af"
+_RUNS = re.compile(rf"[{_CJK}]+|[^\W{_CJK}]+")
+_IS_CJK = re.compile(rf"[{_CJK}]")
+_TONE_NUMBER = re.compile(r"(?<=[a-z])[1-5]$")
+
+
+def _fold(text: str) -> str:
+    text = unicodedata.normalize("NFKD", unicodedata.normalize("NFKC", text).casefold())
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return unicodedata.normalize("NFC", text)
+
+
+def tokenize(text: str) -> List[str]:
+    """Index terms for ``text`` (with repeats, for term frequency)."""
+    terms: List[str] = []
+    words: List[str] = []
+    for run in _RUNS.findall(_fold(text)):
+        if _IS_CJK.match(run):
+            terms.extend(run)
+            terms.extend(run[i:i + 2] for i in range(len(run) - 1))
+            words = []
+            continue
+        word = _TONE_NUMBER.sub("", run).replace("_", "")
+        if not word:
+            continue
+        terms.append(word)
+        if words:
+            terms.append(words[-1] + word)
+        words.append(word)
+    return terms
+
+
+class SearchHit(NamedTuple):
+    card_id: int
+    set_id: int
+    front: str
+    back: str
+    score: float
+
+
+class _Doc(NamedTuple):
+    set_id: int
+    front: str
+    back: str
+    terms: Dict[str, int]
+    length: int
+
+
+class SearchIndex:
+    """BM25-ranked inverted index of one user's cards."""
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[int, int]] = {}
+        self._docs: Dict[int, _Doc] = {}
+        self._total_length = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add_card(self, card: dict) -> None:
+        reading = (card.get("reading") or {}).get("pinyin", "")
+        self.add(card["id"], card["set_id"], card["front"], card["back"], reading)
+
+    def add(self, card_id: int, set_id: int, front: str, back: str, reading: str = "") -> None:
+        terms: Dict[str, int] = {}
+        for term in tokenize(front):
+            terms[term] = terms.get(term, 0) + FRONT_WEIGHT
+        for term in tokenize(back) + tokenize(reading):
+            terms[term] = terms.get(term, 0) + 1
+        doc = _Doc(set_id, front, back, terms, sum(terms.values()))
+        with self._lock:
+            if card_id in self._docs:
+                self._remove_locked(card_id)
+            self._docs[card_id] = doc
+            self._total_length += doc.length
+            for term, tf in terms.items():
+                self._postings.setdefault(term, {})[card_id] = tf
+
+    def remove(self, card_id: int) -> None:
+        with self._lock:
+            self._remove_locked(card_id)
+
+    def _remove_locked(self, card_id: int) -> None:
+        doc = self._docs.pop(card_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc.length
+        for term in doc.terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(card_id, None)
+                if not posting:
+                    del self._postings[term]
+
+    def search(self, query: str, offset: int = 0, limit: int = 20) -> Tuple[int, List[SearchHit]]:
+        """Return ``(total_hits, page)`` for ``query``, best matches first."""
+        query_terms = set(tokenize(query))
+        if not query_terms:
+            return 0, []
+        with self._lock:
+            n_docs = len(self._docs)
+            if not n_docs:
+                return 0, []
+            avg_length = self._total_length / n_docs
+            scores: Dict[int, float] = {}
+            matched: Dict[int, int] = {}
+            for term in query_terms:
+                posting = self._postings.get(term)
+                if not posting:
+                    continue
+                idf = math.log(1 + (n_docs - len(posting) + 0.5) / (len(posting) + 0.5))
+                for card_id, tf in posting.items():
+                    length = self._docs[card_id].length
+                    score = idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / avg_length))
+                    scores[card_id] = scores.get(card_id, 0.0) + score
+                    matched[card_id] = matched.get(card_id, 0) + 1
+
+            required = max(1, math.ceil(len(query_terms) * MIN_SHOULD_MATCH))
+            hits = [card_id for card_id, count in matched.items() if count >= required]
+            top = heapq.nsmallest(
+                offset + limit, hits, key=lambda card_id: (-scores[card_id], card_id)
+            )
+            page = []
+            for card_id in top[offset:]:
+                doc = self._docs[card_id]
+                page.append(SearchHit(card_id, doc.set_id, doc.front, doc.back, round(scores[card_id], 4)))
+        return len(hits), page
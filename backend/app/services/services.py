@@ -1,21 +1,50 @@
 """Flashcard generation services using OpenRouter (google/gemini-3-flash-preview)."""
 
+import asyncio
 import base64
-import json
-from typing import List, Optional
-
-from openai import OpenAI
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Dict, List, Optional, Tuple
 
+from ..core import metrics
 from ..core.config import settings
-from ..models.models import Flashcard, FlashcardResponse, GenerationConfig
-from .prompts import get_flashcard_prompt
+from ..core.lazy import LazyProxy
+from ..models.models import CardReading, DocumentPageRef, Flashcard, FlashcardResponse, GenerationConfig
+from . import dedup, documents, readings, resilience
+from .documents import DocumentPage
+from .parsing import extract_flashcards
+from .prompts import get_continuation_prompt, get_flashcard_prompt
+from .usage import TokenUsage
 
-# Initialize OpenRouter client (OpenAI-compatible API)
-client = OpenAI(
-    base_url="https://openrouter.ai/api/v1",
-    api_key=settings.openrouter_api_key,
-)
+logger = logging.getLogger(__name__)
+
+if TYPE_CHECKING:
+    from openai import OpenAI
+
+
+def _create_openrouter_client() -> "OpenAI":
+    from openai import OpenAI
+
+    return OpenAI(
+        base_url=settings.openrouter_base_url,
+        api_key=settings.openrouter_api_key,
+        timeout=settings.llm_timeout_seconds,
+        # Retries, fallback and hedging are handled in call_openrouter_with_retry.
+        max_retries=0,
+    )
+
+
+# OpenRouter client (OpenAI-compatible API), built on first use
+client: "OpenAI" = LazyProxy(_create_openrouter_client)
+
+
+def warm_up() -> None:
+    """Build the OpenRouter client and open a pooled connection to the API."""
+    client.models.list()
 
 
 class FlashcardGenerationError(Exception):
@@ -32,7 +61,8 @@ def create_image_content(images: List[bytes]) -> List[dict]:
     """Create image content parts for the API request."""
     content = []
     for image in images:
-        base64_image = image_to_base64(image)
+        with metrics.span("image.base64_encode"):
+            base64_image = image_to_base64(image)
         content.append({
             "type": "image_url",
             "image_url": {
@@ -42,93 +72,369 @@ def create_image_content(images: List[bytes]) -> List[dict]:
     return content
 
 
-@retry(
-    stop=stop_after_attempt(3),
-    wait=wait_exponential(multiplier=1, min=2, max=10),
-    retry=retry_if_exception_type((Exception,)),
-    reraise=True
+# Circuit breaker and latency window per model
+model_health = resilience.ModelHealthRegistry(
+    failure_threshold=settings.llm_breaker_failures,
+    reset_timeout=settings.llm_breaker_reset_seconds,
 )
+
+
+# Rough token costs for routing decisions: CJK text is about one token per
+# character, other text about four characters per token, and an image is
+# billed as a fixed block by most vision models.
+_CJK_CHAR = re.compile(r"[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+TOKENS_PER_IMAGE = 800
+
+
+def estimate_input(messages: List[dict]) -> Tuple[int, int]:
+    """Estimated ``(prompt_tokens, image_count)`` for a chat request."""
+    tokens = images = 0
+    for message in messages:
+        content = message["content"]
+        parts = [{"type": "text", "text": content}] if isinstance(content, str) else content
+        for part in parts:
+            if part.get("type") == "image_url":
+                images += 1
+                continue
+            text = part.get("text", "")
+            cjk = len(_CJK_CHAR.findall(text))
+            tokens += cjk + (len(text) - cjk + 3) // 4
+    return tokens + images * TOKENS_PER_IMAGE, images
+
+
+@dataclass
+class RouteDecision:
+    tier: str
+    model: str
+    reason: str
+    estimated_tokens: int
+    images: int
+
+
+_route_counts: Counter = Counter()
+_route_lock = threading.Lock()
+
+
+def model_tiers() -> Dict[str, str]:
+    """Configured tiers: ``capable`` always, ``fast`` when a fast model is set."""
+    tiers = {"capable": settings.openrouter_model}
+    if settings.openrouter_fast_model:
+        tiers["fast"] = settings.openrouter_fast_model
+    return tiers
+
+
+def route_request(messages: List[dict]) -> RouteDecision:
+    """Pick the model tier for a request from its size, modality and observed latency.
+
+    Small requests go to the fast tier unless it is down or currently slower
+    than the capable tier; everything else goes to the capable tier.
+    """
+    tokens, images = estimate_input(messages)
+    tiers = model_tiers()
+
+    def decide(tier: str, reason: str) -> RouteDecision:
+        with _route_lock:
+            _route_counts[(tier, reason)] += 1
+        if metrics.is_enabled():
+            metrics.LLM_ROUTES.inc(tier=tier, reason=reason)
+        return RouteDecision(tier, tiers[tier], reason, tokens, images)
+
+    if "fast" not in tiers:
+        return decide("capable", "single_tier")
+    if tokens > settings.routing_fast_max_tokens or images > settings.routing_fast_max_images:
+        return decide("capable", "large_input")
+
+    fast = model_health[tiers["fast"]]
+    if fast.breaker.state == "open":
+        return decide("capable", "fast_unavailable")
+    fast_p50 = fast.latency.percentile(50)
+    capable_p50 = model_health[tiers["capable"]].latency.percentile(50)
+    if fast_p50 is not None and capable_p50 is not None and fast_p50 > capable_p50:
+        return decide("capable", "fast_slower")
+    return decide("fast", "small_input")
+
+
+def routing_stats() -> dict:
+    """Tier configuration, decision counts and per-model health and latency."""
+    with _route_lock:
+        decisions = [
+            {"tier": tier, "reason": reason, "count": count}
+            for (tier, reason), count in sorted(_route_counts.items())
+        ]
+    return {
+        "tiers": model_tiers(),
+        "fallbacks": candidate_models()[1:],
+        "limits": {
+            "fast_max_tokens": settings.routing_fast_max_tokens,
+            "fast_max_images": settings.routing_fast_max_images,
+        },
+        "decisions": decisions,
+        "models": model_health.snapshot(),
+    }
+
+
+def candidate_models(primary: Optional[str] = None) -> List[str]:
+    """``primary`` (default: the capable model), the other tier, then the fallbacks, in order."""
+    models = [primary or settings.openrouter_model]
+    configured = [settings.openrouter_model, settings.openrouter_fast_model or ""]
+    configured += settings.openrouter_fallback_models.split(",")
+    for model in configured:
+        model = model.strip()
+        if model and model not in models:
+            models.append(model)
+    return models
+
+
 def call_openrouter_with_retry(
     messages: List[dict],
-    config: Optional[GenerationConfig] = None
+    config: Optional[GenerationConfig] = None,
+    usage: Optional[TokenUsage] = None
 ) -> str:
-    """Call OpenRouter API with retry logic."""
-    response = client.chat.completions.create(
-        model=settings.openrouter_model,
-        messages=messages,
-        temperature=0.3,
-        response_format={"type": "json_object"},
+    """Route the request to a model tier, retrying transient errors and falling back to other models."""
+    route = route_request(messages)
+    logger.debug(
+        "Routing ~%d tokens / %d images to %s (%s): %s",
+        route.estimated_tokens, route.images, route.tier, route.reason, route.model,
     )
-    
+    policy = resilience.RetryPolicy(
+        max_attempts=settings.llm_max_attempts,
+        hedge=settings.llm_hedge_enabled,
+        hedge_min_delay=settings.llm_hedge_min_delay_seconds,
+    )
+    return resilience.call_with_fallback(
+        lambda model: _call_openrouter(messages, model, usage),
+        candidate_models(route.model),
+        model_health,
+        policy,
+    )
+
+
+def _call_openrouter(messages: List[dict], model: str, usage: Optional[TokenUsage] = None) -> str:
+    start = time.perf_counter()
+    try:
+        response = client.chat.completions.create(
+            model=model,
+            messages=messages,
+            temperature=0.3,
+            response_format={"type": "json_object"},
+        )
+    except Exception:
+        if metrics.is_enabled():
+            metrics.LLM_LATENCY.observe(time.perf_counter() - start, model=model, outcome="error")
+        raise
+    if metrics.is_enabled():
+        metrics.LLM_LATENCY.observe(time.perf_counter() - start, model=model, outcome="ok")
+    metrics.record_llm_usage(model, getattr(response, "usage", None))
+    if usage is not None:
+        usage.add(model, getattr(response, "usage", None))
+
+    if not response.choices or not response.choices[0].message.content:
+        raise resilience.TransientError(f"Empty response from {model}")
     return response.choices[0].message.content
 
 
 def parse_flashcards_response(response_text: str) -> List[Flashcard]:
-    """Parse the JSON response into Flashcard objects."""
-    text = response_text.strip()
-    
-    # Clean up response if wrapped in markdown
-    if text.startswith("```json"):
-        text = text[7:]
-    if text.startswith("```"):
-        text = text[3:]
-    if text.endswith("```"):
-        text = text[:-3]
-    text = text.strip()
-    
-    try:
-        data = json.loads(text)
-        
-        # Handle both formats: {"flashcards": [...]} or just [...]
-        if isinstance(data, dict) and "flashcards" in data:
-            cards_data = data["flashcards"]
-        elif isinstance(data, list):
-            cards_data = data
-        else:
-            raise FlashcardGenerationError("Unexpected response format")
-        
-        return [Flashcard(front=card["front"], back=card["back"]) for card in cards_data]
-    
-    except json.JSONDecodeError as e:
-        raise FlashcardGenerationError(f"Failed to parse flashcards JSON: {str(e)}")
-    except KeyError as e:
-        raise FlashcardGenerationError(f"Missing required field in flashcard: {str(e)}")
+    """Parse the JSON response into Flashcard objects, keeping every complete card."""
+    parsed = extract_flashcards(response_text)
+    if not parsed.flashcards and not parsed.complete:
+        raise FlashcardGenerationError("Failed to parse flashcards JSON")
+    return parsed.flashcards
 
 
-async def process_images_to_flashcards(
-    images: List[bytes],
-    config: Optional[GenerationConfig] = None
-) -> FlashcardResponse:
-    """Process images directly with VLM to generate flashcards."""
-    gen_config = config or GenerationConfig()
-    prompt = get_flashcard_prompt(gen_config.back_language)
-    
-    # Build content with images
-    content = [{"type": "text", "text": prompt}]
-    content.extend(create_image_content(images))
-    
-    messages = [{"role": "user", "content": content}]
-    
-    response_text = call_openrouter_with_retry(messages, config)
-    flashcards = parse_flashcards_response(response_text)
-    
-    return FlashcardResponse(flashcards=flashcards)
+def generate_flashcards(
+    messages: List[dict],
+    config: Optional[GenerationConfig] = None,
+    usage: Optional[TokenUsage] = None
+) -> List[Flashcard]:
+    """Call the model and parse its cards, asking only for the tail if output is truncated."""
+    with metrics.span("llm.generate"):
+        response_text = call_openrouter_with_retry(messages, config, usage)
+    with metrics.span("llm.parse"):
+        parsed = extract_flashcards(response_text)
+    if not parsed.flashcards and not parsed.complete:
+        raise FlashcardGenerationError("Failed to parse flashcards JSON")
+
+    flashcards = list(parsed.flashcards)
+    seen_fronts = {card.front for card in flashcards}
+    continuations = 0
+    while True:
+        if parsed.salvaged:
+            logger.info("Salvaged %d flashcards from truncated model output", parsed.salvaged)
+            metrics.LLM_SALVAGED_CARDS.inc(parsed.salvaged)
+        if not parsed.truncated or continuations >= settings.max_continuations:
+            break
+        continuations += 1
+        metrics.LLM_CONTINUATIONS.inc()
+
+        # Show the model its cut-off answer and ask only for the rest.
+        continuation = messages + [
+            {"role": "assistant", "content": response_text},
+            {"role": "user", "content": get_continuation_prompt(flashcards)},
+        ]
+        with metrics.span("llm.continue"):
+            response_text = call_openrouter_with_retry(continuation, config, usage)
+        with metrics.span("llm.parse"):
+            parsed = extract_flashcards(response_text)
+        for card in parsed.flashcards:
+            if card.front not in seen_fronts:
+                seen_fronts.add(card.front)
+                flashcards.append(card)
+
+    # Long or repeated generations repeat cards; keep the first of each.
+    return dedup.dedupe_cards(flashcards, settings.dedup_drop_threshold)
+
+
+def annotate_flashcards(flashcards: List[Flashcard]) -> None:
+    """Fill in the pinyin reading of generated cards so previews show it."""
+    for card, reading in zip(flashcards, readings.annotate([card.front for card in flashcards])):
+        card.reading = CardReading(**reading) if reading else None
+
+
+def build_messages(back_language: str, content) -> List[dict]:
+    """The cached system prompt followed by the variable user content."""
+    return [
+        {"role": "system", "content": get_flashcard_prompt(back_language, readings.is_available())},
+        {"role": "user", "content": content},
+    ]
 
 
 async def process_text_to_flashcards(
     text_content: str,
-    config: Optional[GenerationConfig] = None
+    config: Optional[GenerationConfig] = None,
+    usage: Optional[TokenUsage] = None
 ) -> FlashcardResponse:
     """Process text content to generate flashcards."""
     gen_config = config or GenerationConfig()
-    prompt = get_flashcard_prompt(gen_config.back_language)
-    
-    messages = [{
-        "role": "user",
-        "content": f"{prompt}\n\n{text_content}"
-    }]
+    messages = build_messages(gen_config.back_language, text_content)
     
-    response_text = call_openrouter_with_retry(messages, config)
-    flashcards = parse_flashcards_response(response_text)
+    # Retries, backoff and hedging block; keep them off the event loop.
+    flashcards = await asyncio.to_thread(generate_flashcards, messages, config, usage)
+    annotate_flashcards(flashcards)
     
-    return FlashcardResponse(flashcards=flashcards)
\ No newline at end of file
+    return FlashcardResponse(flashcards=flashcards)
+
+
+def _page_content(page: DocumentPage):
+    if page.image is not None:
+        content = [{"type": "text", "text": "Create flashcards from this image."}]
+        content.extend(create_image_content([page.image]))
+        return content
+    return page.text
+
+
+PAGE_MARKER = "=== Page {number} ==="
+_PAGE_BATCH_INSTRUCTION = (
+    'The content below spans several pages, each starting with a "=== Page N ===" line. '
+    'Give every flashcard a "page" field with the number of the page it comes from.'
+)
+
+
+def _page_tokens(page: DocumentPage) -> int:
+    if page.image is not None:
+        return TOKENS_PER_IMAGE
+    return estimate_input([{"role": "user", "content": page.text}])[0]
+
+
+def batch_pages(pages: List[DocumentPage]) -> List[List[DocumentPage]]:
+    """Group pages into requests of up to ``settings.page_batch_max_pages`` pages
+    and about ``settings.page_batch_max_tokens`` input tokens; a page over the
+    token budget goes alone."""
+    batches: List[List[DocumentPage]] = []
+    batch: List[DocumentPage] = []
+    batch_tokens = 0
+    for page in pages:
+        tokens = _page_tokens(page)
+        if batch and (len(batch) >= settings.page_batch_max_pages
+                      or batch_tokens + tokens > settings.page_batch_max_tokens):
+            batches.append(batch)
+            batch, batch_tokens = [], 0
+        batch.append(page)
+        batch_tokens += tokens
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _batch_content(batch: List[DocumentPage]):
+    if len(batch) == 1:
+        return _page_content(batch[0])
+    if all(page.image is None for page in batch):
+        return "\n\n".join([_PAGE_BATCH_INSTRUCTION] + [
+            f"{PAGE_MARKER.format(number=page.number)}\n{page.text}" for page in batch
+        ])
+    content = [{"type": "text", "text": _PAGE_BATCH_INSTRUCTION}]
+    for page in batch:
+        marker = PAGE_MARKER.format(number=page.number)
+        if page.image is not None:
+            content.append({"type": "text", "text": marker})
+            content.extend(create_image_content([page.image]))
+        else:
+            content.append({"type": "text", "text": f"{marker}\n{page.text}"})
+    return content
+
+
+def _attribute_cards(cards: List[Flashcard], batch: List[DocumentPage]) -> Dict[str, List[Flashcard]]:
+    """Split a batch's cards by page: the page the model named, else the first
+    page whose text contains the front, else the batch's first page."""
+    by_number = {page.number: page for page in batch}
+    generated: Dict[str, List[Flashcard]] = {page.content_hash: [] for page in batch}
+    for card in cards:
+        page = by_number.get(card.page)
+        if page is None:
+            page = next((page for page in batch if card.front in page.text), batch[0])
+        generated[page.content_hash].append(card)
+    return generated
+
+
+async def process_pages_to_flashcards(
+    pages: List[DocumentPage],
+    config: Optional[GenerationConfig] = None,
+    usage: Optional[TokenUsage] = None
+) -> Dict[str, List[Flashcard]]:
+    """Generate cards for pages, keyed by page content hash.
+
+    Pages are sent a batch at a time (see :func:`batch_pages`) with page
+    markers, and the model tags each card with its page so cards can still be
+    attributed to the page they came from. Batches are generated concurrently
+    (``settings.page_generation_concurrency`` at a time).
+    """
+    gen_config = config or GenerationConfig()
+    limit = asyncio.Semaphore(max(1, settings.page_generation_concurrency))
+
+    async def generate(batch: List[DocumentPage]) -> Dict[str, List[Flashcard]]:
+        messages = build_messages(gen_config.back_language, _batch_content(batch))
+        async with limit:
+            cards = await asyncio.to_thread(generate_flashcards, messages, config, usage)
+        return _attribute_cards(cards, batch)
+
+    generated: Dict[str, List[Flashcard]] = {page.content_hash: [] for page in pages}
+    batches = batch_pages([page for page in pages if not page.is_empty])
+    for result in await asyncio.gather(*(generate(batch) for batch in batches)):
+        for content_hash, cards in result.items():
+            generated[content_hash].extend(cards)
+    return generated
+
+
+async def process_document_to_flashcards(
+    pages: List[DocumentPage],
+    config: Optional[GenerationConfig] = None,
+    usage: Optional[TokenUsage] = None
+) -> FlashcardResponse:
+    """Generate a new set's cards in page batches, tagging each with its source page.
+
+    The page hashes go back with the cards so the set can be created with
+    them, and its first re-upload only regenerates pages that changed.
+    """
+    unique = documents.plan_pages(pages, []).generate
+    generated = await process_pages_to_flashcards(unique, config, usage)
+    flashcards = []
+    for page in unique:
+        for card in generated[page.content_hash]:
+            card.source_page = page.content_hash
+            flashcards.append(card)
+    # The same term often appears on several pages; keep its first card.
+    flashcards = dedup.dedupe_cards(flashcards, settings.dedup_drop_threshold)
+    annotate_flashcards(flashcards)
+    return FlashcardResponse(flashcards=flashcards, pages=[
+        DocumentPageRef(content_hash=page.content_hash, page_number=page.number) for page in unique
+    ])
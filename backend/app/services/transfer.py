@@ -0,0 +1,144 @@
+"""Streaming readers and writers for moving decks in and out.
+
+Readers yield ``{"front", "back"}`` dicts one at a time from a binary file
+object, so a 100k-card deck is never held in memory:
+
+* CSV / TSV: two columns, an optional ``front,back`` header row, and leading
+  ``#`` lines (as written by Anki's "Notes in Plain Text" export) skipped;
+* Anki packages (``.apkg``): the first two fields of each note, with HTML and
+  sound tags stripped. The collection is copied out of the zip to a temporary
+  file because SQLite needs a real file to read from.
+
+Writers turn an iterable of cards into CSV/TSV text chunks for a streaming
+response.
+"""
+
+import csv
+import html
+import io
+import itertools
+import os
+import re
+import shutil
+import sqlite3
+import tempfile
+import zipfile
+from typing import IO, Iterable, Iterator, List, Optional
+
+FORMATS = ("csv", "tsv", "apkg")
+DELIMITERS = {"csv": ",", "tsv": "\t"}
+MEDIA_TYPES = {"csv": "text/csv", "tsv": "text/tab-separated-values"}
+_EXTENSIONS = {".csv": "csv", ".tsv": "tsv", ".txt": "tsv", ".apkg": "apkg", ".colpkg": "apkg"}
+
+# Newest first; recent Anki versions also write a stub collection.anki2 whose
+# only note says "please update to the latest Anki version".
+_ANKI_COLLECTIONS = ("collection.anki21", "collection.anki2")
+_FIELD_SEPARATOR = "\x1f"
+_BREAK = re.compile(r"<br\s*/?>|</div>|</p>", re.IGNORECASE)
+_TAG = re.compile(r"<[^>]+>|\[sound:[^\]]*\]")
+
+
+def detect_format(filename: Optional[str], requested: Optional[str] = None) -> str:
+    """The import format from an explicit choice or the file extension."""
+    if requested:
+        if requested not in FORMATS:
+            raise ValueError(f"Unsupported format: {requested}")
+        return requested
+    extension = os.path.splitext(filename or "")[1].lower()
+    if extension not in _EXTENSIONS:
+        raise ValueError(f"Cannot tell the format of {filename!r}; pass one of {', '.join(FORMATS)}")
+    return _EXTENSIONS[extension]
+
+
+def read_cards(fileobj: IO[bytes], fmt: str) -> Iterator[dict]:
+    if fmt == "apkg":
+        return read_anki_package(fileobj)
+    return read_delimited(fileobj, DELIMITERS[fmt])
+
+
+def _without_leading_comments(lines: Iterable[str]) -> Iterator[str]:
+    lines = iter(lines)
+    for line in lines:
+        if not line.startswith("#"):
+            yield line
+            break
+    yield from lines
+
+
+def read_delimited(fileobj: IO[bytes], delimiter: str) -> Iterator[dict]:
+    """Cards from a two-column CSV/TSV file, decoded as UTF-8 (BOM allowed)."""
+    text = io.TextIOWrapper(fileobj, encoding="utf-8-sig", newline="")
+    try:
+        rows = csv.reader(_without_leading_comments(text), delimiter=delimiter)
+        for row_number, row in enumerate(rows):
+            if row_number == 0 and [cell.strip().casefold() for cell in row[:2]] == ["front", "back"]:
+                continue
+            yield _card(row)
+    finally:
+        # Leave the caller's file open; TextIOWrapper would close it.
+        text.detach()
+
+
+def _clean_field(value: str) -> str:
+    return html.unescape(_TAG.sub("", _BREAK.sub("\n", value))).strip()
+
+
+def read_anki_package(fileobj: IO[bytes]) -> Iterator[dict]:
+    """Cards from the notes of an Anki package, in creation order."""
+    with zipfile.ZipFile(fileobj) as package:
+        names = set(package.namelist())
+        member = next((name for name in _ANKI_COLLECTIONS if name in names), None)
+        if member is None:
+            raise ValueError(
+                "Unsupported Anki package; export it with \"Support older Anki versions\" enabled"
+            )
+        fd, path = tempfile.mkstemp(suffix=".anki2")
+        try:
+            with os.fdopen(fd, "wb") as out, package.open(member) as collection:
+                shutil.copyfileobj(collection, out)
+            connection = sqlite3.connect(path)
+            try:
+                for (fields,) in connection.execute("SELECT flds FROM notes ORDER BY id"):
+                    yield _card([_clean_field(field) for field in fields.split(_FIELD_SEPARATOR)])
+            finally:
+                connection.close()
+        finally:
+            os.unlink(path)
+
+
+def _card(row: List[str]) -> dict:
+    front = row[0].strip() if row else ""
+    back = row[1].strip() if len(row) > 1 else ""
+    return {"front": front, "back": back}
+
+
+def batched(items: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(items)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+class _Buffer:
+    """Write target that hands back what ``csv.writer`` wrote since the last call."""
+
+    def __init__(self):
+        self._parts: List[str] = []
+
+    def write(self, value: str) -> None:
+        self._parts.append(value)
+
+    def drain(self) -> str:
+        value = "".join(self._parts)
+        self._parts.clear()
+        return value
+
+
+def write_delimited(pages: Iterable[List[dict]], fmt: str) -> Iterator[bytes]:
+    """Encode pages of cards as CSV/TSV, one chunk per page (header first)."""
+    buffer = _Buffer()
+    writer = csv.writer(buffer, delimiter=DELIMITERS[fmt], lineterminator="\n")
+    writer.writerow(["front", "back"])
+    yield buffer.drain().encode("utf-8")
+    for page in pages:
+        writer.writerows((card["front"], card["back"]) for card in page)
+        yield buffer.drain().encode("utf-8")
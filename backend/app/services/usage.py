@@ -0,0 +1,76 @@
+"""Token accounting for LLM calls.
+
+A ``TokenUsage`` collects the OpenAI-style ``usage`` blocks of every call
+made for one request (including retries, hedged duplicates and
+continuations), per model, so the caller can attribute the spend to a user.
+
+A hedged request that loses the race is left running and may finish after
+the response has been sent. ``drain(record)`` hands the totals so far to
+``record`` and keeps forwarding whatever is added later, so that spend is
+recorded too.
+"""
+
+import threading
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+
+@dataclass
+class ModelUsage:
+    model: str
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+
+def _int(value) -> int:
+    return value if isinstance(value, int) else 0
+
+
+def cached_tokens(usage) -> int:
+    """Prompt tokens served from the provider's prefix cache, if reported."""
+    details = getattr(usage, "prompt_tokens_details", None)
+    if isinstance(details, dict):
+        return _int(details.get("cached_tokens"))
+    return _int(getattr(details, "cached_tokens", None))
+
+
+class TokenUsage:
+    """Thread-safe per-model token totals for one request."""
+
+    def __init__(self):
+        self._models: Dict[str, ModelUsage] = {}
+        self._lock = threading.Lock()
+        self._record: Optional[Callable[[List[dict]], None]] = None
+
+    def add(self, model: str, usage) -> None:
+        with self._lock:
+            totals = self._models.setdefault(model, ModelUsage(model))
+            totals.requests += 1
+            if usage is not None:
+                totals.prompt_tokens += _int(getattr(usage, "prompt_tokens", None))
+                totals.completion_tokens += _int(getattr(usage, "completion_tokens", None))
+                totals.cached_tokens += cached_tokens(usage)
+        self._flush()
+
+    def drain(self, record: Callable[[List[dict]], None]) -> None:
+        """Pass the totals so far to ``record``, then each later addition as it comes."""
+        with self._lock:
+            self._record = record
+        self._flush()
+
+    def _flush(self) -> None:
+        with self._lock:
+            if self._record is None or not self._models:
+                return
+            record, pending = self._record, [asdict(totals) for totals in self._models.values()]
+            self._models.clear()
+        record(pending)
+
+    def by_model(self) -> List[dict]:
+        with self._lock:
+            return [asdict(totals) for totals in self._models.values()]
+
+    def __bool__(self) -> bool:
+        return bool(self._models)
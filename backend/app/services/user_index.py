@@ -0,0 +1,175 @@
+"""Per-user in-memory card indexes kept in step with the database.
+
+An index is built from the user's cards the first time it is needed and then
+updated incrementally by the create/update/delete paths in
+``app.db.database``. Other workers can change a user's cards too, so an
+index last synced more than ``max_age_seconds`` ago is caught up on next use
+by applying the changes since its sync cursor (``load_changes``) rather than
+reloading every card; it is only rebuilt when there is no cursor or the
+changes can't be applied card by card.
+
+At most ``max_users`` indexes are kept, least recently used first out, and
+ones unused for ``max_age_seconds`` are dropped rather than kept until their
+user comes back. Builds and catch-ups for one user are serialized; cards
+added while one is running go into that index, and a removal or
+invalidation during one keeps its result from being cached.
+"""
+
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Generic, Iterable, List, Optional, Set, Tuple, TypeVar
+
+T = TypeVar("T")
+
+_BUILD_LOCK_STRIPES = 64
+
+
+# (cursor, cards written, ids of cards removed) since a cursor, or None when
+# the index has to be rebuilt instead.
+Changes = Optional[Tuple[int, List[dict], List[int]]]
+
+
+class _Entry:
+    __slots__ = ("index", "cursor", "synced_at", "used_at")
+
+    def __init__(self, index, cursor: Optional[int], synced_at: float):
+        self.index = index
+        self.cursor = cursor
+        self.synced_at = synced_at
+        self.used_at = synced_at
+
+
+class UserIndexRegistry(Generic[T]):
+    """Bounded LRU of one index per user. Indexes must provide ``add_card(card)``
+    and ``remove(card_id)`` and be safe to update from several threads."""
+
+    def __init__(self, factory: Callable[[], T], max_age_seconds: float = 600, max_users: int = 128):
+        self.factory = factory
+        self.max_age_seconds = max_age_seconds
+        self.max_users = max_users
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._building: Dict[str, T] = {}
+        self._stale: Set[str] = set()
+        self._lock = threading.Lock()
+        self._build_locks = [threading.Lock() for _ in range(_BUILD_LOCK_STRIPES)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _entry_locked(self, user_id: str) -> Optional[_Entry]:
+        now = time.monotonic()
+        for idle in [key for key, entry in self._entries.items()
+                     if now - entry.used_at >= self.max_age_seconds]:
+            del self._entries[idle]
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        entry.used_at = now
+        self._entries.move_to_end(user_id)
+        return entry
+
+    def _is_synced(self, entry: Optional[_Entry]) -> bool:
+        return entry is not None and time.monotonic() - entry.synced_at < self.max_age_seconds
+
+    def get(
+        self,
+        user_id: str,
+        load_cards: Callable[[], Iterable[dict]],
+        version: Optional[Callable[[], int]] = None,
+        load_changes: Optional[Callable[[int], Changes]] = None,
+    ) -> T:
+        """Return the user's index, building it from ``load_cards`` if missing.
+
+        ``version()`` is read before a build and is the cursor the index is
+        later caught up from with ``load_changes(cursor)``; without them a
+        stale index is rebuilt.
+        """
+        with self._lock:
+            entry = self._entry_locked(user_id)
+            if self._is_synced(entry):
+                return entry.index
+
+        with self._build_locks[zlib.crc32(user_id.encode()) % _BUILD_LOCK_STRIPES]:
+            with self._lock:
+                entry = self._entry_locked(user_id)
+                if self._is_synced(entry):
+                    return entry.index
+                if entry is None or entry.cursor is None or load_changes is None:
+                    entry = None
+                    index = self.factory()
+                else:
+                    index = entry.index
+                self._building[user_id] = index
+                self._stale.discard(user_id)
+            cursor = None
+            cached = False
+            try:
+                changes = load_changes(entry.cursor) if entry is not None else None
+                if changes is not None:
+                    cursor, written, removed = changes
+                    _apply(index, written, removed)
+                else:
+                    if entry is not None:
+                        index = self.factory()
+                        with self._lock:
+                            self._entries.pop(user_id, None)
+                            self._building[user_id] = index
+                    cursor = version() if version is not None else None
+                    for card in load_cards():
+                        index.add_card(card)
+                cached = True
+            finally:
+                with self._lock:
+                    self._building.pop(user_id, None)
+                    if user_id in self._stale:
+                        # Changed mid-build: serve this one, sync again next time.
+                        self._stale.discard(user_id)
+                    elif cached:
+                        self._entries[user_id] = _Entry(index, cursor, time.monotonic())
+                        self._entries.move_to_end(user_id)
+                        while len(self._entries) > self.max_users:
+                            self._entries.popitem(last=False)
+        return index
+
+    def loaded(self, user_id: str) -> Optional[T]:
+        """The user's index if it is in memory or being built (never triggers a build)."""
+        with self._lock:
+            if user_id in self._building:
+                return self._building[user_id]
+            entry = self._entries.get(user_id)
+            return entry.index if entry is not None else None
+
+    def add_cards(self, user_id: str, cards: List[dict]) -> None:
+        index = self.loaded(user_id)
+        if index is not None:
+            for card in cards:
+                index.add_card(card)
+
+    def remove_cards(self, user_id: str, card_ids: List[int]) -> None:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            index = self._building.get(user_id, entry.index if entry is not None else None)
+            if user_id in self._building:
+                # The build may still load these cards from its snapshot.
+                self._stale.add(user_id)
+        if index is not None:
+            for card_id in card_ids:
+                index.remove(card_id)
+
+    def invalidate(self, user_id: str) -> None:
+        with self._lock:
+            self._entries.pop(user_id, None)
+            if user_id in self._building:
+                self._stale.add(user_id)
+
+
+def _apply(index, written: List[dict], removed: List[int]) -> None:
+    """Replay a change set; a card both written and then deleted stays removed."""
+    gone = set(removed)
+    for card_id in gone.union(card["id"] for card in written):
+        index.remove(card_id)
+    for card in written:
+        if card["id"] not in gone:
+            index.add_card(card)
@@ -0,0 +1,134 @@
+"""Bytes on the wire and CPU cost per response encoding.
+
+Builds the JSON body of a large flashcard set (CJK fronts, pinyin and
+English backs) and sends it through ``CompressionMiddleware`` once per
+installed encoding. For each encoding it reports the wire size, the CPU
+time of a first read (compressed on the fly) and of repeat reads (served
+from the compressed-body cache), and the client-side decompression time.
+
+    python -m benchmarks.compression --cards 5000
+"""
+
+import argparse
+import asyncio
+import gzip
+import json
+import statistics
+import time
+from typing import Callable, Dict, List, Optional
+
+from app.core import compression
+
+_DECOMPRESSORS: Dict[str, Callable[[bytes], bytes]] = {"gzip": gzip.decompress, "identity": lambda b: b}
+
+HANZI = "学习汉语中文老师学生朋友今天明天谢谢再见你好我们他们喜欢吃饭喝茶看书写字说话听音乐"
+
+
+def _decompressor(encoding: str) -> Optional[Callable[[bytes], bytes]]:
+    if encoding == "br":
+        import brotli
+
+        return brotli.decompress
+    if encoding == "zstd":
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress
+    return _DECOMPRESSORS.get(encoding)
+
+
+def make_set_body(cards: int) -> bytes:
+    flashcards = []
+    for i in range(cards):
+        word = HANZI[i % len(HANZI)] + HANZI[(i * 7) % len(HANZI)]
+        flashcards.append({
+            "id": 100_000 + i,
+            "front": f"{word}{i}",
+            "back": f"xué xí {i} - to study, to learn (example {i})",
+        })
+    body = {"id": 1, "title": "HSK vocabulary", "description": "bench", "owner_id": "u", "flashcards": flashcards}
+    return json.dumps(body, ensure_ascii=False).encode("utf-8")
+
+
+async def _request(middleware, accept_encoding: str) -> bytes:
+    chunks: List[bytes] = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    scope = {
+        "type": "http", "method": "GET", "path": "/v1/flashcard-sets/1",
+        "headers": [(b"accept-encoding", accept_encoding.encode())],
+    }
+    await middleware(scope, receive, send)
+    return b"".join(chunks)
+
+
+def measure(body: bytes, encoding: str, runs: int, loop: asyncio.AbstractEventLoop) -> dict:
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": body})
+
+    middleware = compression.CompressionMiddleware(
+        app, encodings=[] if encoding == "identity" else [encoding]
+    )
+
+    def cpu_ms() -> float:
+        start = time.process_time()
+        loop.run_until_complete(_request(middleware, encoding))
+        return (time.process_time() - start) * 1000
+
+    first_ms = cpu_ms()
+    repeat_ms = statistics.median(cpu_ms() for _ in range(runs))
+    wire = loop.run_until_complete(_request(middleware, encoding))
+
+    decompress = _decompressor(encoding)
+    start = time.process_time()
+    for _ in range(runs):
+        assert decompress(wire) == body
+    decompress_ms = (time.process_time() - start) * 1000 / runs
+
+    return {
+        "encoding": encoding,
+        "wire_bytes": len(wire),
+        "ratio": len(body) / len(wire),
+        "first_cpu_ms": first_ms,
+        "repeat_cpu_ms": repeat_ms,
+        "decompress_ms": decompress_ms,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cards", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--json", dest="json_path", help="Write the results to this file")
+    args = parser.parse_args(argv)
+
+    body = make_set_body(args.cards)
+    encodings = ["identity"] + compression.available_encodings(["zstd", "br", "gzip"])
+    loop = asyncio.new_event_loop()
+    try:
+        results = [measure(body, encoding, args.runs, loop) for encoding in encodings]
+    finally:
+        loop.close()
+
+    print(f"{args.cards} cards, {len(body)} bytes of JSON")
+    header = f"{'encoding':<10}{'wire bytes':>12}{'ratio':>8}{'first ms':>10}{'repeat ms':>11}{'decode ms':>11}"
+    print(header)
+    print("-" * len(header))
+    for r in results:
+        print(f"{r['encoding']:<10}{r['wire_bytes']:>12}{r['ratio']:>8.1f}"
+              f"{r['first_cpu_ms']:>10.2f}{r['repeat_cpu_ms']:>11.2f}{r['decompress_ms']:>11.2f}")
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"cards": args.cards, "raw_bytes": len(body), "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
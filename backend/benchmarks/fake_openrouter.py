@@ -0,0 +1,125 @@
+"""A local OpenAI-compatible chat completions server for benchmarks.
+
+Responses are deterministic flashcard JSON built from the request text, with
+a configurable fixed latency plus per-output-token delay, and optional SSE
+streaming when the request sets ``"stream": true``.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from dataclasses import dataclass
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+@dataclass
+class FakeModelConfig:
+    latency_ms: float = 200.0
+    per_token_ms: float = 0.0
+    cards_per_response: int = 20
+    stream_chunk_chars: int = 64
+
+
+def _request_text(messages) -> str:
+    parts = []
+    for message in messages:
+        if message.get("role") == "system":
+            continue
+        content = message.get("content")
+        if isinstance(content, str):
+            parts.append(content)
+        elif isinstance(content, list):
+            parts.extend(p.get("text", "") for p in content if p.get("type") == "text")
+    return "\n".join(parts)
+
+
+def build_completion_text(messages, cards: int) -> str:
+    words = [w for w in _request_text(messages).split() if w.isalpha()] or ["card"]
+    flashcards = [
+        {"front": f"{words[i % len(words)]} {i}", "back": f"meaning of {words[i % len(words)]} {i}"}
+        for i in range(cards)
+    ]
+    return json.dumps({"flashcards": flashcards}, ensure_ascii=False)
+
+
+def create_app(config: FakeModelConfig = None) -> FastAPI:
+    config = config or FakeModelConfig()
+    app = FastAPI()
+    app.state.config = config
+    app.state.requests = 0
+    app.state.cached_prefixes = set()
+
+    @app.get("/v1/models")
+    async def list_models():
+        return {"object": "list", "data": [{"id": "fake-model", "object": "model", "owned_by": "bench"}]}
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+        app.state.requests += 1
+        cfg = app.state.config
+        text = build_completion_text(body.get("messages", []), cfg.cards_per_response)
+        prompt_tokens = len(_request_text(body.get("messages", []))) // 4
+        completion_tokens = len(text) // 4
+        completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+        model = body.get("model", "fake-model")
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
+        # Mimic provider prefix caching: a system prompt seen before is a cache hit.
+        messages = body.get("messages", [])
+        if messages and messages[0].get("role") == "system":
+            prefix = messages[0].get("content", "")
+            if prefix in app.state.cached_prefixes:
+                usage["prompt_tokens_details"] = {"cached_tokens": len(prefix) // 4}
+            app.state.cached_prefixes.add(prefix)
+
+        await asyncio.sleep(cfg.latency_ms / 1000)
+
+        if not body.get("stream"):
+            await asyncio.sleep(completion_tokens * cfg.per_token_ms / 1000)
+            return JSONResponse({
+                "id": completion_id,
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": text},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+        async def events():
+            size = cfg.stream_chunk_chars
+            for start in range(0, len(text), size):
+                piece = text[start:start + size]
+                await asyncio.sleep(len(piece) / 4 * cfg.per_token_ms / 1000)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{"index": 0, "delta": {"content": piece}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            final = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}],
+                "usage": usage,
+            }
+            yield f"data: {json.dumps(final)}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(events(), media_type="text/event-stream")
+
+    return app
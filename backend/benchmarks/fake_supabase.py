@@ -0,0 +1,659 @@
+"""A local stand-in for Supabase (PostgREST + GoTrue) backed by SQLite.
+
+Implements just enough of the REST surface used by ``app.db.database`` and the
+routers: select with one level of embedded resources, the common filters,
+ordering/paging, insert/upsert, update, delete, RPC calls and ``GET
+/auth/v1/user``. Access tokens are ``token-<user_id>``.
+"""
+
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import date, datetime, timedelta, timezone
+from typing import Callable, Dict, List, Tuple
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response
+
+SCHEMA = """
+CREATE TABLE users (
+    id TEXT PRIMARY KEY,
+    email TEXT UNIQUE,
+    username TEXT
+);
+CREATE TABLE flashcard_sets (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    title TEXT,
+    description TEXT,
+    owner_id TEXT,
+    card_count INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE flashcards (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    front TEXT NOT NULL,
+    back TEXT NOT NULL,
+    set_id INTEGER REFERENCES flashcard_sets(id) ON DELETE CASCADE,
+    source_page TEXT,
+    reading TEXT,
+    version INTEGER NOT NULL DEFAULT 0,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE flashcard_set_pages (
+    set_id INTEGER REFERENCES flashcard_sets(id) ON DELETE CASCADE,
+    content_hash TEXT NOT NULL,
+    page_number INTEGER NOT NULL,
+    PRIMARY KEY (set_id, content_hash)
+);
+CREATE TABLE card_reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    card_id INTEGER REFERENCES flashcards(id) ON DELETE CASCADE,
+    was_correct BOOLEAN NOT NULL,
+    response_time_ms INTEGER NOT NULL,
+    reviewed_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE user_flashcard_progress (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    flashcard_id INTEGER REFERENCES flashcards(id) ON DELETE CASCADE,
+    set_id INTEGER REFERENCES flashcard_sets(id) ON DELETE CASCADE,
+    easiness_factor REAL NOT NULL DEFAULT 2.5,
+    repetitions INTEGER NOT NULL DEFAULT 0,
+    interval INTEGER NOT NULL DEFAULT 0,
+    next_review_date TEXT NOT NULL DEFAULT CURRENT_DATE,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    updated_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    UNIQUE (user_id, flashcard_id)
+);
+CREATE TABLE user_daily_activity (
+    user_id TEXT,
+    activity_date TEXT NOT NULL,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, activity_date)
+);
+CREATE TABLE card_review_daily (
+    user_id TEXT,
+    card_id INTEGER REFERENCES flashcards(id) ON DELETE CASCADE,
+    review_date TEXT NOT NULL,
+    reviews INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    total_response_ms INTEGER NOT NULL,
+    last_reviewed_at TEXT NOT NULL,
+    PRIMARY KEY (user_id, card_id, review_date)
+);
+CREATE VIEW card_review_summary AS
+SELECT combined.user_id, combined.card_id, flashcards.set_id,
+       SUM(combined.reviews) AS reviews, SUM(combined.correct) AS correct,
+       MAX(combined.last_reviewed_at) AS last_reviewed_at
+FROM (
+    SELECT user_id, card_id, reviews, correct, last_reviewed_at FROM card_review_daily
+    UNION ALL
+    SELECT user_id, card_id, 1, was_correct, reviewed_at FROM card_reviews
+) combined
+JOIN flashcards ON flashcards.id = combined.card_id
+GROUP BY combined.user_id, combined.card_id, flashcards.set_id;
+CREATE VIEW flashcard_set_sizes AS
+SELECT flashcard_sets.id AS set_id, flashcard_sets.owner_id, COUNT(flashcards.id) AS total_cards
+FROM flashcard_sets LEFT JOIN flashcards ON flashcards.set_id = flashcard_sets.id
+GROUP BY flashcard_sets.id, flashcard_sets.owner_id;
+CREATE VIEW set_review_summary AS
+SELECT user_id, set_id, COUNT(*) AS cards_studied, SUM(reviews) AS reviews,
+       SUM(correct) AS correct, MAX(last_reviewed_at) AS last_reviewed_at
+FROM card_review_summary
+GROUP BY user_id, set_id;
+CREATE TABLE user_token_usage (
+    user_id TEXT,
+    usage_date TEXT NOT NULL,
+    model TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens INTEGER NOT NULL DEFAULT 0,
+    completion_tokens INTEGER NOT NULL DEFAULT 0,
+    cached_tokens INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, usage_date, model)
+);
+CREATE INDEX idx_flashcard_sets_owner_id ON flashcard_sets(owner_id);
+CREATE INDEX idx_flashcards_set_id ON flashcards(set_id);
+CREATE INDEX idx_card_reviews_user_id ON card_reviews(user_id);
+CREATE INDEX idx_user_flashcard_progress_user_id ON user_flashcard_progress(user_id);
+CREATE TABLE set_due_counts (
+    user_id TEXT,
+    set_id INTEGER REFERENCES flashcard_sets(id) ON DELETE CASCADE,
+    due_date TEXT NOT NULL,
+    cards INTEGER NOT NULL,
+    PRIMARY KEY (user_id, set_id, due_date)
+);
+-- Row-level stand-ins for the statement-level triggers in add_due_counts.sql
+CREATE TRIGGER flashcards_card_count_insert AFTER INSERT ON flashcards BEGIN
+    UPDATE flashcard_sets SET card_count = card_count + 1 WHERE id = NEW.set_id;
+END;
+CREATE TRIGGER flashcards_card_count_delete AFTER DELETE ON flashcards BEGIN
+    UPDATE flashcard_sets SET card_count = MAX(card_count - 1, 0) WHERE id = OLD.set_id;
+END;
+CREATE TRIGGER user_flashcard_progress_set_id AFTER INSERT ON user_flashcard_progress
+WHEN NEW.set_id IS NULL BEGIN
+    UPDATE user_flashcard_progress
+    SET set_id = (SELECT set_id FROM flashcards WHERE id = NEW.flashcard_id)
+    WHERE id = NEW.id;
+END;
+CREATE TRIGGER user_flashcard_progress_due_insert AFTER INSERT ON user_flashcard_progress
+WHEN NEW.set_id IS NOT NULL BEGIN
+    INSERT INTO set_due_counts (user_id, set_id, due_date, cards)
+    SELECT NEW.user_id, NEW.set_id, NEW.next_review_date, 1 WHERE 1
+    ON CONFLICT (user_id, set_id, due_date) DO UPDATE SET cards = cards + 1;
+END;
+CREATE TRIGGER user_flashcard_progress_due_update AFTER UPDATE ON user_flashcard_progress BEGIN
+    UPDATE set_due_counts SET cards = cards - 1
+    WHERE OLD.set_id IS NOT NULL AND user_id = OLD.user_id AND set_id = OLD.set_id
+      AND due_date = OLD.next_review_date;
+    INSERT INTO set_due_counts (user_id, set_id, due_date, cards)
+    SELECT NEW.user_id, NEW.set_id, NEW.next_review_date, 1 WHERE NEW.set_id IS NOT NULL
+    ON CONFLICT (user_id, set_id, due_date) DO UPDATE SET cards = cards + 1;
+    DELETE FROM set_due_counts WHERE user_id = OLD.user_id AND set_id = OLD.set_id
+      AND due_date = OLD.next_review_date AND cards <= 0;
+END;
+CREATE TRIGGER user_flashcard_progress_due_delete AFTER DELETE ON user_flashcard_progress BEGIN
+    UPDATE set_due_counts SET cards = cards - 1
+    WHERE user_id = OLD.user_id AND set_id = OLD.set_id AND due_date = OLD.next_review_date;
+    DELETE FROM set_due_counts WHERE user_id = OLD.user_id AND set_id = OLD.set_id
+      AND due_date = OLD.next_review_date AND cards <= 0;
+END;
+-- The version/tombstone triggers from add_sync.sql. SQLite runs one write at
+-- a time, so a counter stands in for transaction ids; sync_in_flight holds
+-- the ids of "transactions" a test keeps open, which hold back the horizon.
+CREATE TABLE sync_version_seq (value INTEGER NOT NULL);
+INSERT INTO sync_version_seq (value) VALUES (0);
+CREATE TABLE sync_in_flight (version INTEGER PRIMARY KEY);
+CREATE TABLE sync_tombstones (
+    version INTEGER PRIMARY KEY,
+    owner_id TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    object_id INTEGER NOT NULL,
+    set_id INTEGER NOT NULL,
+    deleted_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE INDEX idx_flashcard_sets_owner_version ON flashcard_sets(owner_id, version);
+CREATE INDEX idx_flashcards_set_version ON flashcards(set_id, version);
+CREATE INDEX idx_sync_tombstones_owner_version ON sync_tombstones(owner_id, version);
+CREATE TRIGGER flashcard_sets_sync_insert AFTER INSERT ON flashcard_sets BEGIN
+    UPDATE sync_version_seq SET value = value + 1;
+    UPDATE flashcard_sets SET version = (SELECT value FROM sync_version_seq) WHERE id = NEW.id;
+END;
+CREATE TRIGGER flashcard_sets_sync_update AFTER UPDATE OF title, description ON flashcard_sets BEGIN
+    UPDATE sync_version_seq SET value = value + 1;
+    UPDATE flashcard_sets SET version = (SELECT value FROM sync_version_seq),
+        updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+CREATE TRIGGER flashcards_sync_insert AFTER INSERT ON flashcards BEGIN
+    UPDATE sync_version_seq SET value = value + 1;
+    UPDATE flashcards SET version = (SELECT value FROM sync_version_seq) WHERE id = NEW.id;
+END;
+CREATE TRIGGER flashcards_sync_update AFTER UPDATE OF front, back, set_id ON flashcards BEGIN
+    UPDATE sync_version_seq SET value = value + 1;
+    UPDATE flashcards SET version = (SELECT value FROM sync_version_seq),
+        updated_at = CURRENT_TIMESTAMP WHERE id = NEW.id;
+END;
+CREATE TRIGGER flashcard_sets_sync_tombstone AFTER DELETE ON flashcard_sets
+WHEN OLD.owner_id IS NOT NULL BEGIN
+    UPDATE sync_version_seq SET value = value + 1;
+    INSERT INTO sync_tombstones (version, owner_id, kind, object_id, set_id)
+    VALUES ((SELECT value FROM sync_version_seq), OLD.owner_id, 'set', OLD.id, OLD.id);
+END;
+CREATE TRIGGER flashcards_sync_tombstone AFTER DELETE ON flashcards
+WHEN EXISTS (SELECT 1 FROM flashcard_sets WHERE id = OLD.set_id) BEGIN
+    UPDATE sync_version_seq SET value = value + 1;
+    INSERT INTO sync_tombstones (version, owner_id, kind, object_id, set_id)
+    SELECT (SELECT value FROM sync_version_seq), owner_id, 'card', OLD.id, OLD.set_id
+    FROM flashcard_sets WHERE id = OLD.set_id;
+END;
+"""
+
+BOOLEAN_COLUMNS = {("card_reviews", "was_correct")}
+JSON_COLUMNS = {("flashcards", "reading")}
+
+
+def record_daily_activity(conn: sqlite3.Connection, params: dict) -> None:
+    conn.execute(
+        "INSERT INTO user_daily_activity (user_id, activity_date, reviews, correct) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (user_id, activity_date) DO UPDATE SET "
+        "reviews = reviews + excluded.reviews, correct = correct + excluded.correct",
+        (params["p_user_id"], params["p_date"], params["p_reviews"], params["p_correct"]),
+    )
+
+
+def record_token_usage(conn: sqlite3.Connection, params: dict) -> None:
+    conn.execute(
+        "INSERT INTO user_token_usage (user_id, usage_date, model, requests, prompt_tokens, "
+        "completion_tokens, cached_tokens) VALUES (?, ?, ?, ?, ?, ?, ?) "
+        "ON CONFLICT (user_id, usage_date, model) DO UPDATE SET "
+        "requests = requests + excluded.requests, prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+        "completion_tokens = completion_tokens + excluded.completion_tokens, "
+        "cached_tokens = cached_tokens + excluded.cached_tokens",
+        (params["p_user_id"], params["p_date"], params["p_model"], params["p_requests"],
+         params["p_prompt_tokens"], params["p_completion_tokens"], params["p_cached_tokens"]),
+    )
+
+
+def compact_card_reviews(conn: sqlite3.Connection, params: dict) -> int:
+    # No partitions here; the cutoff is month-aligned like the real function.
+    cutoff = params["p_before"][:8] + "01"
+    compacted = conn.execute(
+        "SELECT COUNT(*) FROM card_reviews WHERE reviewed_at < ?", (cutoff,)
+    ).fetchone()[0]
+    conn.execute(
+        "INSERT INTO card_review_daily "
+        "(user_id, card_id, review_date, reviews, correct, total_response_ms, last_reviewed_at) "
+        "SELECT user_id, card_id, date(reviewed_at), COUNT(*), SUM(was_correct), "
+        "SUM(response_time_ms), MAX(reviewed_at) FROM card_reviews "
+        "WHERE reviewed_at < ? AND user_id IS NOT NULL AND card_id IS NOT NULL "
+        "GROUP BY user_id, card_id, date(reviewed_at) "
+        "ON CONFLICT (user_id, card_id, review_date) DO UPDATE SET "
+        "reviews = reviews + excluded.reviews, correct = correct + excluded.correct, "
+        "total_response_ms = total_response_ms + excluded.total_response_ms, "
+        "last_reviewed_at = MAX(last_reviewed_at, excluded.last_reviewed_at)",
+        (cutoff,),
+    )
+    conn.execute("DELETE FROM card_reviews WHERE reviewed_at < ?", (cutoff,))
+    return compacted
+
+
+def rebuild_set_due_counts(conn: sqlite3.Connection, params: dict) -> int:
+    user_id = params.get("p_user_id")
+    conn.execute(
+        "UPDATE flashcard_sets SET card_count = "
+        "(SELECT COUNT(*) FROM flashcards WHERE flashcards.set_id = flashcard_sets.id) "
+        "WHERE ? IS NULL OR owner_id = ?",
+        (user_id, user_id),
+    )
+    conn.execute("DELETE FROM set_due_counts WHERE ? IS NULL OR user_id = ?", (user_id, user_id))
+    return conn.execute(
+        "INSERT INTO set_due_counts (user_id, set_id, due_date, cards) "
+        "SELECT user_id, set_id, next_review_date, COUNT(*) FROM user_flashcard_progress "
+        "WHERE set_id IS NOT NULL AND (? IS NULL OR user_id = ?) "
+        "GROUP BY user_id, set_id, next_review_date",
+        (user_id, user_id),
+    ).rowcount
+
+
+def get_set_due_counts(conn: sqlite3.Connection, params: dict) -> List[dict]:
+    rows = conn.execute(
+        "SELECT s.id AS set_id, s.card_count AS total_cards, "
+        "MAX(s.card_count - COALESCE(SUM(d.cards), 0), 0) AS new_cards, "
+        "COALESCE(SUM(CASE WHEN d.due_date <= :day THEN d.cards END), 0) AS due_cards, "
+        "MIN(CASE WHEN d.due_date > :day THEN d.due_date END) AS next_due_date "
+        "FROM flashcard_sets s LEFT JOIN set_due_counts d ON d.set_id = s.id AND d.user_id = :user "
+        "WHERE s.owner_id = :user GROUP BY s.id ORDER BY s.id",
+        {"user": params["p_user_id"], "day": params["p_date"]},
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def get_due_forecast(conn: sqlite3.Connection, params: dict) -> List[dict]:
+    end = (date.fromisoformat(params["p_date"]) + timedelta(days=params["p_days"])).isoformat()
+    rows = conn.execute(
+        "SELECT MAX(due_date, :day) AS due_date, SUM(cards) AS cards FROM set_due_counts "
+        "WHERE user_id = :user AND due_date < :end GROUP BY MAX(due_date, :day) ORDER BY 1",
+        {"user": params["p_user_id"], "day": params["p_date"], "end": end},
+    ).fetchall()
+    return [dict(row) for row in rows]
+
+
+def sync_horizon(conn: sqlite3.Connection, params: dict) -> int:
+    return conn.execute(
+        "SELECT COALESCE((SELECT MIN(version) FROM sync_in_flight), "
+        "(SELECT value + 1 FROM sync_version_seq))"
+    ).fetchone()[0]
+
+
+def get_sync_changes(conn: sqlite3.Connection, params: dict) -> dict:
+    horizon = sync_horizon(conn, {})
+    args = {"user": params["p_user_id"], "since": params["p_since"], "horizon": horizon}
+    streams = {
+        "sets": "SELECT id, title, description, owner_id, version, updated_at FROM flashcard_sets "
+                "WHERE owner_id = :user AND version > :since",
+        "cards": "SELECT c.id, c.front, c.back, c.reading, c.set_id, c.version, c.updated_at "
+                 "FROM flashcards c JOIN flashcard_sets s ON s.id = c.set_id "
+                 "WHERE s.owner_id = :user AND c.version > :since",
+        "deleted": "SELECT version, kind, object_id FROM sync_tombstones "
+                   "WHERE owner_id = :user AND version > :since",
+    }
+    full = []
+    for query in streams.values():
+        row = conn.execute(
+            f"SELECT version FROM ({query}) WHERE version < :horizon ORDER BY version LIMIT 1 OFFSET :skip",
+            {**args, "skip": params["p_limit"] - 1},
+        ).fetchone()
+        if row is not None:
+            full.append(row[0])
+    cursor = min(full) if full else max(params["p_since"], horizon - 1)
+
+    page = {"cursor": cursor, "has_more": bool(full)}
+    for name, query in streams.items():
+        rows = conn.execute(
+            f"SELECT * FROM ({query}) WHERE version <= :cursor ORDER BY version", {**args, "cursor": cursor}
+        )
+        page[name] = [dict(row) for row in rows]
+    for card in page["cards"]:
+        card["reading"] = json.loads(card["reading"]) if card["reading"] is not None else None
+    return page
+
+
+# Server-side functions from migrations/, callable at /rest/v1/rpc/{name}.
+DEFAULT_RPCS = {
+    "record_daily_activity": record_daily_activity,
+    "record_token_usage": record_token_usage,
+    "compact_card_reviews": compact_card_reviews,
+    "ensure_card_review_partitions": lambda conn, params: None,
+    "rebuild_set_due_counts": rebuild_set_due_counts,
+    "get_set_due_counts": get_set_due_counts,
+    "get_due_forecast": get_due_forecast,
+    "sync_horizon": sync_horizon,
+    "get_sync_changes": get_sync_changes,
+}
+
+# (parent, child) -> (parent column, child column) for embedded selects.
+RELATIONSHIPS = {
+    ("flashcard_sets", "flashcards"): ("id", "set_id"),
+}
+
+OPERATORS = {
+    "eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=",
+    "like": "LIKE", "ilike": "LIKE",
+}
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+IDENTIFIER = re.compile(r"^[A-Za-z_][A-Za-z0-9_]*$")
+
+
+class PostgrestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _ident(name: str) -> str:
+    if not IDENTIFIER.match(name):
+        raise PostgrestError(400, f"Invalid identifier: {name}")
+    return f'"{name}"'
+
+
+def parse_select(select: str) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Split ``a,b,rel(c,d)`` into plain columns and embedded resources."""
+    columns, embeds = [], {}
+    depth, token = 0, ""
+    for char in select + ",":
+        if char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        if char == "," and depth == 0:
+            token = token.strip()
+            if "(" in token:
+                name, inner = token.split("(", 1)
+                embeds[name.split("!")[0]] = parse_select(inner[:-1])[0]
+            elif token:
+                columns.append(token)
+            token = ""
+        else:
+            token += char
+    return columns, embeds
+
+
+class FakeSupabase:
+    """SQLite database plus the HTTP app that serves it."""
+
+    def __init__(self, path: str = ":memory:"):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA foreign_keys = ON")
+        self.conn.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.rpcs: Dict[str, Callable[[sqlite3.Connection, dict], object]] = dict(DEFAULT_RPCS)
+        self.app = self._build_app()
+
+    # -- data helpers -----------------------------------------------------
+
+    def create_user(self, username: str = "bench") -> Tuple[str, str]:
+        """Create a user and return ``(user_id, access_token)``."""
+        user_id = str(uuid.uuid4())
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO users (id, email, username) VALUES (?, ?, ?)",
+                (user_id, f"{user_id}@example.com", username),
+            )
+            self.conn.commit()
+        return user_id, f"token-{user_id}"
+
+    def _columns(self, table: str) -> List[str]:
+        rows = self.conn.execute(f"PRAGMA table_info({_ident(table)})").fetchall()
+        if not rows:
+            raise PostgrestError(404, f"Relation {table} does not exist")
+        return [row["name"] for row in rows]
+
+    def _row(self, table: str, row: sqlite3.Row, columns: List[str]) -> dict:
+        out = {}
+        for column in columns:
+            value = row[column]
+            if (table, column) in BOOLEAN_COLUMNS and value is not None:
+                value = bool(value)
+            elif (table, column) in JSON_COLUMNS and value is not None:
+                value = json.loads(value)
+            out[column] = value
+        return out
+
+    def _where(self, table: str, params: List[Tuple[str, str]]) -> Tuple[str, list]:
+        clauses, args = [], []
+        for key, raw in params:
+            if key in RESERVED_PARAMS or "." in key:
+                continue
+            negate = raw.startswith("not.")
+            if negate:
+                raw = raw[4:]
+            op, _, value = raw.partition(".")
+            column = _ident(key)
+            if op == "in":
+                values = [v.strip('"') for v in value.strip("()").split(",") if v]
+                if not values:
+                    clause = "0"
+                else:
+                    clause = f"{column} IN ({','.join('?' * len(values))})"
+                    args.extend(self._coerce(table, key, v) for v in values)
+            elif op == "is":
+                clause = f"{column} IS {'NULL' if value == 'null' else value.upper()}"
+            elif op in OPERATORS:
+                if op == "ilike":
+                    value = value.replace("*", "%")
+                    clause = f"LOWER({column}) LIKE LOWER(?)"
+                else:
+                    value = value.replace("*", "%") if op == "like" else value
+                    clause = f"{column} {OPERATORS[op]} ?"
+                args.append(self._coerce(table, key, value))
+            else:
+                raise PostgrestError(400, f"Unsupported operator: {op}")
+            clauses.append(f"NOT ({clause})" if negate else clause)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    @staticmethod
+    def _coerce(table: str, column: str, value: str):
+        if (table, column) in BOOLEAN_COLUMNS:
+            return 1 if value == "true" else 0
+        return value
+
+    # -- PostgREST operations ---------------------------------------------
+
+    def select(self, table: str, params: List[Tuple[str, str]]) -> List[dict]:
+        query = dict(params)
+        columns, embeds = parse_select(query.get("select", "*"))
+        all_columns = self._columns(table)
+        if not columns or columns == ["*"]:
+            columns = all_columns
+        where, args = self._where(table, params)
+        sql = f"SELECT * FROM {_ident(table)}{where}"
+        if "order" in query:
+            parts = []
+            for term in query["order"].split(","):
+                name, _, direction = term.partition(".")
+                parts.append(f"{_ident(name)} {'DESC' if direction.startswith('desc') else 'ASC'}")
+            sql += " ORDER BY " + ", ".join(parts)
+        if "limit" in query:
+            sql += f" LIMIT {int(query['limit'])}"
+            if "offset" in query:
+                sql += f" OFFSET {int(query['offset'])}"
+        rows = [self._row(table, row, columns + [c for c in all_columns if c not in columns])
+                for row in self.conn.execute(sql, args).fetchall()]
+
+        for child, child_columns in embeds.items():
+            relation = RELATIONSHIPS.get((table, child))
+            if relation is None:
+                raise PostgrestError(400, f"No relationship between {table} and {child}")
+            parent_key, child_key = relation
+            ids = [row[parent_key] for row in rows]
+            grouped: Dict[object, List[dict]] = {key: [] for key in ids}
+            if ids:
+                child_all = self._columns(child)
+                wanted = child_all if child_columns in ([], ["*"]) else child_columns
+                placeholders = ",".join("?" * len(ids))
+                for child_row in self.conn.execute(
+                    f"SELECT * FROM {_ident(child)} WHERE {_ident(child_key)} IN ({placeholders})"
+                    f" ORDER BY id",
+                    ids,
+                ).fetchall():
+                    grouped[child_row[child_key]].append(self._row(child, child_row, wanted))
+            for row in rows:
+                row[child] = grouped[row[parent_key]]
+
+        return [{k: v for k, v in row.items() if k in columns or k in embeds} for row in rows]
+
+    def insert(self, table: str, body, params: List[Tuple[str, str]], prefer: str) -> List[dict]:
+        records = body if isinstance(body, list) else [body]
+        all_columns = self._columns(table)
+        query = dict(params)
+        upsert = "resolution=merge-duplicates" in prefer
+        ignore = "resolution=ignore-duplicates" in prefer
+        inserted_ids = []
+        for record in records:
+            unknown = set(record) - set(all_columns)
+            if unknown:
+                raise PostgrestError(400, f"Unknown columns for {table}: {sorted(unknown)}")
+            keys = list(record)
+            values = [
+                (1 if v else 0) if (table, k) in BOOLEAN_COLUMNS else
+                (json.dumps(v) if isinstance(v, (dict, list)) else v)
+                for k, v in record.items()
+            ]
+            sql = (
+                f"INSERT INTO {_ident(table)} ({','.join(_ident(k) for k in keys)}) "
+                f"VALUES ({','.join('?' * len(keys))})"
+            )
+            if upsert or ignore:
+                conflict = query.get("on_conflict", "id")
+                targets = [_ident(c) for c in conflict.split(",")]
+                if ignore:
+                    sql += f" ON CONFLICT ({','.join(targets)}) DO NOTHING"
+                else:
+                    updates = ",".join(f"{_ident(k)}=excluded.{_ident(k)}" for k in keys)
+                    sql += f" ON CONFLICT ({','.join(targets)}) DO UPDATE SET {updates}"
+            sql += " RETURNING rowid"
+            row = self.conn.execute(sql, values).fetchone()
+            if row is not None:
+                inserted_ids.append(row[0])
+        self.conn.commit()
+        return self._fetch_ids(table, inserted_ids)
+
+    def update(self, table: str, body: dict, params: List[Tuple[str, str]]) -> List[dict]:
+        where, args = self._where(table, params)
+        ids = [row[0] for row in self.conn.execute(
+            f"SELECT rowid FROM {_ident(table)}{where}", args
+        ).fetchall()]
+        if ids and body:
+            assignments = ",".join(f"{_ident(k)} = ?" for k in body)
+            values = [json.dumps(v) if isinstance(v, (dict, list)) else v for v in body.values()]
+            placeholders = ",".join("?" * len(ids))
+            self.conn.execute(
+                f"UPDATE {_ident(table)} SET {assignments} WHERE rowid IN ({placeholders})",
+                values + ids,
+            )
+            self.conn.commit()
+        return self._fetch_ids(table, ids)
+
+    def delete(self, table: str, params: List[Tuple[str, str]]) -> List[dict]:
+        where, args = self._where(table, params)
+        rows = self.select(table, [("select", "*")] + params)
+        self.conn.execute(f"DELETE FROM {_ident(table)}{where}", args)
+        self.conn.commit()
+        return rows
+
+    def _fetch_ids(self, table: str, ids: List[int]) -> List[dict]:
+        """Rows by SQLite rowid (the ``id`` column where a table has one)."""
+        if not ids:
+            return []
+        columns = self._columns(table)
+        placeholders = ",".join("?" * len(ids))
+        rows = self.conn.execute(
+            f"SELECT * FROM {_ident(table)} WHERE rowid IN ({placeholders}) ORDER BY rowid", ids
+        ).fetchall()
+        return [self._row(table, row, columns) for row in rows]
+
+    # -- HTTP -------------------------------------------------------------
+
+    def _build_app(self) -> FastAPI:
+        app = FastAPI()
+
+        @app.api_route("/rest/v1/rpc/{name}", methods=["POST"])
+        async def rpc(name: str, request: Request):
+            handler = self.rpcs.get(name)
+            if handler is None:
+                return JSONResponse({"message": f"Function {name} not found"}, status_code=404)
+            body = await request.json() if await request.body() else {}
+            with self.lock:
+                result = handler(self.conn, body)
+                self.conn.commit()
+            return JSONResponse(result)
+
+        @app.api_route("/rest/v1/{table}", methods=["GET", "HEAD", "POST", "PATCH", "DELETE"])
+        async def rest(table: str, request: Request):
+            params = list(request.query_params.multi_items())
+            prefer = request.headers.get("prefer", "")
+            try:
+                raw = await request.body()
+                body = json.loads(raw) if raw else None
+                with self.lock:
+                    if request.method in ("GET", "HEAD"):
+                        data = self.select(table, params)
+                    elif request.method == "POST":
+                        data = self.insert(table, body, params, prefer)
+                    elif request.method == "PATCH":
+                        data = self.update(table, body or {}, params)
+                    else:
+                        data = self.delete(table, params)
+            except (PostgrestError, sqlite3.Error) as e:
+                status = getattr(e, "status", 400)
+                return JSONResponse({"message": str(e), "code": "FAKE"}, status_code=status)
+            if "return=minimal" in prefer:
+                return Response(status_code=204)
+            status_code = 201 if request.method == "POST" else 200
+            return JSONResponse(data, status_code=status_code)
+
+        @app.get("/auth/v1/user")
+        async def get_user(request: Request):
+            token = request.headers.get("authorization", "").removeprefix("Bearer ")
+            user_id = token.removeprefix("token-")
+            with self.lock:
+                row = self.conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
+            if row is None:
+                return JSONResponse({"msg": "invalid JWT"}, status_code=401)
+            return {
+                "id": row["id"],
+                "aud": "authenticated",
+                "email": row["email"],
+                "app_metadata": {},
+                "user_metadata": {"username": row["username"]},
+                "created_at": datetime.now(timezone.utc).isoformat(),
+            }
+
+        return app
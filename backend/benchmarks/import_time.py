@@ -0,0 +1,114 @@
+"""Measure cold-start import time of ``app.main``.
+
+Each run imports the app in a fresh interpreter, so the numbers include
+everything a scale-to-zero instance pays before it can serve a request.
+
+    python -m benchmarks.import_time                  # report
+    python -m benchmarks.import_time --budget-ms 800  # exit 1 if the median is slower
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+# Modules that should only load when a request needs them.
+DEFERRED_MODULES = ("openai", "supabase", "pypdf", "numpy")
+
+PROBE = f"""
+import json, sys, time
+start = time.perf_counter()
+import app.main
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+    "import_ms": elapsed * 1000,
+    "loaded": [m for m in {DEFERRED_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+PLACEHOLDER_ENV = {
+    "OPENROUTER_API_KEY": "import-time-benchmark",
+    "SUPABASE_URL": "http://127.0.0.1:1",
+    "SUPABASE_SERVICE_KEY": "import-time-benchmark",
+}
+
+
+def measure_once() -> dict:
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int) -> list:
+    """Top-level imports by cumulative time, from ``python -X importtime``."""
+    env = {**PLACEHOLDER_ENV, **os.environ}
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import app.main"],
+        cwd=BACKEND_DIR,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative_us), name.strip()))
+    rows.sort(reverse=True)
+    return rows[:limit]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, help="Fail if the median import time exceeds this")
+    parser.add_argument("--top", type=int, default=10, help="Show the N slowest imports")
+    parser.add_argument("--json", dest="json_path", help="Write results to this file")
+    args = parser.parse_args(argv)
+
+    runs = [measure_once() for _ in range(args.runs)]
+    times = [run["import_ms"] for run in runs]
+    loaded = sorted({m for run in runs for m in run["loaded"]})
+    result = {
+        "median_ms": round(statistics.median(times), 1),
+        "min_ms": round(min(times), 1),
+        "max_ms": round(max(times), 1),
+        "eagerly_loaded": loaded,
+    }
+
+    print(f"import app.main: median {result['median_ms']} ms "
+          f"(min {result['min_ms']}, max {result['max_ms']}, {args.runs} runs)")
+    if args.top:
+        print("slowest imports (cumulative):")
+        for cumulative_us, name in slowest_imports(args.top):
+            print(f"  {cumulative_us / 1000:8.1f} ms  {name}")
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    failures = []
+    if loaded:
+        failures.append(f"deferred modules imported at startup: {', '.join(loaded)}")
+    if args.budget_ms is not None and result["median_ms"] > args.budget_ms:
+        failures.append(f"median import time {result['median_ms']} ms exceeds budget {args.budget_ms} ms")
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,405 @@
+"""End-to-end benchmark and load test for the backend.
+
+Starts the fake Supabase and fake OpenRouter servers, runs the real app under
+uvicorn pointed at them, drives scripted scenarios over HTTP and reports
+p50/p95/p99 latency and throughput per scenario.
+
+    python -m benchmarks.run                       # full run
+    python -m benchmarks.run --quick               # small smoke run
+    python -m benchmarks.run --json out.json       # save results
+    python -m benchmarks.run --baseline base.json  # fail on p99 regression
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Dict, List, Optional
+
+import httpx
+import uvicorn
+
+from .fake_openrouter import FakeModelConfig
+from .fake_openrouter import create_app as create_openrouter_app
+from .fake_supabase import FakeSupabase
+from .pdf import make_pdf
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class ServerThread:
+    """Run an ASGI app under uvicorn in a background thread."""
+
+    def __init__(self, app):
+        self.port = _free_port()
+        self.url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(app, host="127.0.0.1", port=self.port, log_level="warning")
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    latencies: List[float] = field(default_factory=list)
+    errors: int = 0
+    wall_time: float = 0.0
+
+    def percentile(self, q: float) -> float:
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))
+        return ordered[index]
+
+    def summary(self) -> dict:
+        count = len(self.latencies)
+        return {
+            "requests": count,
+            "errors": self.errors,
+            "p50_ms": round(self.percentile(50) * 1000, 2),
+            "p95_ms": round(self.percentile(95) * 1000, 2),
+            "p99_ms": round(self.percentile(99) * 1000, 2),
+            "mean_ms": round(statistics.fmean(self.latencies) * 1000, 2) if count else 0.0,
+            "throughput_rps": round(count / self.wall_time, 2) if self.wall_time else 0.0,
+        }
+
+
+async def run_load(
+    name: str,
+    jobs: List[Callable[[], Awaitable[httpx.Response]]],
+    concurrency: int,
+) -> ScenarioResult:
+    """Run ``jobs`` with at most ``concurrency`` in flight and time each one."""
+    result = ScenarioResult(name)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_one(job):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                response = await job()
+                ok = response.status_code < 400
+            except httpx.HTTPError:
+                ok = False
+            result.latencies.append(time.perf_counter() - start)
+            if not ok:
+                result.errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(run_one(job) for job in jobs))
+    result.wall_time = time.perf_counter() - start
+    return result
+
+
+def make_cards(count: int, prefix: str = "word") -> List[dict]:
+    return [{"front": f"{prefix} {i}", "back": f"meaning of {prefix} {i}"} for i in range(count)]
+
+
+async def scenario_bulk_create(client, headers, args) -> ScenarioResult:
+    jobs = [
+        lambda i=i: client.post(
+            "/v1/flashcard-sets/",
+            json={"title": f"Set {i}", "description": "bench", "cards": make_cards(args.cards_per_set)},
+            headers=headers,
+        )
+        for i in range(args.sets)
+    ]
+    return await run_load("bulk_set_creation", jobs, args.concurrency)
+
+
+async def scenario_large_fetch(client, headers, args) -> ScenarioResult:
+    created = await client.post(
+        "/v1/flashcard-sets/",
+        json={"title": "Large", "description": "bench", "cards": make_cards(args.large_set_cards)},
+        headers=headers,
+        timeout=120,
+    )
+    created.raise_for_status()
+    set_id = created.json()["id"]
+    jobs = [
+        lambda: client.get(f"/v1/flashcard-sets/{set_id}", headers=headers, timeout=120)
+        for _ in range(args.fetches)
+    ]
+    return await run_load(f"fetch_{args.large_set_cards}_card_set", jobs, args.concurrency)
+
+
+async def scenario_study_session(client, headers, args) -> ScenarioResult:
+    created = await client.post(
+        "/v1/flashcard-sets/",
+        json={"title": "Study", "description": "bench", "cards": make_cards(args.study_cards)},
+        headers=headers,
+    )
+    created.raise_for_status()
+    set_id = created.json()["id"]
+    due = await client.get(f"/v1/reviews/due/{set_id}", headers=headers)
+    due.raise_for_status()
+    qualities = ["Again", "Hard", "Good", "Easy"]
+    jobs = [
+        lambda card=card, i=i: client.post(
+            "/v1/reviews",
+            json={"flashcard_id": card["id"], "response_quality": qualities[i % 4]},
+            headers=headers,
+        )
+        for i, card in enumerate(due.json())
+    ]
+    jobs.append(lambda: client.get(f"/v1/reviews/due/{set_id}", headers=headers))
+    jobs.append(lambda: client.get(f"/v1/flashcard-sets/{set_id}/progress", headers=headers))
+    jobs.append(lambda: client.get("/v1/activity", headers=headers))
+    jobs.append(lambda: client.get("/v1/progress", headers=headers))
+    jobs.append(lambda: client.get("/v1/reviews/due-counts", headers=headers))
+    jobs.append(lambda: client.get("/v1/reviews/forecast", headers=headers))
+    return await run_load("study_session", jobs, args.concurrency)
+
+
+async def scenario_pdf_uploads(client, headers, args) -> ScenarioResult:
+    pdf = make_pdf([
+        [f"vocabulary line {page}-{line} alpha beta gamma" for line in range(40)]
+        for page in range(args.pdf_pages)
+    ])
+    jobs = [
+        lambda: client.post(
+            "/v1/upload/",
+            files={"files": ("doc.pdf", pdf, "application/pdf")},
+            data={"back_language": "english"},
+            headers=headers,
+            timeout=120,
+        )
+        for _ in range(args.uploads)
+    ]
+    return await run_load("concurrent_pdf_uploads", jobs, args.concurrency)
+
+
+async def scenario_pdf_reupload(client, headers, args) -> ScenarioResult:
+    lines = [[f"vocabulary line {page}-{line} alpha beta gamma" for line in range(40)]
+             for page in range(args.pdf_pages)]
+    original = make_pdf(lines)
+    edited = make_pdf(lines[:-1] + [[f"revised line {line} delta epsilon" for line in range(40)]])
+    # The normal flow: upload, then create the set from the generated cards and pages.
+    generated = await client.post(
+        "/v1/upload/",
+        files={"files": ("doc.pdf", original, "application/pdf")},
+        data={"back_language": "english"},
+        headers=headers,
+        timeout=120,
+    )
+    generated.raise_for_status()
+    created = await client.post(
+        "/v1/flashcard-sets/",
+        json={"title": "Document", "description": "bench",
+              "cards": generated.json()["flashcards"], "pages": generated.json()["pages"]},
+        headers=headers,
+    )
+    created.raise_for_status()
+    set_id = created.json()["id"]
+
+    def upload(pdf: bytes):
+        return client.post(
+            f"/v1/upload/sets/{set_id}",
+            files={"files": ("doc.pdf", pdf, "application/pdf")},
+            data={"back_language": "english"},
+            headers=headers,
+            timeout=120,
+        )
+
+    async def reupload(pdf: bytes):
+        response = await upload(pdf)
+        if response.status_code == 200 and response.json()["regenerated_pages"] > 1:
+            raise httpx.HTTPError(f"regenerated unchanged pages: {response.json()}")
+        return response
+
+    # Sequential: each re-upload toggles the last page, so one page regenerates.
+    jobs = [lambda pdf=(edited if i % 2 == 0 else original): reupload(pdf) for i in range(args.uploads)]
+    return await run_load(f"pdf_reupload_{args.pdf_pages}_pages", jobs, 1)
+
+
+async def scenario_search(client, headers, args) -> ScenarioResult:
+    queries = ["word 1", "meaning", "word 42", "of word"]
+    jobs = [
+        lambda q=queries[i % len(queries)]: client.get("/v1/search", params={"q": q}, headers=headers)
+        for i in range(args.searches)
+    ]
+    return await run_load("search", jobs, args.concurrency)
+
+
+async def scenario_quiz(client, headers, args) -> ScenarioResult:
+    created = await client.post(
+        "/v1/flashcard-sets/",
+        json={"title": "Quiz", "description": "bench", "cards": make_cards(args.study_cards)},
+        headers=headers,
+    )
+    created.raise_for_status()
+    set_id = created.json()["id"]
+    jobs = [
+        lambda i=i: client.get(
+            f"/v1/flashcard-sets/{set_id}/quiz",
+            params={"seed": 7, "offset": (i * 10) % args.study_cards, "limit": 10},
+            headers=headers,
+        )
+        for i in range(args.fetches * 5)
+    ]
+    return await run_load("quiz_pages", jobs, args.concurrency)
+
+
+async def scenario_import_export(client, headers, args) -> ScenarioResult:
+    deck = "front,back\n" + "".join(f"word {i},meaning of word {i}\n" for i in range(args.import_cards))
+
+    async def import_then_export():
+        imported = await client.post(
+            "/v1/flashcard-sets/import",
+            files={"file": ("deck.csv", deck.encode("utf-8"), "text/csv")},
+            headers=headers,
+            timeout=300,
+        )
+        imported.raise_for_status()
+        done = json.loads(imported.text.splitlines()[-1])
+        if done["event"] != "done" or done["imported"] != args.import_cards:
+            raise httpx.HTTPError(f"import failed: {done}")
+        exported = await client.get(f"/v1/flashcard-sets/{done['set_id']}/export", headers=headers, timeout=300)
+        if exported.status_code == 200 and exported.text.count("\n") != args.import_cards + 1:
+            raise httpx.HTTPError("export is missing cards")
+        return exported
+
+    jobs = [import_then_export for _ in range(args.imports)]
+    return await run_load(f"import_export_{args.import_cards}_cards", jobs, args.concurrency)
+
+
+SCENARIOS: Dict[str, Callable] = {
+    "bulk_create": scenario_bulk_create,
+    "large_fetch": scenario_large_fetch,
+    "study_session": scenario_study_session,
+    "pdf_uploads": scenario_pdf_uploads,
+    "pdf_reupload": scenario_pdf_reupload,
+    "search": scenario_search,
+    "quiz": scenario_quiz,
+    "import_export": scenario_import_export,
+}
+
+
+def print_report(results: List[ScenarioResult]) -> None:
+    header = f"{'scenario':<28}{'reqs':>6}{'errs':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        s = result.summary()
+        print(
+            f"{result.name:<28}{s['requests']:>6}{s['errors']:>6}"
+            f"{s['p50_ms']:>10.1f}{s['p95_ms']:>10.1f}{s['p99_ms']:>10.1f}{s['throughput_rps']:>10.1f}"
+        )
+
+
+def check_baseline(summaries: Dict[str, dict], baseline_path: str, max_regression: float) -> List[str]:
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = json.load(f)
+    failures = []
+    for name, current in summaries.items():
+        previous = baseline.get(name)
+        if not previous or not previous.get("p99_ms"):
+            continue
+        limit = previous["p99_ms"] * (1 + max_regression)
+        if current["p99_ms"] > limit:
+            failures.append(f"{name}: p99 {current['p99_ms']}ms > {limit:.1f}ms (baseline {previous['p99_ms']}ms)")
+    return failures
+
+
+def find_failures(summaries: Dict[str, dict], baseline_path: Optional[str] = None,
+                  max_regression: float = 0.0) -> List[str]:
+    """Scenarios with errors, plus p99 regressions against the baseline if given."""
+    failures = [f"{name}: {s['errors']} errors" for name, s in summaries.items() if s["errors"]]
+    if baseline_path:
+        failures += check_baseline(summaries, baseline_path, max_regression)
+    return failures
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma-separated scenario names")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--sets", type=int, default=50)
+    parser.add_argument("--cards-per-set", type=int, default=100)
+    parser.add_argument("--large-set-cards", type=int, default=10_000)
+    parser.add_argument("--fetches", type=int, default=20)
+    parser.add_argument("--study-cards", type=int, default=200)
+    parser.add_argument("--uploads", type=int, default=20)
+    parser.add_argument("--pdf-pages", type=int, default=5)
+    parser.add_argument("--searches", type=int, default=200)
+    parser.add_argument("--imports", type=int, default=3)
+    parser.add_argument("--import-cards", type=int, default=100_000)
+    parser.add_argument("--llm-latency-ms", type=float, default=200.0)
+    parser.add_argument("--llm-per-token-ms", type=float, default=0.0)
+    parser.add_argument("--quick", action="store_true", help="Tiny sizes for smoke testing")
+    parser.add_argument("--json", dest="json_path", help="Write per-scenario summaries to this file")
+    parser.add_argument("--baseline", help="Compare p99 and errors against a previous --json output")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed p99 increase (fraction)")
+    args = parser.parse_args(argv)
+    if args.quick:
+        args.sets, args.cards_per_set, args.large_set_cards = 5, 10, 200
+        args.fetches, args.study_cards, args.uploads = 3, 10, 3
+        args.pdf_pages, args.llm_latency_ms, args.searches = 2, 5.0, 10
+        args.imports, args.import_cards = 2, 2000
+    return args
+
+
+async def _run_scenarios(app_url: str, token: str, args) -> List[ScenarioResult]:
+    headers = {"Authorization": f"Bearer {token}"}
+    limits = httpx.Limits(max_connections=args.concurrency * 2)
+    results = []
+    async with httpx.AsyncClient(base_url=app_url, limits=limits, timeout=60) as client:
+        for name in args.scenarios.split(","):
+            results.append(await SCENARIOS[name.strip()](client, headers, args))
+    return results
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    fake_db = FakeSupabase()
+    llm_config = FakeModelConfig(latency_ms=args.llm_latency_ms, per_token_ms=args.llm_per_token_ms)
+
+    with ServerThread(fake_db.app) as supabase_server, \
+            ServerThread(create_openrouter_app(llm_config)) as llm_server:
+        os.environ.update({
+            "SUPABASE_URL": supabase_server.url,
+            "SUPABASE_SERVICE_KEY": "bench-service-key",
+            "OPENROUTER_API_KEY": "bench-key",
+            "OPENROUTER_BASE_URL": f"{llm_server.url}/v1",
+        })
+        from app.main import app
+
+        _, token = fake_db.create_user()
+        with ServerThread(app) as app_server:
+            results = asyncio.run(_run_scenarios(app_server.url, token, args))
+
+    print_report(results)
+    summaries = {result.name: result.summary() for result in results}
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump(summaries, f, indent=2)
+
+    failures = find_failures(summaries, args.baseline, args.max_regression)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,39 @@
+"""
+Archive and compact old card reviews.
+
+Raw reviews older than the retention window (rounded down to the start of
+the month) are written to columnar archive files, then folded into the
+card_review_daily aggregates and dropped from card_reviews. Run it
+periodically, e.g. as a daily cron job; repeated runs are safe. The archive
+directory must be on durable storage (a mounted volume or synced bucket, not
+a container's ephemeral disk): compacted reviews are only kept there.
+
+Requires migrations/partition_card_reviews.sql.
+"""
+import argparse
+
+from app.core.config import settings
+from app.db import database
+from app.services import archive
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--retention-days", type=int, default=settings.review_retention_days,
+                        help="Keep raw reviews from at least this many days ago")
+    parser.add_argument("--archive-dir", default=settings.review_archive_dir,
+                        help="Durable directory for the archive files (default: REVIEW_ARCHIVE_DIR)")
+    args = parser.parse_args(argv)
+    if not args.archive_dir:
+        parser.error("set REVIEW_ARCHIVE_DIR or pass --archive-dir: compacted reviews "
+                     "exist only in the archive, so it must be on durable storage")
+
+    before = database.review_compaction_cutoff(args.retention_days)
+    print(f"Archiving reviews before {before} to {args.archive_dir} ({archive.archive_format()})...")
+    result = database.archive_and_compact_reviews(before, args.archive_dir)
+    print(f"Archived {result['archived']} reviews in {len(result['files'])} file(s); "
+          f"compacted {result['compacted']}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+-- Pinyin readings of card fronts, computed by the backend when cards are
+-- saved: {"pinyin": "xué xí", "numbered": "xue2 xi2"} (NULL when the front
+-- has no Chinese characters, contains kana (Japanese) or the card predates
+-- readings)
+ALTER TABLE flashcards ADD COLUMN IF NOT EXISTS reading JSONB;
+
+-- Japanese fronts (any kana) were briefly given Mandarin readings of their
+-- kanji. Listing front in SET fires the sync version trigger, so clients
+-- pick up the cleared reading.
+UPDATE flashcards
+SET reading = NULL, front = front
+WHERE reading IS NOT NULL AND front ~ '[\u3040-\u30ff]';
@@ -0,0 +1,63 @@
+-- Per-user daily review rollup for streaks and activity heatmaps
+
+CREATE TABLE IF NOT EXISTS user_daily_activity (
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    activity_date DATE NOT NULL,
+    reviews INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, activity_date)
+);
+
+-- Atomically add to a day's counters (called once per recorded review)
+CREATE OR REPLACE FUNCTION record_daily_activity(
+    p_user_id UUID,
+    p_date DATE,
+    p_reviews INTEGER DEFAULT 1,
+    p_correct INTEGER DEFAULT 0
+) RETURNS void
+LANGUAGE sql
+AS $$
+    INSERT INTO user_daily_activity (user_id, activity_date, reviews, correct)
+    VALUES (p_user_id, p_date, p_reviews, p_correct)
+    ON CONFLICT (user_id, activity_date) DO UPDATE
+    SET reviews = user_daily_activity.reviews + EXCLUDED.reviews,
+        correct = user_daily_activity.correct + EXCLUDED.correct;
+$$;
+
+-- Backfill from existing review history
+INSERT INTO user_daily_activity (user_id, activity_date, reviews, correct)
+SELECT user_id,
+       reviewed_at::date,
+       COUNT(*),
+       COUNT(*) FILTER (WHERE was_correct)
+FROM card_reviews
+WHERE user_id IS NOT NULL
+GROUP BY user_id, reviewed_at::date
+ON CONFLICT (user_id, activity_date) DO NOTHING;
+
+-- SRS reviews (POST /reviews) only update user_flashcard_progress, which
+-- keeps the day of a card's first review (created_at) and of its latest
+-- (updated_at); count those days where card_reviews has nothing. Reviews
+-- in between are not recoverable. The latest review passed if the card's
+-- repetitions weren't reset.
+INSERT INTO user_daily_activity (user_id, activity_date, reviews, correct)
+SELECT user_id, activity_date, COUNT(*), COUNT(*) FILTER (WHERE was_correct)
+FROM (
+    SELECT user_id, created_at::date AS activity_date,
+           (repetitions > 0 AND updated_at::date = created_at::date) AS was_correct
+    FROM user_flashcard_progress
+    UNION ALL
+    SELECT user_id, updated_at::date, repetitions > 0
+    FROM user_flashcard_progress
+    WHERE updated_at::date > created_at::date
+) srs_reviews
+WHERE user_id IS NOT NULL AND activity_date IS NOT NULL
+GROUP BY user_id, activity_date
+ON CONFLICT (user_id, activity_date) DO NOTHING;
+
+-- Enable RLS (Row Level Security) for user data isolation
+ALTER TABLE user_daily_activity ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can only see their own daily activity" ON user_daily_activity;
+CREATE POLICY "Users can only see their own daily activity" ON user_daily_activity
+    FOR ALL USING (auth.uid() = user_id);
@@ -0,0 +1,28 @@
+-- Page-level tracking of the documents sets were generated from
+
+-- Content hash of the document page a card was generated from (NULL for
+-- cards added by hand or before page tracking)
+ALTER TABLE flashcards ADD COLUMN IF NOT EXISTS source_page TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_flashcards_set_source_page ON flashcards(set_id, source_page);
+
+-- The pages of a set's source document, by content hash
+CREATE TABLE IF NOT EXISTS flashcard_set_pages (
+    set_id INTEGER REFERENCES flashcard_sets(id) ON DELETE CASCADE,
+    content_hash TEXT NOT NULL,
+    page_number INTEGER NOT NULL,
+    PRIMARY KEY (set_id, content_hash)
+);
+
+-- Enable RLS (Row Level Security) for user data isolation
+ALTER TABLE flashcard_set_pages ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can only see pages of their own sets" ON flashcard_set_pages;
+CREATE POLICY "Users can only see pages of their own sets" ON flashcard_set_pages
+    FOR ALL USING (
+        EXISTS (
+            SELECT 1 FROM flashcard_sets
+            WHERE flashcard_sets.id = flashcard_set_pages.set_id
+              AND flashcard_sets.owner_id = auth.uid()
+        )
+    );
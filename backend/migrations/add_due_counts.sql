@@ -0,0 +1,257 @@
+-- Incrementally maintained due counts per user, set and date
+--
+-- set_due_counts holds, for each user and set, how many reviewed cards are
+-- next due on each date. flashcard_sets.card_count holds the number of
+-- cards in a set, so cards never reviewed are card_count minus the scheduled
+-- cards. Both are kept up to date by statement-level triggers (one UPDATE per
+-- statement, not per row, so bulk imports and set deletes stay cheap) and
+-- can be rebuilt from flashcards and user_flashcard_progress with
+-- rebuild_set_due_counts().
+-- Requires add_srs_progress.sql.
+
+BEGIN;
+
+-- 1. Denormalised columns the triggers need
+ALTER TABLE flashcard_sets ADD COLUMN IF NOT EXISTS card_count INTEGER NOT NULL DEFAULT 0;
+
+-- Progress rows carry their card's set so that deletes cascading from
+-- flashcards can still be attributed to a set.
+ALTER TABLE user_flashcard_progress
+    ADD COLUMN IF NOT EXISTS set_id INTEGER REFERENCES flashcard_sets(id) ON DELETE CASCADE;
+
+UPDATE user_flashcard_progress
+SET set_id = flashcards.set_id
+FROM flashcards
+WHERE flashcards.id = user_flashcard_progress.flashcard_id AND user_flashcard_progress.set_id IS NULL;
+
+CREATE OR REPLACE FUNCTION set_progress_set_id() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF NEW.set_id IS NULL THEN
+        SELECT set_id INTO NEW.set_id FROM flashcards WHERE id = NEW.flashcard_id;
+    END IF;
+    RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS user_flashcard_progress_set_id ON user_flashcard_progress;
+CREATE TRIGGER user_flashcard_progress_set_id
+    BEFORE INSERT ON user_flashcard_progress
+    FOR EACH ROW EXECUTE FUNCTION set_progress_set_id();
+
+-- 2. Scheduled cards per user, set and due date
+CREATE TABLE IF NOT EXISTS set_due_counts (
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    set_id INTEGER REFERENCES flashcard_sets(id) ON DELETE CASCADE,
+    due_date DATE NOT NULL,
+    cards INTEGER NOT NULL,
+    PRIMARY KEY (user_id, set_id, due_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_set_due_counts_user_date ON set_due_counts(user_id, due_date);
+
+-- 3. Triggers. Decrements are UPDATEs (never inserts), so they are no-ops
+-- for rows already removed by a cascading set delete.
+CREATE OR REPLACE FUNCTION flashcards_count_inserted() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE flashcard_sets
+    SET card_count = card_count + added.cards
+    FROM (SELECT set_id, COUNT(*)::INTEGER AS cards FROM inserted GROUP BY set_id) added
+    WHERE flashcard_sets.id = added.set_id;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION flashcards_count_deleted() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE flashcard_sets
+    SET card_count = GREATEST(card_count - removed.cards, 0)
+    FROM (SELECT set_id, COUNT(*)::INTEGER AS cards FROM deleted GROUP BY set_id) removed
+    WHERE flashcard_sets.id = removed.set_id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS flashcards_card_count_insert ON flashcards;
+CREATE TRIGGER flashcards_card_count_insert
+    AFTER INSERT ON flashcards
+    REFERENCING NEW TABLE AS inserted
+    FOR EACH STATEMENT EXECUTE FUNCTION flashcards_count_inserted();
+
+DROP TRIGGER IF EXISTS flashcards_card_count_delete ON flashcards;
+CREATE TRIGGER flashcards_card_count_delete
+    AFTER DELETE ON flashcards
+    REFERENCING OLD TABLE AS deleted
+    FOR EACH STATEMENT EXECUTE FUNCTION flashcards_count_deleted();
+
+CREATE OR REPLACE FUNCTION progress_due_inserted() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO set_due_counts (user_id, set_id, due_date, cards)
+    SELECT user_id, set_id, next_review_date, COUNT(*)::INTEGER
+    FROM inserted
+    WHERE set_id IS NOT NULL
+    GROUP BY user_id, set_id, next_review_date
+    ON CONFLICT (user_id, set_id, due_date) DO UPDATE
+    SET cards = set_due_counts.cards + EXCLUDED.cards;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION progress_due_deleted() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    UPDATE set_due_counts
+    SET cards = set_due_counts.cards - removed.cards
+    FROM (
+        SELECT user_id, set_id, next_review_date, COUNT(*)::INTEGER AS cards
+        FROM deleted
+        GROUP BY user_id, set_id, next_review_date
+    ) removed
+    WHERE set_due_counts.user_id = removed.user_id
+      AND set_due_counts.set_id = removed.set_id
+      AND set_due_counts.due_date = removed.next_review_date;
+    DELETE FROM set_due_counts
+    USING deleted
+    WHERE set_due_counts.user_id = deleted.user_id
+      AND set_due_counts.set_id = deleted.set_id
+      AND set_due_counts.due_date = deleted.next_review_date
+      AND set_due_counts.cards <= 0;
+    RETURN NULL;
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION progress_due_updated() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    -- Move each card from its old due date to its new one
+    UPDATE set_due_counts
+    SET cards = set_due_counts.cards - moved.cards
+    FROM (
+        SELECT user_id, set_id, next_review_date, COUNT(*)::INTEGER AS cards
+        FROM deleted
+        GROUP BY user_id, set_id, next_review_date
+    ) moved
+    WHERE set_due_counts.user_id = moved.user_id
+      AND set_due_counts.set_id = moved.set_id
+      AND set_due_counts.due_date = moved.next_review_date;
+
+    INSERT INTO set_due_counts (user_id, set_id, due_date, cards)
+    SELECT user_id, set_id, next_review_date, COUNT(*)::INTEGER
+    FROM inserted
+    WHERE set_id IS NOT NULL
+    GROUP BY user_id, set_id, next_review_date
+    ON CONFLICT (user_id, set_id, due_date) DO UPDATE
+    SET cards = set_due_counts.cards + EXCLUDED.cards;
+
+    DELETE FROM set_due_counts
+    USING deleted
+    WHERE set_due_counts.user_id = deleted.user_id
+      AND set_due_counts.set_id = deleted.set_id
+      AND set_due_counts.due_date = deleted.next_review_date
+      AND set_due_counts.cards <= 0;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS user_flashcard_progress_due_insert ON user_flashcard_progress;
+CREATE TRIGGER user_flashcard_progress_due_insert
+    AFTER INSERT ON user_flashcard_progress
+    REFERENCING NEW TABLE AS inserted
+    FOR EACH STATEMENT EXECUTE FUNCTION progress_due_inserted();
+
+DROP TRIGGER IF EXISTS user_flashcard_progress_due_update ON user_flashcard_progress;
+CREATE TRIGGER user_flashcard_progress_due_update
+    AFTER UPDATE ON user_flashcard_progress
+    REFERENCING OLD TABLE AS deleted NEW TABLE AS inserted
+    FOR EACH STATEMENT EXECUTE FUNCTION progress_due_updated();
+
+DROP TRIGGER IF EXISTS user_flashcard_progress_due_delete ON user_flashcard_progress;
+CREATE TRIGGER user_flashcard_progress_due_delete
+    AFTER DELETE ON user_flashcard_progress
+    REFERENCING OLD TABLE AS deleted
+    FOR EACH STATEMENT EXECUTE FUNCTION progress_due_deleted();
+
+-- 4. Bulk rebuild (all users when p_user_id is NULL)
+CREATE OR REPLACE FUNCTION rebuild_set_due_counts(p_user_id UUID DEFAULT NULL)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    rebuilt INTEGER;
+BEGIN
+    UPDATE flashcard_sets
+    SET card_count = (SELECT COUNT(*) FROM flashcards WHERE flashcards.set_id = flashcard_sets.id)
+    WHERE p_user_id IS NULL OR owner_id = p_user_id;
+
+    DELETE FROM set_due_counts WHERE p_user_id IS NULL OR user_id = p_user_id;
+
+    INSERT INTO set_due_counts (user_id, set_id, due_date, cards)
+    SELECT user_id, set_id, next_review_date, COUNT(*)::INTEGER
+    FROM user_flashcard_progress
+    WHERE set_id IS NOT NULL AND (p_user_id IS NULL OR user_id = p_user_id)
+    GROUP BY user_id, set_id, next_review_date;
+
+    GET DIAGNOSTICS rebuilt = ROW_COUNT;
+    RETURN rebuilt;
+END;
+$$;
+
+-- 5. Reads
+-- Per owned set: total cards, never-reviewed cards, cards due on or before
+-- p_date and the next date anything else comes due.
+CREATE OR REPLACE FUNCTION get_set_due_counts(p_user_id UUID, p_date DATE)
+RETURNS TABLE (set_id INTEGER, total_cards INTEGER, new_cards INTEGER,
+               due_cards INTEGER, next_due_date DATE)
+LANGUAGE sql STABLE
+AS $$
+    SELECT flashcard_sets.id,
+           flashcard_sets.card_count,
+           GREATEST(flashcard_sets.card_count - COALESCE(due.scheduled, 0), 0)::INTEGER,
+           COALESCE(due.due, 0)::INTEGER,
+           due.next_due_date
+    FROM flashcard_sets
+    LEFT JOIN (
+        SELECT set_due_counts.set_id,
+               SUM(cards) AS scheduled,
+               SUM(cards) FILTER (WHERE due_date <= p_date) AS due,
+               MIN(due_date) FILTER (WHERE due_date > p_date) AS next_due_date
+        FROM set_due_counts
+        WHERE user_id = p_user_id
+        GROUP BY set_due_counts.set_id
+    ) due ON due.set_id = flashcard_sets.id
+    WHERE flashcard_sets.owner_id = p_user_id
+    ORDER BY flashcard_sets.id;
+$$;
+
+-- Scheduled reviews per day from p_date for p_days days; overdue cards
+-- count towards p_date.
+CREATE OR REPLACE FUNCTION get_due_forecast(p_user_id UUID, p_date DATE, p_days INTEGER)
+RETURNS TABLE (due_date DATE, cards INTEGER)
+LANGUAGE sql STABLE
+AS $$
+    SELECT GREATEST(due_date, p_date), SUM(cards)::INTEGER
+    FROM set_due_counts
+    WHERE user_id = p_user_id AND due_date < p_date + p_days
+    GROUP BY GREATEST(due_date, p_date)
+    ORDER BY 1;
+$$;
+
+-- Enable RLS (Row Level Security) for user data isolation
+ALTER TABLE set_due_counts ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can only see their own due counts" ON set_due_counts;
+CREATE POLICY "Users can only see their own due counts" ON set_due_counts
+    FOR ALL USING (auth.uid() = user_id);
+
+SELECT rebuild_set_due_counts();
+
+COMMIT;
@@ -0,0 +1,23 @@
+-- Grouped per-set progress, so a user's whole library is summarised in one
+-- query per view instead of one review scan per set.
+-- Requires partition_card_reviews.sql (card_review_summary).
+
+-- Number of cards in each set, including empty sets
+CREATE OR REPLACE VIEW flashcard_set_sizes WITH (security_invoker = true) AS
+SELECT flashcard_sets.id AS set_id,
+       flashcard_sets.owner_id,
+       COUNT(flashcards.id)::INTEGER AS total_cards
+FROM flashcard_sets
+LEFT JOIN flashcards ON flashcards.set_id = flashcard_sets.id
+GROUP BY flashcard_sets.id, flashcard_sets.owner_id;
+
+-- Review totals per user and set, over compacted and raw reviews
+CREATE OR REPLACE VIEW set_review_summary WITH (security_invoker = true) AS
+SELECT user_id,
+       set_id,
+       COUNT(*)::INTEGER AS cards_studied,
+       SUM(reviews)::INTEGER AS reviews,
+       SUM(correct)::INTEGER AS correct,
+       MAX(last_reviewed_at) AS last_reviewed_at
+FROM card_review_summary
+GROUP BY user_id, set_id;
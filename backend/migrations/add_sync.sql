@@ -0,0 +1,194 @@
+-- Change versions and tombstones for delta sync (GET /v1/sync)
+--
+-- Every insert or content update of a set or card records the id of the
+-- transaction that wrote it as its version, and every delete leaves a
+-- tombstone versioned the same way. A client's cursor is the highest
+-- version it has seen; "what changed since" is an index range scan per
+-- table.
+--
+-- Versions come from transaction ids rather than a sequence so that a
+-- transaction which commits late can't slip under a client's cursor:
+-- get_sync_changes() only hands out versions below the oldest transaction
+-- still running (pg_snapshot_xmin), and every transaction that commits
+-- later has an id at or above it.
+
+BEGIN;
+
+-- Existing rows all get this migration's transaction id
+ALTER TABLE flashcard_sets
+    ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint),
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW();
+ALTER TABLE flashcards
+    ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint),
+    ADD COLUMN IF NOT EXISTS updated_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW();
+
+CREATE INDEX IF NOT EXISTS idx_flashcard_sets_owner_version ON flashcard_sets(owner_id, version);
+CREATE INDEX IF NOT EXISTS idx_flashcards_set_version ON flashcards(set_id, version);
+
+CREATE OR REPLACE FUNCTION bump_sync_version() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    NEW.version := pg_current_xact_id()::text::bigint;
+    NEW.updated_at := NOW();
+    RETURN NEW;
+END;
+$$;
+
+-- Only content columns bump the version; card_count and source_page
+-- bookkeeping don't concern clients.
+DROP TRIGGER IF EXISTS flashcard_sets_sync_version ON flashcard_sets;
+CREATE TRIGGER flashcard_sets_sync_version
+    BEFORE UPDATE OF title, description ON flashcard_sets
+    FOR EACH ROW EXECUTE FUNCTION bump_sync_version();
+
+DROP TRIGGER IF EXISTS flashcards_sync_version ON flashcards;
+CREATE TRIGGER flashcards_sync_version
+    BEFORE UPDATE OF front, back, set_id ON flashcards
+    FOR EACH ROW EXECUTE FUNCTION bump_sync_version();
+
+-- Deleted sets and cards
+CREATE TABLE IF NOT EXISTS sync_tombstones (
+    id BIGSERIAL PRIMARY KEY,
+    version BIGINT NOT NULL DEFAULT (pg_current_xact_id()::text::bigint),
+    owner_id UUID NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('set', 'card')),
+    object_id INTEGER NOT NULL,
+    set_id INTEGER NOT NULL,
+    deleted_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_sync_tombstones_owner_version ON sync_tombstones(owner_id, version);
+
+CREATE OR REPLACE FUNCTION flashcard_sets_tombstone() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO sync_tombstones (owner_id, kind, object_id, set_id)
+    SELECT owner_id, 'set', id, id FROM deleted WHERE owner_id IS NOT NULL;
+    RETURN NULL;
+END;
+$$;
+
+-- Cards removed along with their set are covered by the set's tombstone;
+-- the join skips them because the set row is already gone.
+CREATE OR REPLACE FUNCTION flashcards_tombstone() RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    INSERT INTO sync_tombstones (owner_id, kind, object_id, set_id)
+    SELECT flashcard_sets.owner_id, 'card', deleted.id, deleted.set_id
+    FROM deleted
+    JOIN flashcard_sets ON flashcard_sets.id = deleted.set_id;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS flashcard_sets_sync_tombstone ON flashcard_sets;
+CREATE TRIGGER flashcard_sets_sync_tombstone
+    AFTER DELETE ON flashcard_sets
+    REFERENCING OLD TABLE AS deleted
+    FOR EACH STATEMENT EXECUTE FUNCTION flashcard_sets_tombstone();
+
+DROP TRIGGER IF EXISTS flashcards_sync_tombstone ON flashcards;
+CREATE TRIGGER flashcards_sync_tombstone
+    AFTER DELETE ON flashcards
+    REFERENCING OLD TABLE AS deleted
+    FOR EACH STATEMENT EXECUTE FUNCTION flashcards_tombstone();
+
+-- Oldest transaction that may still commit: everything below it is settled
+CREATE OR REPLACE FUNCTION sync_horizon()
+RETURNS BIGINT
+LANGUAGE sql STABLE
+AS $$
+    SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint;
+$$;
+
+-- One page of a user's changes with a version in (p_since, horizon), read
+-- from one snapshot. Each of sets, cards and tombstones is read up to
+-- p_limit rows; when one fills up, the cursor stops at the lowest p_limit-th
+-- version among the full ones and all rows up to it are returned (a
+-- transaction's changes are never split across pages), so no change is
+-- skipped. Otherwise the cursor moves up to just below the horizon.
+CREATE OR REPLACE FUNCTION get_sync_changes(p_user_id UUID, p_since BIGINT, p_limit INTEGER)
+RETURNS JSONB
+LANGUAGE plpgsql STABLE
+AS $$
+DECLARE
+    horizon BIGINT := sync_horizon();
+    full_versions BIGINT[] := '{}';
+    last_version BIGINT;
+    cursor_version BIGINT;
+BEGIN
+    SELECT version INTO last_version FROM flashcard_sets
+    WHERE owner_id = p_user_id AND version > p_since AND version < horizon
+    ORDER BY version OFFSET p_limit - 1 LIMIT 1;
+    IF FOUND THEN
+        full_versions := full_versions || last_version;
+    END IF;
+
+    SELECT flashcards.version INTO last_version
+    FROM flashcards
+    JOIN flashcard_sets ON flashcard_sets.id = flashcards.set_id
+    WHERE flashcard_sets.owner_id = p_user_id
+      AND flashcards.version > p_since AND flashcards.version < horizon
+    ORDER BY flashcards.version OFFSET p_limit - 1 LIMIT 1;
+    IF FOUND THEN
+        full_versions := full_versions || last_version;
+    END IF;
+
+    SELECT version INTO last_version FROM sync_tombstones
+    WHERE owner_id = p_user_id AND version > p_since AND version < horizon
+    ORDER BY version OFFSET p_limit - 1 LIMIT 1;
+    IF FOUND THEN
+        full_versions := full_versions || last_version;
+    END IF;
+
+    IF cardinality(full_versions) > 0 THEN
+        SELECT MIN(v) INTO cursor_version FROM unnest(full_versions) AS v;
+    ELSE
+        cursor_version := GREATEST(p_since, horizon - 1);
+    END IF;
+
+    RETURN jsonb_build_object(
+        'cursor', cursor_version,
+        'has_more', cardinality(full_versions) > 0,
+        'sets', COALESCE((
+            SELECT jsonb_agg(to_jsonb(changed) ORDER BY changed.version)
+            FROM (
+                SELECT id, title, description, owner_id, version, updated_at
+                FROM flashcard_sets
+                WHERE owner_id = p_user_id AND version > p_since AND version <= cursor_version
+            ) changed
+        ), '[]'::jsonb),
+        'cards', COALESCE((
+            SELECT jsonb_agg(to_jsonb(changed) ORDER BY changed.version)
+            FROM (
+                SELECT flashcards.id, flashcards.front, flashcards.back, flashcards.reading,
+                       flashcards.set_id, flashcards.version, flashcards.updated_at
+                FROM flashcards
+                JOIN flashcard_sets ON flashcard_sets.id = flashcards.set_id
+                WHERE flashcard_sets.owner_id = p_user_id
+                  AND flashcards.version > p_since AND flashcards.version <= cursor_version
+            ) changed
+        ), '[]'::jsonb),
+        'deleted', COALESCE((
+            SELECT jsonb_agg(to_jsonb(changed) ORDER BY changed.version)
+            FROM (
+                SELECT version, kind, object_id
+                FROM sync_tombstones
+                WHERE owner_id = p_user_id AND version > p_since AND version <= cursor_version
+            ) changed
+        ), '[]'::jsonb)
+    );
+END;
+$$;
+
+-- Enable RLS (Row Level Security) for user data isolation
+ALTER TABLE sync_tombstones ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can only see their own tombstones" ON sync_tombstones;
+CREATE POLICY "Users can only see their own tombstones" ON sync_tombstones
+    FOR ALL USING (auth.uid() = owner_id);
+
+COMMIT;
@@ -0,0 +1,42 @@
+-- Per-user daily LLM token usage, by model
+
+CREATE TABLE IF NOT EXISTS user_token_usage (
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    usage_date DATE NOT NULL,
+    model TEXT NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    prompt_tokens BIGINT NOT NULL DEFAULT 0,
+    completion_tokens BIGINT NOT NULL DEFAULT 0,
+    cached_tokens BIGINT NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, usage_date, model)
+);
+
+-- Atomically add one request's counts (called after each generation request)
+CREATE OR REPLACE FUNCTION record_token_usage(
+    p_user_id UUID,
+    p_date DATE,
+    p_model TEXT,
+    p_requests INTEGER,
+    p_prompt_tokens BIGINT,
+    p_completion_tokens BIGINT,
+    p_cached_tokens BIGINT
+) RETURNS void
+LANGUAGE sql
+AS $$
+    INSERT INTO user_token_usage
+        (user_id, usage_date, model, requests, prompt_tokens, completion_tokens, cached_tokens)
+    VALUES
+        (p_user_id, p_date, p_model, p_requests, p_prompt_tokens, p_completion_tokens, p_cached_tokens)
+    ON CONFLICT (user_id, usage_date, model) DO UPDATE
+    SET requests = user_token_usage.requests + EXCLUDED.requests,
+        prompt_tokens = user_token_usage.prompt_tokens + EXCLUDED.prompt_tokens,
+        completion_tokens = user_token_usage.completion_tokens + EXCLUDED.completion_tokens,
+        cached_tokens = user_token_usage.cached_tokens + EXCLUDED.cached_tokens;
+$$;
+
+-- Enable RLS (Row Level Security) for user data isolation
+ALTER TABLE user_token_usage ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can only see their own token usage" ON user_token_usage;
+CREATE POLICY "Users can only see their own token usage" ON user_token_usage
+    FOR ALL USING (auth.uid() = user_id);
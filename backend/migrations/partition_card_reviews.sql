@@ -0,0 +1,199 @@
+-- Time-partitioned review log, daily aggregates and compaction
+--
+-- card_reviews becomes a table partitioned by month on reviewed_at. Reviews
+-- older than the retention window are archived by compact_reviews.py, then
+-- folded into card_review_daily (one row per user, card and day) by
+-- compact_card_reviews(), which drops whole monthly partitions instead of
+-- deleting row by row. Read paths use card_review_summary, which combines
+-- both, so they don't care where a review currently lives.
+
+BEGIN;
+
+-- 1. Partitioned copy of card_reviews, reusing the existing id sequence
+CREATE TABLE card_reviews_partitioned (
+    id INTEGER NOT NULL DEFAULT nextval('card_reviews_id_seq'),
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    card_id INTEGER REFERENCES flashcards(id) ON DELETE CASCADE,
+    was_correct BOOLEAN NOT NULL,
+    response_time_ms INTEGER NOT NULL,
+    reviewed_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (id, reviewed_at)
+) PARTITION BY RANGE (reviewed_at);
+
+-- Catches rows outside any monthly partition so inserts never fail
+CREATE TABLE card_reviews_default PARTITION OF card_reviews_partitioned DEFAULT;
+
+ALTER SEQUENCE card_reviews_id_seq OWNED BY NONE;
+ALTER TABLE card_reviews RENAME TO card_reviews_unpartitioned;
+ALTER TABLE card_reviews_partitioned RENAME TO card_reviews;
+ALTER SEQUENCE card_reviews_id_seq OWNED BY card_reviews.id;
+
+CREATE INDEX IF NOT EXISTS idx_card_reviews_user_card ON card_reviews(user_id, card_id, reviewed_at);
+CREATE INDEX IF NOT EXISTS idx_card_reviews_card ON card_reviews(card_id);
+
+-- 2. Monthly partitions: card_reviews_YYYY_MM covering [month, month + 1)
+--
+-- Postgres refuses to create a partition while the default partition holds
+-- rows in its range, which happens once a month was missed (e.g. the
+-- compaction job didn't run). Those rows are moved into the new partition:
+-- the default is detached, the partition created, the rows moved and the
+-- default re-attached, all in the caller's transaction.
+CREATE OR REPLACE FUNCTION ensure_card_review_partitions(
+    p_from DATE DEFAULT CURRENT_DATE,
+    p_months_ahead INTEGER DEFAULT 3
+) RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    month_start DATE;
+    month_end DATE;
+    partition_name TEXT;
+BEGIN
+    FOR i IN 0..p_months_ahead LOOP
+        month_start := (date_trunc('month', p_from) + make_interval(months => i))::date;
+        month_end := (month_start + INTERVAL '1 month')::date;
+        partition_name := 'card_reviews_' || to_char(month_start, 'YYYY_MM');
+        CONTINUE WHEN to_regclass(partition_name) IS NOT NULL;
+
+        IF NOT EXISTS (
+            SELECT 1 FROM card_reviews_default
+            WHERE reviewed_at >= month_start AND reviewed_at < month_end
+        ) THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF card_reviews FOR VALUES FROM (%L) TO (%L)',
+                partition_name, month_start, month_end
+            );
+            CONTINUE;
+        END IF;
+
+        ALTER TABLE card_reviews DETACH PARTITION card_reviews_default;
+        EXECUTE format(
+            'CREATE TABLE %I PARTITION OF card_reviews FOR VALUES FROM (%L) TO (%L)',
+            partition_name, month_start, month_end
+        );
+        INSERT INTO card_reviews (id, user_id, card_id, was_correct, response_time_ms, reviewed_at)
+        SELECT id, user_id, card_id, was_correct, response_time_ms, reviewed_at
+        FROM card_reviews_default
+        WHERE reviewed_at >= month_start AND reviewed_at < month_end;
+        DELETE FROM card_reviews_default
+        WHERE reviewed_at >= month_start AND reviewed_at < month_end;
+        ALTER TABLE card_reviews ATTACH PARTITION card_reviews_default DEFAULT;
+    END LOOP;
+END;
+$$;
+
+DO $$
+DECLARE
+    month_start DATE;
+BEGIN
+    FOR month_start IN
+        SELECT DISTINCT date_trunc('month', COALESCE(reviewed_at, NOW()))::date
+        FROM card_reviews_unpartitioned
+    LOOP
+        PERFORM ensure_card_review_partitions(month_start, 0);
+    END LOOP;
+    PERFORM ensure_card_review_partitions(CURRENT_DATE, 3);
+END;
+$$;
+
+INSERT INTO card_reviews (id, user_id, card_id, was_correct, response_time_ms, reviewed_at)
+SELECT id, user_id, card_id, was_correct, response_time_ms, COALESCE(reviewed_at, NOW())
+FROM card_reviews_unpartitioned;
+
+-- 3. Compacted history: one row per user, card and day
+CREATE TABLE IF NOT EXISTS card_review_daily (
+    user_id UUID REFERENCES auth.users(id) ON DELETE CASCADE,
+    card_id INTEGER REFERENCES flashcards(id) ON DELETE CASCADE,
+    review_date DATE NOT NULL,
+    reviews INTEGER NOT NULL,
+    correct INTEGER NOT NULL,
+    total_response_ms BIGINT NOT NULL,
+    last_reviewed_at TIMESTAMP WITH TIME ZONE NOT NULL,
+    PRIMARY KEY (user_id, card_id, review_date)
+);
+
+CREATE INDEX IF NOT EXISTS idx_card_review_daily_card ON card_review_daily(card_id);
+
+-- Fold raw reviews from before p_before's month into card_review_daily and
+-- drop them. Returns the number of raw reviews compacted.
+CREATE OR REPLACE FUNCTION compact_card_reviews(p_before DATE)
+RETURNS INTEGER
+LANGUAGE plpgsql
+AS $$
+DECLARE
+    cutoff DATE := date_trunc('month', p_before)::date;
+    compacted INTEGER;
+    partition_name TEXT;
+BEGIN
+    SELECT COUNT(*) INTO compacted FROM card_reviews WHERE reviewed_at < cutoff;
+
+    INSERT INTO card_review_daily
+        (user_id, card_id, review_date, reviews, correct, total_response_ms, last_reviewed_at)
+    SELECT user_id,
+           card_id,
+           reviewed_at::date,
+           COUNT(*),
+           COUNT(*) FILTER (WHERE was_correct),
+           SUM(response_time_ms),
+           MAX(reviewed_at)
+    FROM card_reviews
+    WHERE reviewed_at < cutoff AND user_id IS NOT NULL AND card_id IS NOT NULL
+    GROUP BY user_id, card_id, reviewed_at::date
+    ON CONFLICT (user_id, card_id, review_date) DO UPDATE
+    SET reviews = card_review_daily.reviews + EXCLUDED.reviews,
+        correct = card_review_daily.correct + EXCLUDED.correct,
+        total_response_ms = card_review_daily.total_response_ms + EXCLUDED.total_response_ms,
+        last_reviewed_at = GREATEST(card_review_daily.last_reviewed_at, EXCLUDED.last_reviewed_at);
+
+    FOR partition_name IN
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = 'card_reviews'::regclass
+          AND child.relname ~ '^card_reviews_[0-9]{4}_[0-9]{2}$'
+          AND to_date(right(child.relname, 7), 'YYYY_MM') < cutoff
+    LOOP
+        EXECUTE format('DROP TABLE %I', partition_name);
+    END LOOP;
+
+    -- Stragglers in the default partition
+    DELETE FROM card_reviews WHERE reviewed_at < cutoff;
+
+    RETURN compacted;
+END;
+$$;
+
+-- 4. Per-card totals over compacted and raw reviews
+CREATE OR REPLACE VIEW card_review_summary WITH (security_invoker = true) AS
+SELECT combined.user_id,
+       combined.card_id,
+       flashcards.set_id,
+       SUM(combined.reviews)::INTEGER AS reviews,
+       SUM(combined.correct)::INTEGER AS correct,
+       MAX(combined.last_reviewed_at) AS last_reviewed_at
+FROM (
+    SELECT user_id, card_id, reviews, correct, last_reviewed_at
+    FROM card_review_daily
+    UNION ALL
+    SELECT user_id, card_id, 1, CASE WHEN was_correct THEN 1 ELSE 0 END, reviewed_at
+    FROM card_reviews
+) combined
+JOIN flashcards ON flashcards.id = combined.card_id
+GROUP BY combined.user_id, combined.card_id, flashcards.set_id;
+
+-- Enable RLS (Row Level Security) for user data isolation
+ALTER TABLE card_reviews ENABLE ROW LEVEL SECURITY;
+ALTER TABLE card_review_daily ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can only see their own card reviews" ON card_reviews;
+CREATE POLICY "Users can only see their own card reviews" ON card_reviews
+    FOR ALL USING (auth.uid() = user_id);
+
+DROP POLICY IF EXISTS "Users can only see their own review aggregates" ON card_review_daily;
+CREATE POLICY "Users can only see their own review aggregates" ON card_review_daily
+    FOR ALL USING (auth.uid() = user_id);
+
+COMMIT;
+
+-- After verifying the copy:
+-- DROP TABLE card_reviews_unpartitioned;
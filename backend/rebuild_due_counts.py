@@ -0,0 +1,27 @@
+"""
+Rebuild the maintained per-set due counts from flashcards and SRS progress.
+
+The triggers from migrations/add_due_counts.sql keep the counts current;
+run this after bulk changes made with the triggers disabled, or to repair
+drift. Rebuilding every user rewrites the whole set_due_counts table in one
+transaction, so run it off-peak.
+
+Requires migrations/add_due_counts.sql.
+"""
+import argparse
+
+from app.db import database
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", help="Rebuild only this user's counts (default: everyone)")
+    args = parser.parse_args(argv)
+
+    print(f"Rebuilding due counts for {args.user_id or 'all users'}...")
+    buckets = database.rebuild_due_counts(args.user_id)
+    print(f"Rebuilt {buckets} due-count bucket(s).")
+
+
+if __name__ == "__main__":
+    main()
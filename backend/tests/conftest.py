@@ -1,7 +1,25 @@
 import sys
 import os
 from pathlib import Path
+from unittest.mock import patch
+
+import pytest
 
 # Add the parent directory to sys.path
 backend_dir = Path(__file__).parent.parent
-sys.path.append(str(backend_dir))
\ No newline at end of file
+sys.path.append(str(backend_dir))
+
+@pytest.fixture
+def fake_db():
+    """A FakeSupabase server with ``app.db.database`` pointed at it."""
+    from supabase import create_client
+
+    from app.db import database
+    from benchmarks.fake_supabase import FakeSupabase
+    from benchmarks.run import ServerThread
+
+    db = FakeSupabase()
+    with ServerThread(db.app) as server:
+        client = create_client(server.url, "test-service-key")
+        with patch.object(database, "supabase", client):
+            yield db
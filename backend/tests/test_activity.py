@@ -0,0 +1,61 @@
+from datetime import date, timedelta
+
+from app.services import activity
+
+TODAY = date(2026, 3, 10)
+
+
+def days_ago(*offsets):
+    return [TODAY - timedelta(days=offset) for offset in offsets]
+
+
+def test_current_streak_counts_back_from_today_or_yesterday():
+    assert activity.current_streak(days_ago(0, 1, 2, 4), TODAY) == 3
+    assert activity.current_streak(days_ago(1, 2, 3), TODAY) == 3
+    assert activity.current_streak(days_ago(2, 3), TODAY) == 0
+    assert activity.current_streak([], TODAY) == 0
+
+
+def test_current_streak_stops_reading_at_the_first_gap():
+    consumed = []
+
+    def lazy_days():
+        for day in days_ago(0, 1, 3, 4, 5):
+            consumed.append(day)
+            yield day
+
+    assert activity.current_streak(lazy_days(), TODAY) == 2
+    assert len(consumed) == 3
+
+
+def test_longest_streak_and_heatmap():
+    assert activity.longest_streak(days_ago(9, 8, 7, 3, 2)) == 3
+    assert activity.longest_streak([]) == 0
+
+    rows = [{"activity_date": "2026-03-09", "reviews": 5, "correct": 4}]
+    days = activity.heatmap(rows, date(2026, 3, 8), TODAY)
+    assert [day["reviews"] for day in days] == [0, 5, 0]
+    assert days[1] == {"date": date(2026, 3, 9), "reviews": 5, "correct": 4}
+
+
+def test_a_failed_activity_rollup_does_not_fail_the_review(fake_db):
+    from app.db import database
+    from app.models.models import CardReview
+
+    user_id, _ = fake_db.create_user()
+    set_id = fake_db.conn.execute(
+        "INSERT INTO flashcard_sets (title, description, owner_id) VALUES ('t', 'd', ?)", (user_id,)
+    ).lastrowid
+    card_id = fake_db.conn.execute(
+        "INSERT INTO flashcards (front, back, set_id) VALUES ('f', 'b', ?)", (set_id,)
+    ).lastrowid
+    fake_db.conn.commit()
+
+    def broken(conn, params):
+        raise RuntimeError("rollup unavailable")
+
+    fake_db.rpcs["record_daily_activity"] = broken
+    saved = database.record_card_review(CardReview(
+        user_id=user_id, card_id=card_id, was_correct=True, response_time_ms=900
+    ))
+    assert saved["card_id"] == card_id
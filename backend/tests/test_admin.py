@@ -0,0 +1,35 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.core.config import settings
+from app.main import app
+
+
+@pytest.mark.asyncio
+async def test_admin_routes_use_the_admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "admin-secret")
+    monkeypatch.setattr(settings, "profiling_admin_token", "profile-secret")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        missing = await client.get("/v1/admin/routing")
+        profiling_token = await client.get("/v1/admin/routing", headers={"X-Admin-Token": "profile-secret"})
+        admin = await client.get("/v1/admin/routing", headers={"X-Admin-Token": "admin-secret"})
+
+    assert missing.status_code == 403
+    assert profiling_token.status_code == 403
+    assert admin.status_code == 200
+
+
+@pytest.mark.asyncio
+async def test_admin_routes_are_closed_without_a_token(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", None)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/v1/admin/profiles", headers={"X-Admin-Token": ""})
+    assert response.status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_due_count_rebuild_endpoint_requires_a_user(monkeypatch):
+    monkeypatch.setattr(settings, "admin_token", "admin-secret")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/v1/admin/due-counts/rebuild", headers={"X-Admin-Token": "admin-secret"})
+    assert response.status_code == 422
@@ -0,0 +1,41 @@
+from datetime import date
+
+import pytest
+
+from app.db.database import review_compaction_cutoff
+from app.services import archive
+
+ROWS = [
+    {"id": 1, "user_id": "u1", "card_id": 10, "was_correct": True,
+     "response_time_ms": 1200, "reviewed_at": "2026-01-05T10:00:00+00:00"},
+    {"id": 2, "user_id": "u1", "card_id": 11, "was_correct": False,
+     "response_time_ms": 800, "reviewed_at": "2026-01-06T11:30:00+00:00"},
+]
+
+
+def test_review_chunk_round_trips_column_wise(tmp_path):
+    path = archive.write_review_chunk(ROWS, str(tmp_path / "before=2026-02-01"), "part-00000")
+    assert path.endswith(f".{archive.archive_format()}")
+    assert not list(tmp_path.rglob("*.partial"))
+
+    columns = archive.read_review_chunk(path)
+    assert columns["id"] == [1, 2]
+    assert columns["was_correct"] == [True, False]
+    assert columns["reviewed_at"] == [row["reviewed_at"] for row in ROWS]
+
+
+def test_compaction_cutoff_is_month_aligned():
+    assert review_compaction_cutoff(90, today=date(2026, 5, 20)) == date(2026, 2, 1)
+    assert review_compaction_cutoff(0, today=date(2026, 5, 1)) == date(2026, 5, 1)
+
+
+def test_compaction_refuses_to_run_without_an_archive_dir(monkeypatch):
+    import compact_reviews
+    from app.core.config import settings
+    from app.db import database
+
+    monkeypatch.setattr(settings, "review_archive_dir", None)
+    with pytest.raises(SystemExit):
+        compact_reviews.main([])
+    with pytest.raises(ValueError):
+        database.archive_and_compact_reviews(date(2026, 2, 1), "")
@@ -0,0 +1,58 @@
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from benchmarks.run import find_failures
+
+backend_dir = Path(__file__).parent.parent
+
+
+def test_quick_benchmark_runs_against_fakes():
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.run", "--quick"],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "concurrent_pdf_uploads" in result.stdout
+
+
+def test_compression_benchmark_reports_each_encoding():
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.compression", "--cards", "200", "--runs", "1"],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+    assert "identity" in result.stdout and "gzip" in result.stdout
+
+
+def test_import_defers_heavy_modules():
+    result = subprocess.run(
+        [sys.executable, "-m", "benchmarks.import_time", "--runs", "1", "--top", "0"],
+        cwd=backend_dir,
+        capture_output=True,
+        text=True,
+        timeout=120,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_baseline_check_keeps_error_failures(tmp_path):
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps({"search": {"p99_ms": 100.0, "errors": 2}}))
+    summaries = {
+        "search": {"p99_ms": 150.0, "errors": 2},
+        "quiz_pages": {"p99_ms": 10.0, "errors": 1},
+    }
+    assert find_failures(summaries) == ["search: 2 errors", "quiz_pages: 1 errors"]
+    assert find_failures(summaries, str(baseline), 0.2) == [
+        "search: 2 errors",
+        "quiz_pages: 1 errors",
+        "search: p99 150.0ms > 120.0ms (baseline 100.0ms)",
+    ]
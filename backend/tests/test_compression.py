@@ -0,0 +1,85 @@
+import gzip
+import json
+from unittest.mock import patch
+
+from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from app.core import compression
+
+CARDS = [{"id": i, "front": f"学习 {i}", "back": f"xué xí - to study {i}"} for i in range(500)]
+
+
+def make_client():
+    app = FastAPI()
+
+    @app.get("/set")
+    async def get_set():
+        return {"id": 1, "flashcards": CARDS}
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/export")
+    async def export():
+        return StreamingResponse(iter([b"front,back\n", b"a,b\n" * 1000]), media_type="text/csv")
+
+    app.add_middleware(compression.CompressionMiddleware, encodings=["gzip"], minimum_size=1024)
+    return TestClient(app)
+
+
+def test_negotiate_respects_server_preference_and_q_values():
+    available = ["zstd", "br", "gzip"]
+    assert compression.negotiate("gzip, deflate, br, zstd", available) == "zstd"
+    assert compression.negotiate("zstd;q=0, br;q=0.5, gzip", available) == "br"
+    assert compression.negotiate("*;q=0.1", ["gzip"]) == "gzip"
+    assert compression.negotiate("identity", available) is None
+    assert compression.negotiate("", available) is None
+
+
+def test_repeat_reads_reuse_the_compressed_body_and_honour_etags():
+    client = make_client()
+    headers = {"Accept-Encoding": "gzip"}
+
+    calls = []
+    original = compression.COMPRESSORS["gzip"]
+
+    def counting_gzip(body):
+        calls.append(len(body))
+        return original(body)
+
+    with patch.dict(compression.COMPRESSORS, {"gzip": counting_gzip}):
+        first = client.get("/set", headers=headers)
+        second = client.get("/set", headers=headers)
+
+    assert first.headers["content-encoding"] == "gzip"
+    assert first.headers["vary"] == "Accept-Encoding"
+    assert int(first.headers["content-length"]) < len(json.dumps({"id": 1, "flashcards": CARDS}).encode()) / 3
+    assert first.json() == second.json() == {"id": 1, "flashcards": CARDS}
+    assert len(calls) == 1
+    etag = first.headers["etag"]
+    assert etag.endswith('-gzip"') and second.headers["etag"] == etag
+
+    not_modified = client.get("/set", headers={**headers, "If-None-Match": etag})
+    assert not_modified.status_code == 304 and not_modified.content == b""
+
+    identity = client.get("/set", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in identity.headers
+    assert client.get("/set", headers={"If-None-Match": identity.headers["etag"]}).status_code == 304
+
+
+def test_small_and_streaming_responses():
+    client = make_client()
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+
+    export = client.get("/export", headers={"Accept-Encoding": "gzip"})
+    assert export.headers["content-encoding"] == "gzip"
+    assert "content-length" not in export.headers
+    assert export.text == "front,back\n" + "a,b\n" * 1000
+
+    with client.stream("GET", "/export", headers={"Accept-Encoding": "gzip"}) as response:
+        raw = b"".join(response.iter_raw())
+    assert gzip.decompress(raw).startswith(b"front,back\n")
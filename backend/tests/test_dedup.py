@@ -0,0 +1,55 @@
+from app.models.models import Flashcard
+from app.services import dedup
+
+
+def test_same_front_with_reworded_back_is_a_near_duplicate():
+    index = dedup.NearDuplicateIndex()
+    index.add(1, "学习", "xué xí - to study, to learn")
+    index.add(2, "电脑", "diàn nǎo - computer")
+
+    match = index.find("学习", "xue xi - to study")
+    assert match is not None and match[0] == 1
+    assert index.find("飞机", "fēi jī - airplane") is None
+
+
+def test_removed_cards_are_no_longer_matched():
+    index = dedup.NearDuplicateIndex()
+    index.add(1, "API", "Application Programming Interface")
+    index.remove(1)
+    assert len(index) == 0
+    assert index.find("API", "Application Programming Interface") is None
+
+
+def test_dedupe_cards_within_batch_and_against_existing():
+    existing = dedup.NearDuplicateIndex()
+    existing.add(10, "你好", "nǐ hǎo - Hello")
+
+    cards = [
+        {"front": "你好", "back": "ni hao - hello"},
+        {"front": "谢谢", "back": "xiè xie - thank you"},
+        {"front": "谢谢", "back": "xie xie - thank you!"},
+        {"front": "再见", "back": "zài jiàn - goodbye"},
+    ]
+    unique = dedup.dedupe_cards(cards, existing=existing)
+    assert [c["front"] for c in unique] == ["谢谢", "再见"]
+
+    models = [Flashcard(front="猫", back="māo - cat"), Flashcard(front="猫", back="mao - cat")]
+    assert len(dedup.dedupe_cards(models)) == 1
+
+
+def test_similar_but_distinct_cards_survive_dedupe():
+    cards = [
+        {"front": "A", "back": "the letter a"},
+        {"front": "B", "back": "the letter b"},
+        {"front": "HTTP POST", "back": "HTTP method to create a resource"},
+        {"front": "HTTP PUT", "back": "HTTP method to replace a resource"},
+        {"front": "行", "back": "xíng - to walk"},
+        {"front": "行", "back": "háng - row, line; profession"},
+    ]
+    assert dedup.dedupe_cards(cards) == cards
+
+    existing = dedup.NearDuplicateIndex()
+    existing.add(1, "A", "the letter a")
+    assert dedup.dedupe_cards(cards[1:], existing=existing) == cards[1:]
+    # Still flagged for the user to decide.
+    assert existing.find("B", "the letter b") is not None
@@ -0,0 +1,124 @@
+import asyncio
+import re
+from unittest.mock import patch
+
+import pytest
+
+from app.core.config import settings
+from app.db import database
+from app.models.models import Flashcard
+from app.services import documents, services
+
+
+def test_only_new_pages_are_generated_and_vanished_ones_removed():
+    original = [documents.text_page(n, f"page {n} text") for n in range(1, 5)]
+    known = [page.content_hash for page in original]
+
+    edited = [
+        documents.text_page(1, "page 1   text\n"),  # same text, different whitespace
+        documents.text_page(2, "page 2 text, revised"),
+        documents.text_page(3, "a brand new page"),
+        documents.text_page(4, "page 4 text"),
+        documents.text_page(5, "page 3 text"),  # moved, not changed
+        documents.text_page(6, "a brand new page"),
+    ]
+    plan = documents.plan_pages(edited, known)
+
+    assert [page.number for page in plan.generate] == [2, 3]
+    assert [page.number for page in plan.unchanged] == [1, 4, 5]
+    assert plan.removed == [original[1].content_hash]
+
+
+def page_cards(messages):
+    """Fake model output: one card per page marker, tagged with its page."""
+    content = messages[-1]["content"]
+    text = content if isinstance(content, str) else "\n".join(part.get("text", "") for part in content)
+    return re.findall(r"=== Page (\d+) ===\n?([^\n=]*)", text)
+
+
+def test_pages_are_batched_and_cards_attributed_to_their_page(monkeypatch):
+    monkeypatch.setattr(settings, "page_batch_max_pages", 3)
+    pages = [
+        documents.text_page(1, "first page"),
+        documents.text_page(2, "   "),
+        documents.image_page(3, b"\x89PNG fake image"),
+        documents.text_page(4, "fourth page"),
+        documents.text_page(5, "fifth page"),
+    ]
+    calls = []
+
+    def fake_generate(messages, config=None, usage=None):
+        calls.append(messages[-1]["content"])
+        tagged = [Flashcard(front=f"term {number}", back="back", page=int(number))
+                  for number, _ in page_cards(messages)]
+        if not tagged:  # a lone page has no markers
+            return [Flashcard(front="lone", back="back")]
+        # Untagged: goes to the page whose text contains its front
+        return tagged + [Flashcard(front="fourth", back="back")]
+
+    with patch.object(services, "generate_flashcards", side_effect=fake_generate):
+        generated = asyncio.run(services.process_pages_to_flashcards(pages))
+
+    assert len(calls) == 2  # [1, 3, 4] and [5]; the blank page is never sent
+    assert isinstance(calls[0], list) and isinstance(calls[1], str)
+    assert generated[pages[1].content_hash] == []
+    fronts = {page.number: [card.front for card in generated[page.content_hash]] for page in pages}
+    assert fronts == {1: ["term 1"], 2: [], 3: ["term 3"], 4: ["term 4", "fourth"], 5: ["lone"]}
+
+
+def test_page_batches_respect_the_token_budget(monkeypatch):
+    monkeypatch.setattr(settings, "page_batch_max_tokens", 100)
+    pages = [documents.text_page(1, "short"), documents.text_page(2, "long " * 200),
+             documents.text_page(3, "short too"), documents.text_page(4, "also short")]
+    assert [[page.number for page in batch] for batch in services.batch_pages(pages)] == [[1], [2], [3, 4]]
+
+
+def test_spliced_cards_are_stored_with_readings(fake_db):
+    pytest.importorskip("pypinyin")
+    user_id, _ = fake_db.create_user()
+    set_id = database.create_flashcard_set({"title": "Doc", "description": "d", "cards": []}, user_id)["id"]
+    page = documents.text_page(1, "学习")
+    plan = documents.plan_pages([page], [])
+
+    database.splice_document_pages(set_id, user_id, plan, {
+        page.content_hash: [{"front": "学习", "back": "to study"}],
+    })
+
+    card = database.get_flashcard_set(set_id, user_id)["flashcards"][0]
+    assert card["reading"] == {"pinyin": "xué xí", "numbered": "xue2 xi2"}
+
+
+def test_initial_upload_records_pages_so_reupload_skips_them(fake_db):
+    pages = [documents.text_page(1, "page one"), documents.text_page(2, "page two"),
+             documents.text_page(3, "page one")]
+
+    def fake_generate(messages, config=None, usage=None):
+        return [card for number, text in page_cards(messages) for card in (
+            Flashcard(front=f"{text} term", back="meaning", page=int(number)),
+            Flashcard(front="shared", back="same", page=int(number)),
+        )]
+
+    with patch.object(services, "generate_flashcards", side_effect=fake_generate) as generate:
+        response = asyncio.run(services.process_document_to_flashcards(pages))
+    assert generate.call_count == 1
+
+    assert [page.page_number for page in response.pages] == [1, 2]
+    assert [card.front for card in response.flashcards] == ["page one term", "shared", "page two term"]
+    assert response.flashcards[2].source_page == pages[1].content_hash
+
+    user_id, _ = fake_db.create_user()
+    body = response.model_dump()
+    created = database.create_flashcard_set(
+        {"title": "Doc", "description": "d", "cards": body["flashcards"], "pages": body["pages"]}, user_id
+    )
+    assert sorted(database.get_document_pages(created["id"])) == sorted(p.content_hash for p in pages[:2])
+
+    edited = [pages[0], documents.text_page(2, "page two, revised")]
+    plan = documents.plan_pages(edited, database.get_document_pages(created["id"]))
+    assert [page.number for page in plan.generate] == [2]
+    result = database.splice_document_pages(created["id"], user_id, plan, {
+        edited[1].content_hash: [{"front": "revised term", "back": "meaning"}],
+    })
+    assert result["cards_removed"] == 1 and result["cards_adopted"] == 0
+    fronts = [card["front"] for card in database.get_flashcard_set(created["id"], user_id)["flashcards"]]
+    assert fronts == ["page one term", "shared", "revised term"]
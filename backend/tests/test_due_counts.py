@@ -0,0 +1,88 @@
+from datetime import date
+
+from app.db import database
+
+TODAY = date(2026, 3, 10)
+
+
+def add_set(db, owner_id, cards):
+    set_id = db.conn.execute(
+        "INSERT INTO flashcard_sets (title, description, owner_id) VALUES ('t', 'd', ?)", (owner_id,)
+    ).lastrowid
+    db.conn.executemany(
+        "INSERT INTO flashcards (front, back, set_id) VALUES (?, 'back', ?)",
+        [(f"card {i}", set_id) for i in range(cards)],
+    )
+    db.conn.commit()
+    return set_id, [row[0] for row in db.conn.execute("SELECT id FROM flashcards WHERE set_id = ?", (set_id,))]
+
+
+def schedule(db, user_id, card_id, due):
+    db.conn.execute(
+        "INSERT INTO user_flashcard_progress (user_id, flashcard_id, next_review_date) VALUES (?, ?, ?)",
+        (user_id, card_id, due),
+    )
+    db.conn.commit()
+
+
+def test_due_counts_follow_reviews_and_card_changes(fake_db):
+    user_id, _ = fake_db.create_user()
+    first, first_cards = add_set(fake_db, user_id, 4)
+    second, second_cards = add_set(fake_db, user_id, 2)
+    schedule(fake_db, user_id, first_cards[0], "2026-03-09")
+    schedule(fake_db, user_id, first_cards[1], "2026-03-12")
+    schedule(fake_db, user_id, second_cards[0], "2026-03-10")
+
+    counts = database.get_due_counts(user_id, TODAY)
+    by_set = {row["set_id"]: row for row in counts["sets"]}
+    assert by_set[first] == {"set_id": first, "total_cards": 4, "new_cards": 2,
+                             "due_cards": 1, "next_due_date": "2026-03-12"}
+    assert by_set[second]["new_cards"] == 1 and by_set[second]["due_cards"] == 1
+    assert counts["total_due"] == 5
+    assert counts["next_due_date"] == "2026-03-12"
+
+    # A review moves the card to its new date; deleting cards drops their buckets.
+    fake_db.conn.execute(
+        "UPDATE user_flashcard_progress SET next_review_date = '2026-03-16' WHERE flashcard_id = ?",
+        (first_cards[0],),
+    )
+    fake_db.conn.execute("DELETE FROM flashcards WHERE id IN (?, ?)", (first_cards[1], first_cards[3]))
+    fake_db.conn.commit()
+
+    first_row = database.get_due_counts(user_id, TODAY)["sets"][0]
+    assert first_row == {"set_id": first, "total_cards": 2, "new_cards": 1,
+                         "due_cards": 0, "next_due_date": "2026-03-16"}
+
+    forecast = database.get_due_forecast(user_id, 7, TODAY)
+    assert [day["cards"] for day in forecast["days"]] == [1, 0, 0, 0, 0, 0, 1]
+
+
+def test_rebuild_matches_the_maintained_counts(fake_db):
+    user_id, _ = fake_db.create_user()
+    set_id, cards = add_set(fake_db, user_id, 5)
+    for card_id, due in zip(cards, ["2026-03-01", "2026-03-01", "2026-03-20"]):
+        schedule(fake_db, user_id, card_id, due)
+    maintained = database.get_due_counts(user_id, TODAY)
+
+    fake_db.conn.execute("UPDATE flashcard_sets SET card_count = 0")
+    fake_db.conn.execute("DELETE FROM set_due_counts")
+    fake_db.conn.commit()
+    assert database.rebuild_due_counts(user_id) == 2
+    assert database.get_due_counts(user_id, TODAY) == maintained
+
+
+def test_offline_script_rebuilds_every_user(fake_db):
+    import rebuild_due_counts
+
+    users = [fake_db.create_user()[0] for _ in range(2)]
+    maintained = []
+    for user_id in users:
+        _, cards = add_set(fake_db, user_id, 2)
+        schedule(fake_db, user_id, cards[0], "2026-03-01")
+        maintained.append(database.get_due_counts(user_id, TODAY))
+
+    fake_db.conn.execute("UPDATE flashcard_sets SET card_count = 0")
+    fake_db.conn.execute("DELETE FROM set_due_counts")
+    fake_db.conn.commit()
+    rebuild_due_counts.main([])
+    assert [database.get_due_counts(user_id, TODAY) for user_id in users] == maintained
@@ -0,0 +1,59 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.core import metrics
+from app.core.config import settings
+from app.main import app
+
+
+@pytest.fixture
+def client():
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = metrics.Registry()
+    hist = registry.histogram("test_seconds", "Test histogram.", ("stage",), buckets=(0.1, 1.0))
+    hist.observe(0.05, stage="a")
+    hist.observe(0.5, stage="a")
+    hist.observe(5, stage="a")
+
+    text = registry.render()
+    assert '# TYPE test_seconds histogram' in text
+    assert 'test_seconds_bucket{stage="a",le="0.1"} 1' in text
+    assert 'test_seconds_bucket{stage="a",le="1.0"} 2' in text
+    assert 'test_seconds_bucket{stage="a",le="+Inf"} 3' in text
+    assert 'test_seconds_count{stage="a"} 3' in text
+
+
+def test_span_is_noop_when_disabled():
+    metrics.configure(enabled=False)
+    try:
+        before = metrics.SPAN_LATENCY.count(span="test.disabled")
+        with metrics.span("test.disabled"):
+            pass
+        assert metrics.SPAN_LATENCY.count(span="test.disabled") == before
+    finally:
+        metrics.configure(enabled=True)
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_request_latency(client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", "scrape")
+    async with client:
+        await client.get("/health")
+        unauthorized = await client.get("/metrics")
+        response = await client.get("/metrics", headers={"Authorization": "Bearer scrape"})
+
+    assert unauthorized.status_code == 401
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_is_off_without_a_token(client: AsyncClient, monkeypatch):
+    monkeypatch.setattr(settings, "metrics_token", None)
+    async with client:
+        response = await client.get("/metrics")
+    assert response.status_code == 404
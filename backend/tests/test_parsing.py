@@ -0,0 +1,77 @@
+import asyncio
+import time
+from unittest.mock import patch
+
+import pytest
+
+from app.models.models import Flashcard
+from app.services import services
+from app.services.parsing import extract_flashcards
+
+
+def test_complete_fenced_payload():
+    parsed = extract_flashcards('```json\n{"flashcards": [{"front": "学习", "back": "to study"}]}\n```')
+    assert parsed.complete and not parsed.truncated
+    assert [c.front for c in parsed.flashcards] == ["学习"]
+    assert parsed.salvaged == 0
+
+
+def test_truncated_payload_keeps_complete_cards():
+    text = '{"flashcards": [{"front": "a", "back": "1"}, {"front": "b", "back": "2"}, {"front": "c", "ba'
+    parsed = extract_flashcards(text)
+    assert parsed.truncated and not parsed.complete
+    assert [c.front for c in parsed.flashcards] == ["a", "b"]
+    assert parsed.salvaged == 2
+
+
+def test_cards_missing_fields_are_skipped():
+    parsed = extract_flashcards('[{"front": "a", "back": "1"}, {"front": "b"}]')
+    assert [c.front for c in parsed.flashcards] == ["a"]
+    assert parsed.skipped == 1
+
+
+def test_unparseable_payload_raises():
+    with pytest.raises(services.FlashcardGenerationError):
+        services.parse_flashcards_response("not json at all")
+
+
+def test_truncated_output_requests_only_the_tail():
+    responses = [
+        '{"flashcards": [{"front": "a", "back": "1"}, {"front": "b", "back": "2"}, {"fr',
+        '{"flashcards": [{"front": "b", "back": "2"}, {"front": "c", "back": "3"}]}',
+    ]
+    messages = [{"role": "user", "content": "make cards"}]
+    with patch.object(services, "call_openrouter_with_retry", side_effect=responses) as call:
+        cards = services.generate_flashcards(messages)
+
+    assert [c.front for c in cards] == ["a", "b", "c"]
+    assert call.call_count == 2
+    continuation = call.call_args_list[1].args[0]
+    assert continuation[:1] == messages
+    assert continuation[1] == {"role": "assistant", "content": responses[0]}
+    assert "2 complete flashcards" in continuation[2]["content"]
+
+
+def test_text_generation_does_not_block_the_event_loop():
+    def slow_generate(messages, config=None, usage=None):
+        time.sleep(0.2)  # e.g. retry backoff
+        return [Flashcard(front="学习", back="to study")]
+
+    async def run():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        response = await services.process_text_to_flashcards("学习")
+        ticker.cancel()
+        return ticks, response
+
+    with patch.object(services, "generate_flashcards", side_effect=slow_generate):
+        ticks, response = asyncio.run(run())
+    assert ticks >= 5
+    assert [card.front for card in response.flashcards] == ["学习"]
@@ -0,0 +1,50 @@
+import os
+import time
+
+import pytest
+from fastapi import FastAPI
+from httpx import AsyncClient, ASGITransport
+
+from app.core import profiling
+
+
+def make_app(output_dir: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/slow")
+    async def slow():
+        deadline = time.perf_counter() + 0.05
+        while time.perf_counter() < deadline:
+            sum(range(1000))
+        return {"ok": True}
+
+    app.add_middleware(
+        profiling.ProfilingMiddleware,
+        output_dir=output_dir,
+        admin_token="secret",
+        interval_ms=1,
+    )
+    return app
+
+
+@pytest.mark.asyncio
+async def test_profile_written_only_for_admin_header(tmp_path):
+    app = make_app(str(tmp_path))
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        plain = await client.get("/slow")
+        wrong = await client.get("/slow", headers={"X-Profile-Token": "secreT"})
+        profiled = await client.get("/slow", headers={"X-Profile-Token": "secret"})
+
+    assert profiling.PROFILE_ID_HEADER not in plain.headers
+    assert profiling.PROFILE_ID_HEADER not in wrong.headers
+    profile_id = profiled.headers[profiling.PROFILE_ID_HEADER]
+
+    profiles = profiling.list_profiles(str(tmp_path))
+    assert [p["id"] for p in profiles] == [profile_id]
+    assert profiles[0]["path"] == "/slow"
+    assert profiles[0]["samples"] > 0
+
+    with open(os.path.join(tmp_path, f"{profile_id}.folded")) as f:
+        first = f.readline().rsplit(" ", 1)
+    assert int(first[1]) > 0
+    assert os.path.isfile(os.path.join(tmp_path, f"{profile_id}.alloc.txt"))
@@ -0,0 +1,56 @@
+from unittest.mock import patch
+
+from app.db import database
+
+
+def add_set(db, owner_id, cards):
+    set_id = db.conn.execute(
+        "INSERT INTO flashcard_sets (title, description, owner_id) VALUES ('t', 'd', ?)", (owner_id,)
+    ).lastrowid
+    card_ids = [
+        db.conn.execute(
+            "INSERT INTO flashcards (front, back, set_id) VALUES (?, 'back', ?)", (f"card {i}", set_id)
+        ).lastrowid
+        for i in range(cards)
+    ]
+    db.conn.commit()
+    return set_id, card_ids
+
+
+def review(db, user_id, card_id, was_correct):
+    db.conn.execute(
+        "INSERT INTO card_reviews (user_id, card_id, was_correct, response_time_ms) VALUES (?, ?, ?, 100)",
+        (user_id, card_id, int(was_correct)),
+    )
+    db.conn.commit()
+
+
+def test_library_progress_covers_every_set_in_a_constant_number_of_queries(fake_db):
+    user_id, _ = fake_db.create_user()
+    studied, studied_cards = add_set(fake_db, user_id, 3)
+    untouched, _ = add_set(fake_db, user_id, 2)
+    empty, _ = add_set(fake_db, user_id, 0)
+    add_set(fake_db, "someone-else", 4)
+    review(fake_db, user_id, studied_cards[0], True)
+    review(fake_db, user_id, studied_cards[0], False)
+    review(fake_db, user_id, studied_cards[1], True)
+
+    with patch.object(database.supabase, "table", wraps=database.supabase.table) as table:
+        progress = database.get_library_progress(user_id)
+    queries = table.call_count
+
+    by_set = {row["set_id"]: row for row in progress}
+    assert sorted(by_set) == [studied, untouched, empty]
+    assert by_set[studied]["total_cards"] == 3
+    assert by_set[studied]["cards_studied"] == 2
+    assert by_set[studied]["total_reviews"] == 3
+    assert by_set[studied]["know_rate"] == 66.7
+    assert by_set[untouched]["total_reviews"] == 0
+    assert by_set[empty]["total_cards"] == 0
+    assert database.get_study_progress(studied, user_id) == by_set[studied]
+
+    for _ in range(10):
+        add_set(fake_db, user_id, 5)
+    with patch.object(database.supabase, "table", wraps=database.supabase.table) as table:
+        assert len(database.get_library_progress(user_id)) == 13
+    assert table.call_count == queries
@@ -0,0 +1,99 @@
+from unittest.mock import patch
+
+from app.db import database
+from app.services.quiz import QuizIndex, QuizIndexCache
+
+CARDS = [
+    {"id": 1, "front": "学习", "back": "xué xí - to study"},
+    {"id": 2, "front": "学生", "back": "xué sheng - student"},
+    {"id": 3, "front": "学校", "back": "xué xiào - school"},
+    {"id": 4, "front": "飞机", "back": "fēi jī - airplane"},
+    {"id": 5, "front": "机场", "back": "jī chǎng - airport"},
+    {"id": 6, "front": "电脑", "back": "diàn nǎo - computer"},
+]
+
+
+def test_nearest_answers_are_offered_as_distractors():
+    index = QuizIndex(CARDS)
+    neighbours = [index.cards[i][0] for i in index.neighbours[index.cards.index((2, "学生", "xué sheng - student"))]]
+    assert neighbours[0] in (1, 3)
+
+    total, questions = index.questions(seed=1, limit=len(CARDS), choices=2)
+    by_card = {question["card_id"]: question for question in questions}
+    airplane = by_card[4]
+    assert airplane["choices"][airplane["answer_index"]] == "fēi jī - airplane"
+    assert "jī chǎng - airport" in airplane["choices"]
+
+
+def test_pages_are_stable_for_a_seed():
+    index = QuizIndex(CARDS)
+    total, everything = index.questions(seed=42, limit=10)
+    _, first = index.questions(seed=42, offset=0, limit=3)
+    _, second = index.questions(seed=42, offset=3, limit=3)
+    assert total == 6
+    assert first + second == everything
+    assert sorted(q["card_id"] for q in everything) == [1, 2, 3, 4, 5, 6]
+    for question in everything:
+        assert len(question["choices"]) == len(set(question["choices"])) == 4
+
+
+def test_cache_rebuilds_only_when_the_marker_changes():
+    cache = QuizIndexCache(max_sets=1)
+    loads = []
+
+    def load(cards):
+        return lambda: loads.append(len(cards)) or cards
+
+    first = cache.get(10, (6, 1), load(CARDS))
+    assert cache.get(10, (6, 1), load(CARDS)) is first
+    assert loads == [6]
+
+    edited = CARDS[:-1] + [{"id": 6, "front": "电脑", "back": "diàn nǎo - PC"}]
+    assert cache.get(10, (6, 2), load(edited)) is not first
+
+    cache.get(11, (6, 1), load(CARDS))
+    assert cache.get(10, (6, 2), load(edited)) is not cache.get(11, (6, 1), load(CARDS))
+
+
+def test_quiz_pages_follow_card_edits_without_reloading_the_set(fake_db):
+    user_id, _ = fake_db.create_user()
+    created = database.create_flashcard_set({
+        "title": "t", "description": "d",
+        "cards": [{"front": card["front"], "back": card["back"]} for card in CARDS],
+    }, user_id)
+    first = database.get_quiz(created["id"], user_id, seed=7, limit=6)
+    with patch.object(database, "iter_flashcard_pages", side_effect=AssertionError("reloaded")):
+        assert database.get_quiz(created["id"], user_id, seed=7, limit=6) == first
+
+    # Edits made by another worker, so this one's cache isn't invalidated
+    cards = created["flashcards"]
+    fake_db.conn.execute("UPDATE flashcards SET back = 'xué xí - to learn' WHERE id = ?", (cards[0]["id"],))
+    fake_db.conn.execute("DELETE FROM flashcards WHERE id = ?", (cards[-1]["id"],))
+    fake_db.conn.commit()
+    edited = database.get_quiz(created["id"], user_id, seed=7, limit=6)
+    assert edited["total"] == 5
+    answers = {q["card_id"]: q["choices"][q["answer_index"]] for q in edited["questions"]}
+    assert answers[cards[0]["id"]] == "xué xí - to learn"
+    assert database.get_quiz(created["id"], "someone-else") is None
+
+
+def test_quiz_index_is_cached_only_once_writes_have_settled(fake_db):
+    user_id, _ = fake_db.create_user()
+    set_id = database.create_flashcard_set({
+        "title": "t", "description": "d",
+        "cards": [{"front": card["front"], "back": card["back"]} for card in CARDS],
+    }, user_id)["id"]
+    database.quiz_indexes.invalidate(set_id)
+    fake_db.conn.execute("INSERT INTO sync_in_flight (version) VALUES (1)")
+    fake_db.conn.commit()
+
+    with patch.object(database, "iter_flashcard_pages", wraps=database.iter_flashcard_pages) as load:
+        database.get_quiz(set_id, user_id, seed=1)
+        database.get_quiz(set_id, user_id, seed=1)
+        assert load.call_count == 2
+
+        fake_db.conn.execute("DELETE FROM sync_in_flight")
+        fake_db.conn.commit()
+        database.get_quiz(set_id, user_id, seed=1)
+        database.get_quiz(set_id, user_id, seed=1)
+        assert load.call_count == 3
@@ -0,0 +1,58 @@
+from unittest.mock import patch
+
+import pytest
+
+from app.db import database
+from app.services import readings, services
+
+pytest.importorskip("pypinyin")
+
+
+def test_annotate_converts_each_distinct_run_once():
+    readings._convert.cache_clear()
+    fronts = ["学习", "银行", "行走", "API", "学习", "我们学习 Chinese"]
+    result = readings.annotate(fronts)
+
+    assert result[0] == {"pinyin": "xué xí", "numbered": "xue2 xi2"}
+    assert result[1]["pinyin"] == "yín háng" and result[2]["pinyin"] == "xíng zǒu"
+    assert result[3] is None
+    assert result[4] == result[0]
+    assert result[5]["numbered"] == "wo3 men5 xue2 xi2"
+    assert readings._convert.cache_info().misses == 4
+
+    with patch.object(readings, "is_available", return_value=False):
+        assert readings.annotate(fronts) == [None] * len(fronts)
+
+
+
+def test_japanese_fronts_with_kana_get_no_reading():
+    result = readings.annotate(["勉強する", "カタカナ語", "食べ物", "学习"])
+    assert result[:3] == [None, None, None]
+    assert result[3]["pinyin"] == "xué xí"
+def test_prompt_drops_pinyin_only_when_readings_are_computed_locally():
+    with patch.object(readings, "is_available", return_value=True):
+        local = services.build_messages("english", "x")[0]["content"]
+    with patch.object(readings, "is_available", return_value=False):
+        remote = services.build_messages("english", "x")[0]["content"]
+    assert "pinyin" in remote and "xué xí" in remote
+    assert "without pinyin" in local and "xué xí" not in local
+    assert "romaji for Japanese" in local
+
+
+def test_saved_cards_carry_readings_and_are_searchable_by_pinyin(fake_db):
+    user_id, _ = fake_db.create_user()
+    created = database.create_flashcard_set({
+        "title": "Verbs", "description": "d",
+        "cards": [{"front": "学习", "back": "to study"}, {"front": "API", "back": "interface"}],
+    }, user_id)
+    study, api = created["flashcards"]
+    assert study["reading"] == {"pinyin": "xué xí", "numbered": "xue2 xi2"}
+    assert api["reading"] is None
+
+    updated = database.update_flashcard_set(created["id"], {
+        "cards": [{"id": study["id"], "front": "喝茶", "back": "to drink tea"}, api],
+    }, user_id)
+    assert updated["flashcards"][0]["reading"]["pinyin"] == "hē chá"
+
+    hits = database.search_cards(user_id, "he cha")["hits"]
+    assert [hit["card_id"] for hit in hits] == [study["id"]]
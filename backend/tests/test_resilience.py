@@ -0,0 +1,130 @@
+import threading
+import time
+
+import pytest
+
+from app.services import resilience
+
+
+class APIStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+class APIConnectionError(Exception):
+    pass
+
+
+def test_classify_error():
+    assert resilience.classify_error(APIStatusError(503)) == resilience.TRANSIENT
+    assert resilience.classify_error(APIStatusError(429)) == resilience.TRANSIENT
+    assert resilience.classify_error(APIStatusError(404)) == resilience.MODEL
+    assert resilience.classify_error(APIStatusError(401)) == resilience.FATAL
+    assert resilience.classify_error(APIStatusError(409)) == resilience.FATAL
+    assert resilience.classify_error(APIConnectionError()) == resilience.TRANSIENT
+    assert resilience.classify_error(ValueError("bad json")) == resilience.FATAL
+
+
+def test_transient_errors_retry_then_fall_back_and_fatal_errors_do_not():
+    calls = []
+
+    def call(model):
+        calls.append(model)
+        if model == "primary":
+            raise APIStatusError(502)
+        return f"ok from {model}"
+
+    health = resilience.ModelHealthRegistry()
+    policy = resilience.RetryPolicy(max_attempts=2, hedge=False)
+    result = resilience.call_with_fallback(call, ["primary", "backup"], health, policy, sleep=lambda s: None)
+    assert result == "ok from backup"
+    assert calls == ["primary", "primary", "backup"]
+
+    calls.clear()
+
+    def unauthorized(model):
+        calls.append(model)
+        raise APIStatusError(401)
+
+    with pytest.raises(APIStatusError):
+        resilience.call_with_fallback(unauthorized, ["primary", "backup"], health, policy, sleep=lambda s: None)
+    assert calls == ["primary"]
+
+
+def test_non_transient_errors_leave_the_breaker_alone():
+    now = [0.0]
+    health = resilience.ModelHealthRegistry(failure_threshold=2, reset_timeout=10)
+    health["primary"].breaker._clock = lambda: now[0]
+    policy = resilience.RetryPolicy(max_attempts=1, hedge=False)
+    errors = iter([APIStatusError(502), APIStatusError(400), APIStatusError(502)])
+
+    def call(model):
+        if model == "primary":
+            raise next(errors)
+        return "ok"
+
+    for _ in range(3):
+        resilience.call_with_fallback(call, ["primary", "backup"], health, policy, sleep=lambda s: None)
+    # The 400 in between didn't reset the count: two 502s open the breaker
+    assert health["primary"].breaker.state == "open"
+
+    # A half-open probe answered with a 400 keeps the breaker half-open
+    now[0] = 10
+    errors = iter([APIStatusError(400)])
+    resilience.call_with_fallback(call, ["primary", "backup"], health, policy, sleep=lambda s: None)
+    assert health["primary"].breaker.state == "half_open"
+    assert health["primary"].breaker.allow()
+
+
+def test_circuit_breaker_fails_fast_and_probes_after_timeout():
+    now = [0.0]
+    breaker = resilience.CircuitBreaker(failure_threshold=2, reset_timeout=10, clock=lambda: now[0])
+    breaker.record_failure()
+    assert breaker.allow()
+    assert breaker.record_failure() is True
+    assert breaker.state == "open" and not breaker.allow()
+
+    now[0] = 11
+    assert breaker.allow()          # the single half-open probe
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_open_breaker_skips_model_without_calling_it():
+    health = resilience.ModelHealthRegistry(failure_threshold=1, reset_timeout=60)
+    health["primary"].breaker.record_failure()
+    calls = []
+
+    def call(model):
+        calls.append(model)
+        return model
+
+    assert resilience.call_with_fallback(call, ["primary", "backup"], health) == "backup"
+    assert calls == ["backup"]
+
+
+def test_slow_attempt_is_hedged():
+    health = resilience.ModelHealthRegistry()
+    for _ in range(resilience.LatencyWindow.MIN_SAMPLES):
+        health["m"].latency.observe(0.01)
+
+    release = threading.Event()
+    attempts = []
+
+    def call(model):
+        attempts.append(model)
+        if len(attempts) == 1:
+            release.wait(5)     # the primary request stalls
+            return "primary"
+        return "hedge"
+
+    policy = resilience.RetryPolicy(hedge=True, hedge_min_delay=0.05)
+    start = time.perf_counter()
+    try:
+        assert resilience.call_with_fallback(call, ["m"], health, policy) == "hedge"
+    finally:
+        release.set()
+    assert time.perf_counter() - start < 2
+    assert len(attempts) == 2
@@ -0,0 +1,55 @@
+import pytest
+
+from app.core.config import settings
+from app.services import services
+
+
+@pytest.fixture
+def tiers(monkeypatch):
+    monkeypatch.setattr(settings, "openrouter_model", "big/model")
+    monkeypatch.setattr(settings, "openrouter_fast_model", "small/model")
+    monkeypatch.setattr(settings, "openrouter_fallback_models", "other/model, small/model")
+    monkeypatch.setattr(settings, "routing_fast_max_tokens", 100)
+    monkeypatch.setattr(settings, "routing_fast_max_images", 1)
+    monkeypatch.setattr(services, "model_health", services.resilience.ModelHealthRegistry())
+
+
+def text(content):
+    return [{"role": "user", "content": content}]
+
+
+def images(count):
+    parts = [{"type": "text", "text": "cards"}]
+    parts += [{"type": "image_url", "image_url": {"url": "data:"}}] * count
+    return [{"role": "user", "content": parts}]
+
+
+def test_estimate_counts_cjk_per_character_and_images_as_blocks():
+    assert services.estimate_input(text("学习" * 10)) == (20, 0)
+    assert services.estimate_input(text("a" * 40)) == (10, 0)
+    tokens, count = services.estimate_input(images(2))
+    assert count == 2 and tokens == 2 * services.TOKENS_PER_IMAGE + 2
+
+
+def test_small_inputs_go_fast_and_large_or_multi_image_inputs_go_capable(tiers):
+    assert services.route_request(text("你好 - hello")).model == "small/model"
+    assert services.route_request(text("学" * 500)).reason == "large_input"
+    assert services.route_request(images(3)).tier == "capable"
+    assert services.candidate_models("small/model") == ["small/model", "big/model", "other/model"]
+
+
+def test_routing_avoids_a_fast_tier_that_is_down_or_slower(tiers):
+    health = services.model_health
+    for _ in range(services.resilience.LatencyWindow.MIN_SAMPLES):
+        health["small/model"].latency.observe(3.0)
+        health["big/model"].latency.observe(1.0)
+    assert services.route_request(text("hi")).reason == "fast_slower"
+
+    health["small/model"].breaker.failure_threshold = 1
+    health["small/model"].breaker.record_failure()
+    assert services.route_request(text("hi")).reason == "fast_unavailable"
+
+    stats = services.routing_stats()
+    assert stats["tiers"] == {"capable": "big/model", "fast": "small/model"}
+    assert stats["models"]["small/model"]["breaker"] == "open"
+    assert {"tier": "capable", "reason": "fast_slower", "count": 1} in stats["decisions"]
@@ -0,0 +1,125 @@
+from unittest.mock import patch
+
+from app.db import database
+from app.services.search import SearchIndex, tokenize
+from app.services.user_index import UserIndexRegistry
+
+
+def make_index() -> SearchIndex:
+    index = SearchIndex()
+    index.add(1, 10, "学习", "xué xí - to study, to learn")
+    index.add(2, 10, "学生", "xué sheng - student")
+    index.add(3, 20, "API", "Application Programming Interface")
+    return index
+
+
+def test_tokenize_folds_tones_and_joins_syllables():
+    assert tokenize("xué xí") == ["xue", "xi", "xuexi"]
+    assert tokenize("xue2 xi2") == ["xue", "xi", "xuexi"]
+    assert tokenize("学习") == ["学", "习", "学习"]
+
+
+def test_pinyin_queries_ignore_tones_and_spacing():
+    index = make_index()
+    for query in ("xuexi", "xue xi", "xué xí"):
+        total, hits = index.search(query)
+        assert hits[0].card_id == 1, query
+
+
+def test_cjk_query_ranks_exact_word_first():
+    total, hits = make_index().search("学习")
+    assert total == 1
+    assert hits[0].front == "学习"
+
+    total, hits = make_index().search("学")
+    assert {hit.card_id for hit in hits} == {1, 2}
+
+
+def test_pagination_and_incremental_updates():
+    index = make_index()
+    total, page = index.search("xue", offset=1, limit=1)
+    assert total == 2 and len(page) == 1
+
+    index.remove(2)
+    index.add(4, 20, "大学", "dà xué - university")
+    total, hits = index.search("university")
+    assert [hit.card_id for hit in hits] == [4]
+    assert index.search("student") == (0, [])
+
+
+def test_registry_builds_once_and_invalidates():
+    loads = []
+
+    def load():
+        loads.append(1)
+        return [{"id": 1, "set_id": 10, "front": "猫", "back": "māo - cat"}]
+
+    registry = UserIndexRegistry(SearchIndex)
+    assert registry.loaded("u") is None
+    assert len(registry.get("u", load)) == 1
+    registry.get("u", load)
+    assert len(loads) == 1
+
+    registry.invalidate("u")
+    registry.get("u", load)
+    assert len(loads) == 2
+
+
+def test_registry_is_bounded_and_drops_expired_indexes():
+    def load():
+        return [{"id": 1, "set_id": 10, "front": "猫", "back": "māo - cat"}]
+
+    registry = UserIndexRegistry(SearchIndex, max_users=2)
+    for user in ("a", "b", "a", "c"):
+        registry.get(user, load)
+    assert len(registry) == 2
+    assert registry.loaded("b") is None and registry.loaded("a") is not None
+
+    registry.max_age_seconds = 0
+    registry.get("d", load)
+    assert registry.loaded("a") is None and registry.loaded("c") is None
+
+
+def test_changes_during_a_build_are_not_lost():
+    registry = UserIndexRegistry(SearchIndex)
+
+    def load():
+        # Another request adds and deletes cards while the snapshot is read.
+        registry.add_cards("u", [{"id": 2, "set_id": 10, "front": "狗", "back": "gǒu - dog"}])
+        yield {"id": 1, "set_id": 10, "front": "猫", "back": "māo - cat"}
+        registry.remove_cards("u", [1])
+
+    index = registry.get("u", load)
+    assert index.search("dog")[0] == 1
+    # The removal raced with the snapshot, so this build isn't cached.
+    assert registry.loaded("u") is None
+
+
+def test_stale_index_catches_up_from_the_sync_cursor(fake_db):
+    user_id, _ = fake_db.create_user()
+    created = database.create_flashcard_set({
+        "title": "Animals", "description": "d",
+        "cards": [{"front": "猫", "back": "māo - cat"}, {"front": "狗", "back": "gǒu - dog"}],
+    }, user_id)
+    cat, dog = created["flashcards"]
+    assert database.search_cards(user_id, "cat")["total"] == 1
+
+    # Another worker edits one card, deletes one and adds one.
+    fake_db.conn.execute("UPDATE flashcards SET back = 'māo - kitten' WHERE id = ?", (cat["id"],))
+    fake_db.conn.execute("DELETE FROM flashcards WHERE id = ?", (dog["id"],))
+    fake_db.conn.execute("INSERT INTO flashcards (front, back, set_id) VALUES ('鸟', 'niǎo - bird', ?)",
+                         (created["id"],))
+    fake_db.conn.commit()
+    assert database.search_cards(user_id, "kitten")["total"] == 0
+
+    database.search_indexes._entries[user_id].synced_at -= database.search_indexes.max_age_seconds
+    with patch.object(database, "_load_user_cards", side_effect=AssertionError("full reload")):
+        assert database.search_cards(user_id, "kitten")["total"] == 1
+        assert database.search_cards(user_id, "bird")["total"] == 1
+        assert database.search_cards(user_id, "dog")["total"] == 0
+
+    # A deleted set has no card tombstones, so that falls back to a rebuild.
+    database.search_indexes._entries[user_id].synced_at -= database.search_indexes.max_age_seconds
+    fake_db.conn.execute("DELETE FROM flashcard_sets WHERE id = ?", (created["id"],))
+    fake_db.conn.commit()
+    assert database.search_cards(user_id, "kitten")["total"] == 0
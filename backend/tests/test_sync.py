@@ -0,0 +1,113 @@
+from app.db import database
+from app.models.models import SyncResponse
+
+
+def sync_all(user_id, since, limit=database.SYNC_PAGE_SIZE):
+    pages = []
+    while True:
+        page = database.get_sync_changes(user_id, since, limit)
+        pages.append(page)
+        since = page["cursor"]
+        if not page["has_more"]:
+            return pages
+
+
+def test_sync_returns_only_changes_since_the_cursor(fake_db):
+    user_id, _ = fake_db.create_user()
+    created = database.create_flashcard_set({
+        "title": "Verbs", "description": "d",
+        "cards": [{"front": "学", "back": "study"}, {"front": "吃", "back": "eat"}, {"front": "看", "back": "see"}],
+    }, user_id)
+    database.create_flashcard_set({"title": "Other", "description": "d", "cards": []}, "someone-else")
+    set_id = created["id"]
+    study, eat, see = created["flashcards"]
+
+    first = database.get_sync_changes(user_id)
+    SyncResponse(**first)
+    assert [s["id"] for s in first["sets"]] == [set_id]
+    assert {c["id"] for c in first["cards"]} == {study["id"], eat["id"], see["id"]}
+    assert database.get_sync_changes(user_id, first["cursor"])["sets"] == []
+
+    # Edit one card, keep one untouched, drop one and add one; the unchanged
+    # title and the untouched card don't show up as changes.
+    fake_db.conn.execute(
+        "INSERT INTO user_flashcard_progress (user_id, flashcard_id, next_review_date) VALUES (?, ?, '2026-03-10')",
+        (user_id, study["id"]),
+    )
+    fake_db.conn.commit()
+    updated = database.update_flashcard_set(set_id, {
+        "title": "Verbs", "description": "d",
+        "cards": [{"id": study["id"], "front": "学", "back": "to study"}, eat, {"front": "喝", "back": "drink"}],
+    }, user_id)
+    assert len(updated["flashcards"]) == 3
+
+    changes = database.get_sync_changes(user_id, first["cursor"])
+    assert changes["sets"] == []
+    assert {c["front"]: c["back"] for c in changes["cards"]} == {"学": "to study", "喝": "drink"}
+    assert changes["deleted_cards"] == [see["id"]]
+    assert changes["has_more"] is False and changes["cursor"] > first["cursor"]
+    progress = fake_db.conn.execute(
+        "SELECT COUNT(*) FROM user_flashcard_progress WHERE flashcard_id = ?", (study["id"],)
+    ).fetchone()[0]
+    assert progress == 1
+
+    database.delete_flashcard_set(set_id, user_id)
+    gone = database.get_sync_changes(user_id, changes["cursor"])
+    assert gone["deleted_sets"] == [set_id]
+    assert gone["deleted_cards"] == [] and gone["cards"] == []
+
+
+def test_sync_pages_without_skipping_changes(fake_db):
+    user_id, _ = fake_db.create_user()
+    set_ids = [
+        database.create_flashcard_set({
+            "title": f"set {i}", "description": "d",
+            "cards": [{"front": f"{i}-{j}", "back": "b"} for j in range(4)],
+        }, user_id)["id"]
+        for i in range(3)
+    ]
+    database.delete_flashcard_set(set_ids[0], user_id)
+    database.update_flashcard_set(set_ids[1], {"title": "renamed"}, user_id)
+
+    pages = sync_all(user_id, 0, limit=3)
+    assert len(pages) > 1
+    cursors = [page["cursor"] for page in pages]
+    assert cursors == sorted(cursors)
+
+    sets = {s["id"]: s for page in pages for s in page["sets"]}
+    cards = {c["id"] for page in pages for c in page["cards"]}
+    deleted = [set_id for page in pages for set_id in page["deleted_sets"]]
+    assert deleted == [set_ids[0]]
+    assert sets[set_ids[1]]["title"] == "renamed"
+    live = {row[0] for row in fake_db.conn.execute("SELECT id FROM flashcards")}
+    assert live <= cards
+    assert sync_all(user_id, pages[-1]["cursor"])[0]["cards"] == []
+
+
+def test_a_change_committed_late_is_not_skipped(fake_db):
+    user_id, _ = fake_db.create_user()
+    created = database.create_flashcard_set({
+        "title": "Verbs", "description": "d", "cards": [{"front": "学", "back": "study"}],
+    }, user_id)
+    card_id = created["flashcards"][0]["id"]
+
+    # A transaction takes its id, then a later one commits first.
+    fake_db.conn.execute("UPDATE sync_version_seq SET value = value + 1")
+    late = fake_db.conn.execute("SELECT value FROM sync_version_seq").fetchone()[0]
+    fake_db.conn.execute("INSERT INTO sync_in_flight (version) VALUES (?)", (late,))
+    fake_db.conn.commit()
+    database.create_flashcard_set({"title": "Later", "description": "d", "cards": []}, user_id)
+
+    before = sync_all(user_id, 0)[-1]
+    assert before["cursor"] < late
+    assert [s["title"] for s in before["sets"]] == ["Verbs"]
+
+    # The early transaction commits its edit under the client's old cursor.
+    fake_db.conn.execute("UPDATE flashcards SET back = 'to study' WHERE id = ?", (card_id,))
+    fake_db.conn.execute("UPDATE flashcards SET version = ? WHERE id = ?", (late, card_id))
+    fake_db.conn.execute("DELETE FROM sync_in_flight")
+    fake_db.conn.commit()
+
+    after = sync_all(user_id, before["cursor"])
+    assert [c["back"] for page in after for c in page["cards"]] == ["to study"]
+    assert [s["title"] for page in after for s in page["sets"]] == ["Later"]
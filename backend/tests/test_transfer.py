@@ -0,0 +1,59 @@
+import io
+import sqlite3
+import zipfile
+
+import pytest
+
+from app.services import transfer
+
+
+def test_delimited_reader_skips_header_comments_and_bom():
+    data = "\ufefffront,back\n你好,\"nǐ hǎo - hello, hi\"\n谢谢,xiè xie\n,\n".encode("utf-8")
+    cards = list(transfer.read_delimited(io.BytesIO(data), ","))
+    assert cards == [
+        {"front": "你好", "back": "nǐ hǎo - hello, hi"},
+        {"front": "谢谢", "back": "xiè xie"},
+        {"front": "", "back": ""},
+    ]
+
+    anki_text = "#separator:tab\n#html:true\n猫\tmāo - cat\n".encode("utf-8")
+    assert list(transfer.read_delimited(io.BytesIO(anki_text), "\t")) == [{"front": "猫", "back": "māo - cat"}]
+
+
+def test_anki_package_reader(tmp_path):
+    collection = tmp_path / "collection.anki2"
+    connection = sqlite3.connect(collection)
+    connection.execute("CREATE TABLE notes (id INTEGER PRIMARY KEY, flds TEXT)")
+    connection.executemany("INSERT INTO notes VALUES (?, ?)", [
+        (2, "学生\x1fxué sheng<br>student"),
+        (1, "<b>学习</b>\x1fto study &amp; learn [sound:xuexi.mp3]\x1fextra"),
+    ])
+    connection.commit()
+    connection.close()
+
+    package = io.BytesIO()
+    with zipfile.ZipFile(package, "w") as archive:
+        archive.write(collection, "collection.anki2")
+        archive.writestr("media", "{}")
+    package.seek(0)
+
+    assert list(transfer.read_anki_package(package)) == [
+        {"front": "学习", "back": "to study & learn"},
+        {"front": "学生", "back": "xué sheng\nstudent"},
+    ]
+
+
+def test_writer_streams_one_chunk_per_page_and_round_trips():
+    pages = [[{"front": "a,b", "back": "1"}], [{"front": "c", "back": "line\nbreak"}]]
+    chunks = list(transfer.write_delimited(iter(pages), "csv"))
+    assert len(chunks) == 3
+    cards = list(transfer.read_delimited(io.BytesIO(b"".join(chunks)), ","))
+    assert cards == [{"front": "a,b", "back": "1"}, {"front": "c", "back": "line\nbreak"}]
+
+
+def test_detect_format():
+    assert transfer.detect_format("deck.TSV") == "tsv"
+    assert transfer.detect_format("deck.apkg") == "apkg"
+    assert transfer.detect_format("deck", "csv") == "csv"
+    with pytest.raises(ValueError):
+        transfer.detect_format("deck.xlsx")
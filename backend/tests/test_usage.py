@@ -0,0 +1,57 @@
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from app.services import resilience, services
+
+
+def test_prompt_is_a_memoized_system_prefix_and_usage_is_collected():
+    first = services.build_messages("english", "你好")
+    second = services.build_messages("english", "再见")
+    assert first[0]["role"] == "system"
+    assert first[0]["content"] is second[0]["content"]
+    assert first[1] == {"role": "user", "content": "你好"}
+
+    usage = services.TokenUsage()
+    response = SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content='{"flashcards": []}'))],
+        usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20,
+                              prompt_tokens_details=SimpleNamespace(cached_tokens=80)),
+    )
+    with patch.object(services, "client") as client:
+        client.chat.completions.create.return_value = response
+        services._call_openrouter(first, "m", usage)
+        services._call_openrouter(second, "m", usage)
+
+    assert usage.by_model() == [{"model": "m", "requests": 2, "prompt_tokens": 200,
+                                 "completion_tokens": 40, "cached_tokens": 160}]
+
+
+def test_usage_of_a_hedged_request_that_loses_is_still_recorded():
+    health = resilience.ModelHealthRegistry()
+    for _ in range(resilience.LatencyWindow.MIN_SAMPLES):
+        health["m"].latency.observe(0.001)
+    policy = resilience.RetryPolicy(hedge_min_delay=0.01)
+    usage = services.TokenUsage()
+    calls = []
+    loser_done = threading.Event()
+
+    def call(model):
+        calls.append(model)
+        if len(calls) == 1:
+            time.sleep(0.2)
+            usage.add(model, SimpleNamespace(prompt_tokens=100, completion_tokens=30))
+            loser_done.set()
+            return "slow"
+        usage.add(model, SimpleNamespace(prompt_tokens=100, completion_tokens=20))
+        return "fast"
+
+    assert resilience.call_with_fallback(call, ["m"], health, policy) == "fast"
+    recorded = []
+    usage.drain(recorded.extend)
+    assert [row["completion_tokens"] for row in recorded] == [20]
+
+    assert loser_done.wait(2)
+    assert [row["completion_tokens"] for row in recorded] == [20, 30]
+    assert sum(row["requests"] for row in recorded) == 2
@@ -2,9 +2,12 @@ import { useState } from 'react';
 import { useNavigate } from 'react-router-dom';
 import PropTypes from 'prop-types';
 
-function FlashcardSetCard({ set, handleDelete }) {
+function FlashcardSetCard({ set, progress, handleDelete }) {
   const [showMenu, setShowMenu] = useState(false);
   const navigate = useNavigate();
+  const studiedPercent = progress?.total_cards
+    ? Math.round((progress.cards_studied / progress.total_cards) * 100)
+    : 0;
 
   return (
     <div className="card-glass flex flex-col h-full">
@@ -54,13 +57,16 @@ function FlashcardSetCard({ set, handleDelete }) {
 
         <div className="flex items-center justify-between text-xs text-neutral-400">
           <span>{set.flashcards?.length || 0} cards</span>
+          {progress?.total_reviews > 0 && (
+            <span>{studiedPercent}% studied · {progress.know_rate}% known</span>
+          )}
         </div>
       </div>
 
       {/* Footer */}
       <div className="px-5 pb-5">
         <div className="progress-bar mb-4">
-          <div className="progress-fill" style={{ width: '75%' }} />
+          <div className="progress-fill" style={{ width: `${studiedPercent}%` }} />
         </div>
         <button
           onClick={() => navigate(`/sets/${set.id}`)}
@@ -80,6 +86,12 @@ FlashcardSetCard.propTypes = {
     description: PropTypes.string,
     flashcards: PropTypes.array,
   }).isRequired,
+  progress: PropTypes.shape({
+    total_cards: PropTypes.number,
+    cards_studied: PropTypes.number,
+    total_reviews: PropTypes.number,
+    know_rate: PropTypes.number,
+  }),
   handleDelete: PropTypes.func.isRequired,
 };
 
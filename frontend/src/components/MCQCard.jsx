@@ -1,49 +1,68 @@
-import { useState, useEffect, useMemo } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import PropTypes from 'prop-types';
+import { useAuth } from '../contexts/AuthContext';
+import { api } from '../services/api';
 
-function MCQCard({ card, allCards, onNext, onAnswer, currentIndex, totalCards }) {
-  const [selectedAnswer, setSelectedAnswer] = useState(null);
-  const [isAnswered, setIsAnswered] = useState(false);
+function MCQCard({ setId, onNext, onAnswer, currentIndex, totalCards }) {
+  const { token } = useAuth();
+  const [quiz, setQuiz] = useState({ seed: null, total: null, questions: [] });
+  const [loadError, setLoadError] = useState('');
+  const [selected, setSelected] = useState(null);
+  const fetching = useRef(false);
 
-  // Generate shuffled choices when card changes
-  const choices = useMemo(() => {
-    const correctAnswer = card.back;
-    
-    // Get other cards' backs as distractors (exclude current card)
-    const otherBacks = allCards
-      .filter((c, idx) => idx !== currentIndex)
-      .map(c => c.back);
-    
-    // Shuffle and pick up to 3 distractors
-    const shuffledOthers = [...otherBacks].sort(() => Math.random() - 0.5);
-    const distractors = shuffledOthers.slice(0, 3);
-    
-    // If we don't have enough distractors, that's okay
-    const allChoices = [correctAnswer, ...distractors];
-    
-    // Shuffle all choices
-    return allChoices.sort(() => Math.random() - 0.5);
-  }, [card, allCards, currentIndex]);
+  // Questions and their choices come from the server a page at a time; the
+  // seed from the first page keeps later pages in the same quiz order.
+  const loaded = quiz.questions.length;
+  const hasMore = quiz.total === null || loaded < quiz.total;
+  const needsPage = hasMore && loaded <= currentIndex + 1;
+
+  useEffect(() => {
+    if (!needsPage || fetching.current || loadError) return;
+    fetching.current = true;
+    api.getQuiz(setId, quiz.seed, loaded, token)
+      .then((page) => {
+        setQuiz((prev) => ({
+          seed: page.seed,
+          total: page.total,
+          questions: [...prev.questions, ...page.questions],
+        }));
+      })
+      .catch((err) => setLoadError(err.message))
+      .finally(() => {
+        fetching.current = false;
+      });
+  }, [needsPage, setId, quiz.seed, loaded, token, loadError]);
 
-  // Reset state when card changes
+  // Reset state when the question changes
   useEffect(() => {
-    setSelectedAnswer(null);
-    setIsAnswered(false);
-  }, [card]);
+    setSelected(null);
+  }, [currentIndex]);
 
-  const handleSelect = (choice) => {
+  const question = quiz.questions[currentIndex];
+  const isAnswered = selected !== null;
+  const isCorrect = isAnswered && question && selected === question.answer_index;
+  const questionCount = quiz.total ?? totalCards;
+
+  const handleSelect = (index) => {
     if (isAnswered) return;
-    setSelectedAnswer(choice);
-    setIsAnswered(true);
+    setSelected(index);
     // Report if answer was correct
     if (onAnswer) {
-      onAnswer(choice === card.back);
+      onAnswer(index === question.answer_index);
     }
   };
 
-  const isCorrect = selectedAnswer === card.back;
+  if (loadError || !question) {
+    return (
+      <div className="card-glass p-8 min-h-[140px] flex items-center justify-center">
+        <p className="text-sm" style={{ color: loadError ? '#dc2626' : 'var(--text-muted)' }}>
+          {loadError || 'Loading question...'}
+        </p>
+      </div>
+    );
+  }
 
-  const getChoiceStyle = (choice) => {
+  const getChoiceStyle = (index) => {
     if (!isAnswered) {
       return {
         background: 'var(--bg-secondary)',
@@ -51,7 +70,7 @@ function MCQCard({ card, allCards, onNext, onAnswer, currentIndex, totalCards })
       };
     }
     
-    if (choice === card.back) {
+    if (index === question.answer_index) {
       // Correct answer - always show green
       return {
         background: 'rgba(34, 197, 94, 0.15)',
@@ -60,7 +79,7 @@ function MCQCard({ card, allCards, onNext, onAnswer, currentIndex, totalCards })
       };
     }
     
-    if (choice === selectedAnswer && choice !== card.back) {
+    if (index === selected) {
       // Selected wrong answer - show red
       return {
         background: 'rgba(239, 68, 68, 0.15)',
@@ -84,25 +103,27 @@ function MCQCard({ card, allCards, onNext, onAnswer, currentIndex, totalCards })
         className="card-glass p-8 min-h-[140px] flex items-center justify-center"
       >
         <div className="text-center">
-          {card.image && (
-            <img src={card.image} alt="" className="max-h-24 mx-auto mb-4 rounded" />
-          )}
           <p className="text-xl font-medium" style={{ color: 'var(--text-primary)' }}>
-            {card.front}
+            {question.front}
           </p>
+          {isAnswered && question.reading && (
+            <p className="text-sm mt-2" style={{ color: 'var(--text-muted)' }}>
+              {question.reading.pinyin}
+            </p>
+          )}
         </div>
       </div>
 
       {/* Answer Choices */}
       <div className="grid gap-3">
-        {choices.map((choice, index) => (
+        {question.choices.map((choice, index) => (
           <button
             key={index}
-            onClick={() => handleSelect(choice)}
+            onClick={() => handleSelect(index)}
             disabled={isAnswered}
             className="p-4 rounded-xl text-left transition-all duration-200 backdrop-blur-sm"
             style={{
-              ...getChoiceStyle(choice),
+              ...getChoiceStyle(index),
               cursor: isAnswered ? 'default' : 'pointer',
             }}
           >
@@ -116,7 +137,7 @@ function MCQCard({ card, allCards, onNext, onAnswer, currentIndex, totalCards })
               >
                 {String.fromCharCode(65 + index)}
               </span>
-              <span style={{ color: getChoiceStyle(choice).color || 'var(--text-primary)' }}>
+              <span style={{ color: getChoiceStyle(index).color || 'var(--text-primary)' }}>
                 {choice}
               </span>
             </div>
@@ -138,7 +159,7 @@ function MCQCard({ card, allCards, onNext, onAnswer, currentIndex, totalCards })
               onClick={onNext}
               className="btn-primary"
             >
-              {currentIndex < totalCards - 1 ? 'Next →' : 'Finish'}
+              {currentIndex < questionCount - 1 ? 'Next →' : 'Finish'}
             </button>
           </>
         ) : (
@@ -152,12 +173,7 @@ function MCQCard({ card, allCards, onNext, onAnswer, currentIndex, totalCards })
 }
 
 MCQCard.propTypes = {
-  card: PropTypes.shape({
-    front: PropTypes.string.isRequired,
-    back: PropTypes.string.isRequired,
-    image: PropTypes.string,
-  }).isRequired,
-  allCards: PropTypes.array.isRequired,
+  setId: PropTypes.oneOfType([PropTypes.number, PropTypes.string]).isRequired,
   onNext: PropTypes.func.isRequired,
   onAnswer: PropTypes.func,
   currentIndex: PropTypes.number.isRequired,
@@ -68,6 +68,7 @@ function CreateFlashcardSet() {
 
     try {
       let cards = [];
+      let pages = [];
       
       if (inputMode === 'manual') {
         cards = manualCards;
@@ -81,10 +82,11 @@ function CreateFlashcardSet() {
         selectedFiles.forEach(file => formData.append('files', file));
         const response = await api.uploadFiles(formData, token, { backLanguage });
         cards = response.flashcards;
+        pages = response.pages || [];
       }
       
       setLoadingMessage('Creating flashcard set...');
-      await api.createFlashcardSet({ title, description, cards }, token);
+      await api.createFlashcardSet({ title, description, cards, pages }, token);
       navigate('/');
     } catch (err) {
       setError(err.message || 'Failed to create flashcard set');
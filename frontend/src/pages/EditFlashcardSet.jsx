@@ -34,6 +34,8 @@ function EditFlashcardSet() {
   const handleCardChange = (index, field, value) => {
     const newCards = [...cards];
     newCards[index] = { ...newCards[index], [field]: value };
+    // The stored reading belongs to the old front; the server recomputes it.
+    if (field === 'front') newCards[index].reading = null;
     setCards(newCards);
   };
 
@@ -129,6 +131,9 @@ function EditFlashcardSet() {
                     placeholder="Back"
                   />
                 </div>
+                {card.reading && (
+                  <p className="text-xs text-neutral-500">{card.reading.pinyin}</p>
+                )}
                 <button
                   type="button"
                   onClick={() => setCards(cards.filter((_, i) => i !== index))}
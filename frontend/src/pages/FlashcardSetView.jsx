@@ -93,7 +93,8 @@ function FlashcardSetView() {
       // Update the cards array with the edited card
       const updatedCards = set.flashcards.map((card, index) => {
         if (index === currentCardIndex) {
-          return { ...card, front: editFront, back: editBack }
+          const reading = editFront === card.front ? card.reading : null
+          return { ...card, front: editFront, back: editBack, reading }
         }
         return card
       })
@@ -102,7 +103,7 @@ function FlashcardSetView() {
       await api.updateFlashcardSet(setId, {
         title: set.title,
         description: set.description,
-        cards: updatedCards.map(c => ({ front: c.front, back: c.back }))
+        cards: updatedCards.map(c => ({ id: c.id, front: c.front, back: c.back }))
       }, token)
       
       // Update local state
@@ -240,6 +241,11 @@ function FlashcardSetView() {
             {currentCard.image && (
               <img src={currentCard.image} alt="" className="max-h-32 mx-auto mb-4 rounded" />
             )}
+            {isFlipped && currentCard.reading && (
+              <p className="text-sm mb-2" style={{ color: 'var(--text-muted)' }}>
+                {currentCard.reading.pinyin}
+              </p>
+            )}
             <p className="text-xl" style={{ color: 'var(--text-primary)' }}>
               {isFlipped ? currentCard.back : currentCard.front}
             </p>
@@ -254,8 +260,7 @@ function FlashcardSetView() {
       {!isEditing && studyMode === 'mcq' && !mcqCompleted && (
         <div className="mb-6">
           <MCQCard
-            card={currentCard}
-            allCards={set.flashcards}
+            setId={set.id}
             currentIndex={currentCardIndex}
             totalCards={set.flashcards.length}
             onAnswer={(isCorrect) => {
@@ -5,6 +5,7 @@ import FlashcardSetCard from '../components/FlashcardSetCard';
 
 function FlashcardSets() {
   const [sets, setSets] = useState([]);
+  const [progress, setProgress] = useState({});
   const [loading, setLoading] = useState(true);
   const [error, setError] = useState('');
   const [searchQuery, setSearchQuery] = useState('');
@@ -25,6 +26,13 @@ function FlashcardSets() {
     fetchSets();
   }, [fetchSets]);
 
+  // One request for every set's progress; badges are optional, so failures are ignored.
+  useEffect(() => {
+    api.getLibraryProgress(token)
+      .then((rows) => setProgress(Object.fromEntries(rows.map((row) => [row.set_id, row]))))
+      .catch(() => {});
+  }, [token]);
+
   const handleDelete = async (setId) => {
     if (!window.confirm('Are you sure you want to delete this set?')) return;
 
@@ -85,6 +93,7 @@ function FlashcardSets() {
             <FlashcardSetCard
               key={set.id}
               set={set}
+              progress={progress[set.id]}
               handleDelete={handleDelete}
             />
           ))}
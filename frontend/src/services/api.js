@@ -78,10 +78,63 @@ function invalidateCache(pattern) {
   cache.invalidate(pattern);
 }
 
+// Local copy of the user's sets and cards, kept current with GET /sync.
+// After the first load, reads only download what changed since the cursor.
+const library = {
+  owner: null,
+  cursor: 0,
+  sets: new Map(), // set id -> set fields
+  setCards: new Map(), // set id -> Map of card id -> card
+  pending: null,
+};
+
+function resetLibrary(owner = null) {
+  library.owner = owner;
+  library.cursor = 0;
+  library.sets.clear();
+  library.setCards.clear();
+  library.pending = null;
+}
+
+function removeCard(cardId) {
+  for (const cards of library.setCards.values()) {
+    if (cards.delete(cardId)) return;
+  }
+}
+
+function applySyncPage(page) {
+  for (const set of page.sets) {
+    library.sets.set(set.id, set);
+    if (!library.setCards.has(set.id)) library.setCards.set(set.id, new Map());
+  }
+  for (const card of page.cards) {
+    removeCard(card.id);
+    if (!library.setCards.has(card.set_id)) library.setCards.set(card.set_id, new Map());
+    library.setCards.get(card.set_id).set(card.id, card);
+  }
+  page.deleted_cards.forEach(removeCard);
+  for (const setId of page.deleted_sets) {
+    library.sets.delete(setId);
+    library.setCards.delete(setId);
+  }
+  library.cursor = page.cursor;
+}
+
+function librarySet(setId) {
+  const set = library.sets.get(setId);
+  if (!set) return null;
+  const flashcards = [...(library.setCards.get(setId) || new Map()).values()]
+    .sort((a, b) => a.id - b.id)
+    .map(({ id, front, back, reading }) => ({ id, front, back, reading }));
+  const { id, title, description, owner_id } = set;
+  return { id, title, description, owner_id, flashcards };
+}
+
 // Handle session expiry - redirect to login
 function handleUnauthorized() {
   localStorage.removeItem('token');
   cache.clear();
+  resetLibrary();
   // Only redirect if not already on login page
   if (!window.location.pathname.includes('/login')) {
     window.location.href = '/login';
@@ -174,48 +227,85 @@ export const api = {
       throw new Error(error.detail || 'Upload failed');
     }
 
-    invalidateCache('flashcard-sets');
     return response.json();
   },
 
+  async syncLibrary(token) {
+    const owner = token.slice(-10);
+    if (library.owner !== owner) resetLibrary(owner);
+    if (library.pending) return library.pending;
+
+    library.pending = (async () => {
+      let hasMore = true;
+      while (hasMore) {
+        const response = await fetchWithAuth(`${API_BASE}/sync?since=${library.cursor}`, {
+          headers: {
+            'Authorization': `Bearer ${token}`,
+          },
+        });
+
+        if (!response.ok) {
+          throw new Error('Failed to sync flashcard sets');
+        }
+
+        const page = await response.json();
+        if (library.owner !== owner) return;
+        applySyncPage(page);
+        hasMore = page.has_more;
+      }
+    })();
+
+    try {
+      await library.pending;
+    } finally {
+      if (library.owner === owner) library.pending = null;
+    }
+  },
+
   async getFlashcardSets(token) {
-    const cacheKey = `flashcard-sets:${token.slice(-10)}`;
-    const cached = getCached(cacheKey);
-    if (cached) return cached;
+    await this.syncLibrary(token);
+    return [...library.sets.keys()].sort((a, b) => a - b).map(librarySet);
+  },
 
-    const response = await fetchWithAuth(`${API_BASE}/flashcard-sets`, {
+  async getLibraryProgress(token) {
+    const response = await fetchWithAuth(`${API_BASE}/progress`, {
       headers: {
         'Authorization': `Bearer ${token}`,
       },
     });
 
     if (!response.ok) {
-      throw new Error('Failed to fetch flashcard sets');
+      throw new Error('Failed to fetch study progress');
     }
 
-    const data = await response.json();
-    setCache(cacheKey, data);
-    return data;
+    return response.json();
   },
 
   async getFlashcardSet(setId, token) {
-    const cacheKey = `flashcard-set:${setId}:${token.slice(-10)}`;
-    const cached = getCached(cacheKey);
-    if (cached) return cached;
+    await this.syncLibrary(token);
+    const set = librarySet(Number(setId));
+    if (!set) {
+      throw new Error('Failed to fetch flashcard set');
+    }
+    return set;
+  },
 
-    const response = await fetchWithAuth(`${API_BASE}/flashcard-sets/${setId}`, {
+  // One page of a server-built quiz. Leave seed null for a new quiz, then
+  // pass the seed from the first page to get the rest in the same order.
+  async getQuiz(setId, seed, offset, token) {
+    const params = new URLSearchParams({ offset: String(offset) });
+    if (seed !== null && seed !== undefined) params.set('seed', String(seed));
+    const response = await fetchWithAuth(`${API_BASE}/flashcard-sets/${setId}/quiz?${params}`, {
       headers: {
         'Authorization': `Bearer ${token}`,
       },
     });
 
     if (!response.ok) {
-      throw new Error('Failed to fetch flashcard set');
+      throw new Error('Failed to load quiz');
     }
 
-    const data = await response.json();
-    setCache(cacheKey, data);
-    return data;
+    return response.json();
   },
 
   async deleteFlashcardSet(setId, token) {
@@ -230,7 +320,6 @@ export const api = {
       throw new Error('Failed to delete flashcard set');
     }
 
-    invalidateCache('flashcard-set');
     return response.json();
   },
 
@@ -248,8 +337,6 @@ export const api = {
       throw new Error('Failed to update flashcard set');
     }
 
-    invalidateCache(`flashcard-set:${setId}`);
-    invalidateCache('flashcard-sets');
     return response.json();
   },
 
@@ -268,7 +355,6 @@ export const api = {
       throw new Error(error.detail || 'Failed to create flashcard set');
     }
 
-    invalidateCache('flashcard-sets');
     return response.json();
   },
 